@@ -0,0 +1,175 @@
+import numpy as np
+
+
+class BalloonTrajectory:
+    """
+    A dense trajectory of the balloon's equations of motion (see prediction.NumericBallPredictor),
+    integrated once with a fixed step RK4 and queried at any time by cubic Hermite interpolation between the steps.
+    The variables of the ODE are (v_xy, v_z, d_xy, z), the derivative of the velocities is the drag and buoyancy
+    acceleration: dv/dt = (0, acceleration) - drag * |v| * v, and the derivative of the positions is the velocities.
+    The initial values may be arrays of the same shape, in which case all the trajectories are integrated together.
+    The trajectory is extended when queried after the integrated times. It starts at the initial values, times before
+    it are clamped to 0 (the drag makes integrating backwards in time diverge within a fraction of a second).
+    """
+    # The step of the integration in seconds.
+    STEP = 0.02
+    # The time (in seconds) the trajectory is integrated to when created.
+    HORIZON = 3
+
+    def __init__(self, v_xy_0, v_z_0, z_0, drag, acceleration, step=STEP, horizon=HORIZON):
+        """
+        Integrates the trajectory from the initial values until the horizon.
+        :param v_xy_0: the initial velocity in the XY plain (in m/s).
+        :param v_z_0: the initial velocity in the Z axis (in m/s).
+        :param z_0: the initial height (in meters).
+        :param drag: the drag coefficient divided by the mass (B / m in the calculations document).
+        :param acceleration: the acceleration of gravity and buoyancy (in m/s^2).
+        :param step: the step of the integration in seconds.
+        :param horizon: the time (in seconds) to integrate the trajectory to.
+        """
+        if np.ndim(v_xy_0) == 0:
+            # python floats are much faster than numpy scalars in the integration loop
+            v_xy_0, v_z_0, z_0 = float(v_xy_0), float(v_z_0), float(z_0)
+        self.drag = float(drag)
+        self.acceleration = float(acceleration)
+        self.step = step
+        # The states at the steps from the initial values.
+        self._steps = [(v_xy_0, v_z_0, 0 * v_xy_0, z_0 + 0 * v_xy_0)]
+        self._states = None
+        self._derivatives = None
+        self._integrate(int(np.ceil(horizon / step)))
+
+    @classmethod
+    def from_steps(cls, steps, drag, acceleration, step):
+        """
+        Creates a trajectory from states already calculated at its steps (without integrating).
+        :param steps: an array of the states (v_xy, v_z, d_xy, z) at the steps, the first state is the initial values.
+        :param drag: the drag coefficient divided by the mass.
+        :param acceleration: the acceleration of gravity and buoyancy (in m/s^2).
+        :param step: the time between the steps in seconds.
+        :return: the BalloonTrajectory.
+        """
+        # not initialized by __init__, there is nothing to integrate
+        trajectory = cls.__new__(cls)
+        trajectory.drag = float(drag)
+        trajectory.acceleration = float(acceleration)
+        trajectory.step = step
+        # converted to a list only if the trajectory is extended (see _integrate)
+        trajectory._steps = steps
+        trajectory._build_arrays(steps)
+        return trajectory
+
+    def _derivative(self, v_xy, v_z):
+        """
+        :param v_xy: the velocity in the XY plain.
+        :param v_z: the velocity in the Z axis.
+        :return: the derivatives of the velocities.
+        """
+        drag = self.drag * (v_xy * v_xy + v_z * v_z) ** 0.5
+        return -drag * v_xy, self.acceleration - drag * v_z
+
+    def _integrate(self, num_of_steps):
+        """
+        Appends steps of RK4 to the trajectory (works on floats and on arrays alike).
+        :param num_of_steps: the number of steps to append.
+        """
+        if isinstance(self._steps, np.ndarray):
+            # lists of floats are faster to build than lists of rows, but the rows of arrays must stay arrays
+            self._steps = self._steps.tolist() if self._steps.ndim == 2 else list(self._steps)
+        v_xy, v_z, d_xy, z = self._steps[-1]
+        step = self.step
+        half = step / 2
+        for _ in range(num_of_steps):
+            a_xy_1, a_z_1 = self._derivative(v_xy, v_z)
+            v_xy_2, v_z_2 = v_xy + half * a_xy_1, v_z + half * a_z_1
+            a_xy_2, a_z_2 = self._derivative(v_xy_2, v_z_2)
+            v_xy_3, v_z_3 = v_xy + half * a_xy_2, v_z + half * a_z_2
+            a_xy_3, a_z_3 = self._derivative(v_xy_3, v_z_3)
+            v_xy_4, v_z_4 = v_xy + step * a_xy_3, v_z + step * a_z_3
+            a_xy_4, a_z_4 = self._derivative(v_xy_4, v_z_4)
+            d_xy = d_xy + step / 6 * (v_xy + 2 * v_xy_2 + 2 * v_xy_3 + v_xy_4)
+            z = z + step / 6 * (v_z + 2 * v_z_2 + 2 * v_z_3 + v_z_4)
+            v_xy = v_xy + step / 6 * (a_xy_1 + 2 * a_xy_2 + 2 * a_xy_3 + a_xy_4)
+            v_z = v_z + step / 6 * (a_z_1 + 2 * a_z_2 + 2 * a_z_3 + a_z_4)
+            self._steps.append((v_xy, v_z, d_xy, z))
+        self._states = None
+
+    def _build_arrays(self, states=None):
+        """
+        Builds the arrays of the states and their derivatives at all the steps.
+        :param states: the array of the states at all the steps if it is already built.
+        """
+        self._states = np.array(self._steps, dtype=float) if states is None else states
+        self._derivatives = np.empty_like(self._states)
+        self._derivatives[:, 0], self._derivatives[:, 1] = self._derivative(self._states[:, 0], self._states[:, 1])
+        self._derivatives[:, 2:] = self._states[:, :2]
+
+    @property
+    def end_time(self):
+        """
+        :return: the last time integrated.
+        """
+        return (len(self._steps) - 1) * self.step
+
+    def extend(self, end_time):
+        """
+        Integrates the trajectory so it covers the inputted time.
+        :param end_time: the last time the trajectory should cover.
+        """
+        if end_time > self.end_time:
+            self._integrate(int(np.ceil((end_time - self.end_time) / self.step)))
+
+    def cubic(self, index):
+        """
+        :param index: the index of a step of the trajectory.
+        :return: the coefficients of the cubic interpolating each variable between the step and the next step,
+                 in an array of shape (4, 4) (the variables, the powers from 3 down to 0) in s = t / step - index.
+        """
+        self.extend((index + 1) * self.step)
+        if self._states is None:
+            self._build_arrays()
+        p0, p1 = self._states[index], self._states[index + 1]
+        m0, m1 = self.step * self._derivatives[index], self.step * self._derivatives[index + 1]
+        return np.stack([2 * p0 + m0 - 2 * p1 + m1, -3 * p0 - 2 * m0 + 3 * p1 - m1, m0, p0], axis=1)
+
+    def _hermite(self, times):
+        """
+        Prepares the interpolation of the trajectory at times, integrates the trajectory if they are after its end.
+        :param times: an array of times.
+        :return: the indices of the steps before the times, and the cubic Hermite basis at the times (for the states
+                 and the derivatives at the steps before and after the times, the derivatives scaled by the step).
+        """
+        times = np.maximum(times, 0)
+        if times.size:
+            self.extend(times.max())
+        if self._states is None:
+            self._build_arrays()
+        position = times / self.step
+        index = np.clip(np.floor(position).astype(int), 0, len(self._states) - 2)
+        s = position - index
+        s2, s3 = s * s, s * s * s
+        return index, (2 * s3 - 3 * s2 + 1, (s3 - 2 * s2 + s) * self.step, -2 * s3 + 3 * s2, (s3 - s2) * self.step)
+
+    def states(self, times):
+        """
+        :param times: a time or an array of times (0 is the time of the initial values).
+        :return: the values of the variables of the ODE (v_xy, v_z, d_xy, z) at the inputted times,
+                 in an array of shape times.shape + (4,) + the shape of the initial values.
+        """
+        index, basis = self._hermite(times)
+        extra_dims = (np.newaxis,) * (self._states.ndim - 1)
+        h00, h10, h01, h11 = (h[(...,) + extra_dims] for h in basis)
+        return h00 * self._states[index] + h10 * self._derivatives[index] \
+            + h01 * self._states[index + 1] + h11 * self._derivatives[index + 1]
+
+    def states_of_each(self, times):
+        """
+        :param times: an array of a time for each of the trajectories (when the initial values are 1D arrays).
+        :return: the values of the variables of the ODE of each trajectory at its time, in an array of shape
+                 (trajectories, 4).
+        """
+        index, basis = self._hermite(times)
+        h00, h10, h01, h11 = (h[:, np.newaxis] for h in basis)
+        trajectories = np.arange(len(index))
+        return h00 * self._states[index, :, trajectories] + h10 * self._derivatives[index, :, trajectories] \
+            + h01 * self._states[index + 1, :, trajectories] + h11 * self._derivatives[index + 1, :, trajectories]
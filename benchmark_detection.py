@@ -0,0 +1,224 @@
+import time
+import numpy as np
+import cv2
+
+from camera import Camera
+from frame import Frame
+from object_in_frame import ObjectInFrame
+from recognizable_object import RecognizableObject
+from segmentation import ColorSegmentation
+from detection_executor import DetectionExecutor
+
+# Hues of the synthetic objects (one per object, far enough apart so the color bounds don't overlap).
+OBJECT_HUES = (0, 30, 60, 90, 120, 150)
+HUE_RANGE = 10
+OBJECT_RADIUS = 25
+# The allowed error of a detection in pixels (the noise removal slightly shifts the center).
+DETECTION_TOLERANCE = 5
+# Distance of the objects from the camera, sets the size of the search window when tracking.
+OBJECT_DISTANCE = 200
+IMAGE_SHAPE = (1080, 1920, 3)
+REPEATS = 20
+CAMERAS_DISTANCE = 111.9
+
+
+def synthetic_image(n_objects):
+    """
+    Creates an image with colored circles representing objects.
+    :param n_objects: the number of objects in the image.
+    :return: the image (BGR), and the pixel locations of the objects.
+    """
+    hsv = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    hsv[:, :, 1:] = 40
+    locations = []
+    for i in range(n_objects):
+        x = (i + 1) * IMAGE_SHAPE[1] // (n_objects + 1)
+        y = IMAGE_SHAPE[0] // 3 + (i % 2) * IMAGE_SHAPE[0] // 3
+        cv2.circle(hsv, (x, y), OBJECT_RADIUS, (OBJECT_HUES[i], 220, 220), -1)
+        locations.append((x, y))
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR), locations
+
+
+def synthetic_objects(n_objects):
+    """
+    :param n_objects: the number of objects.
+    :return: a list of ObjectInFrames with the color bounds of the synthetic objects.
+    """
+    objects = []
+    for i in range(n_objects):
+        obj = ObjectInFrame()
+        obj.lower_hsv = (max(0, OBJECT_HUES[i] - HUE_RANGE), 100, 100)
+        obj.upper_hsv = (OBJECT_HUES[i] + HUE_RANGE, 255, 255)
+        objects.append(obj)
+    return objects
+
+
+def time_detection(image, objects, tracked, shared):
+    """
+    Measures the time of detecting all the objects in a frame.
+    :param image: the image of the frame.
+    :param objects: the ObjectInFrames to detect.
+    :param tracked: whether the objects are tracked (searched around their last location) or lost (full frame search).
+    :param shared: whether all the objects share one Frame (and its HSV conversion) or each has a Frame of its own.
+    :return: the mean time of detecting all the objects in one frame in milliseconds.
+    """
+    total = 0
+    for _ in range(REPEATS):
+        if tracked:
+            for obj in objects:
+                obj.set_frame(Frame(image))
+                obj.detect_pixel_coordinates(OBJECT_DISTANCE)
+        frame = Frame(image)
+        start = time.perf_counter()
+        for obj in objects:
+            if not tracked:
+                obj.x, obj.y = 0, 0
+            obj.set_frame(frame if shared else Frame(image))
+            obj.detect_pixel_coordinates(OBJECT_DISTANCE)
+        total += time.perf_counter() - start
+    return total / REPEATS * 1000
+
+
+def time_single_pass(image, objects, tracked):
+    """
+    Measures the time of detecting all the objects in a frame in a single pass (segmentation.ColorSegmentation).
+    :param image: the image of the frame.
+    :param objects: the ObjectInFrames to detect.
+    :param tracked: whether the objects are tracked (searched around their last location) or lost (full frame search).
+    :return: the mean time of detecting all the objects in one frame in milliseconds.
+    """
+    segmentation = ColorSegmentation([])
+    distances = [OBJECT_DISTANCE] * len(objects)
+    total = 0
+    for _ in range(REPEATS):
+        if tracked:
+            segmentation.detect_side(0, Frame(image), objects, distances)
+        else:
+            for obj in objects:
+                obj.x, obj.y = 0, 0
+        frame = Frame(image)
+        start = time.perf_counter()
+        segmentation.detect_side(0, frame, objects, distances)
+        total += time.perf_counter() - start
+    return total / REPEATS * 1000
+
+
+def time_reacquisition(image, objects, pyramid_scale):
+    """
+    Measures the time of detecting lost objects in a frame, and the time of each level of the detection.
+    :param image: the image of the frame.
+    :param objects: the ObjectInFrames to detect.
+    :param pyramid_scale: the pyramid scale of the search (1 for the full frame search).
+    :return: the mean time of detecting all the objects in one frame in milliseconds,
+             and a dictionary of the mean time of each level in milliseconds.
+    """
+    total = 0
+    levels = {}
+    for _ in range(REPEATS):
+        frame = Frame(image)
+        start = time.perf_counter()
+        for obj in objects:
+            obj.x, obj.y = 0, 0
+            obj.pyramid_scale = pyramid_scale
+            obj.set_frame(frame)
+            obj.detect_pixel_coordinates(OBJECT_DISTANCE)
+            for level, level_time in obj.timings.items():
+                levels[level] = levels.get(level, 0) + level_time
+        total += time.perf_counter() - start
+    return total / REPEATS * 1000, {level: level_time / REPEATS * 1000 for level, level_time in levels.items()}
+
+
+def synthetic_recognizable_objects(n_objects):
+    """
+    :param n_objects: the number of objects.
+    :return: a list of RecognizableObjects with the color bounds of the synthetic objects on both sides.
+    """
+    recognizable_objects = []
+    for i, (left, right) in enumerate(zip(synthetic_objects(n_objects), synthetic_objects(n_objects))):
+        recognizable_object = RecognizableObject((255, 255, 255), "object" + str(i))
+        recognizable_object.frame_left, recognizable_object.frame_right = left, right
+        recognizable_objects.append(recognizable_object)
+    return recognizable_objects
+
+
+def time_executor(n_objects, tracked, parallel):
+    """
+    Measures the time of detecting the objects in a stereo pair with a DetectionExecutor.
+    :param n_objects: the number of objects.
+    :param tracked: whether the objects are tracked (searched around their last location) or lost.
+    :param parallel: whether the executor detects in parallel.
+    :return: the mean time of detecting all the objects in one pair in milliseconds,
+             and the real life coordinates of the objects in the last pair.
+    """
+    image, _ = synthetic_image(n_objects)
+    left, right = Camera(56, 39, 0), Camera(56, 39, 1)
+    recognizable_objects = synthetic_recognizable_objects(n_objects)
+    executor = DetectionExecutor(recognizable_objects, parallel)
+    total = 0
+    for _ in range(REPEATS):
+        # the right camera sees the objects shifted, as if they were in front of the cameras
+        left.last_capture, right.last_capture = Frame(image), Frame(np.roll(image, -100, axis=1))
+        if not tracked:
+            for recognizable_object in recognizable_objects:
+                recognizable_object.frame_left.x = recognizable_object.frame_right.x = 0
+        executor.detect_and_set_coordinates(left, right, CAMERAS_DISTANCE)
+        total += executor.last_detection_time
+    executor.shutdown()
+    return total / REPEATS * 1000, [(obj.x, obj.y, obj.z) for obj in recognizable_objects]
+
+
+def check_detection(objects, locations):
+    """
+    Checks the objects were detected in their locations.
+    :param objects: the detected ObjectInFrames.
+    :param locations: the pixel locations of the objects.
+    """
+    for obj, location in zip(objects, locations):
+        assert abs(obj.x - location[0]) <= DETECTION_TOLERANCE and abs(obj.y - location[1]) <= DETECTION_TOLERANCE
+
+
+def main():
+    """
+    A benchmark of the detection time of all the objects in a frame for 1, 3 and 6 objects,
+    comparing a shared HSV conversion per frame to a conversion per object, and to a single pass segmentation.
+    Then compares the time of reacquiring lost objects in the full frame to a coarse to fine search,
+    and the time of detecting the objects in a stereo pair serially to detecting them in parallel.
+    """
+    print("objects | mode    | per object (ms) | shared (ms) | single pass (ms)")
+    for n_objects in (1, 3, 6):
+        image, locations = synthetic_image(n_objects)
+        for tracked in (True, False):
+            objects = synthetic_objects(n_objects)
+            single_pass_time = time_single_pass(image, objects, tracked)
+            check_detection(objects, locations)
+            objects = synthetic_objects(n_objects)
+            separate_time = time_detection(image, objects, tracked, shared=False)
+            shared_time = time_detection(image, objects, tracked, shared=True)
+            check_detection(objects, locations)
+            print("{:7d} | {:7s} | {:15.2f} | {:11.2f} | {:16.2f}".format(
+                n_objects, "tracked" if tracked else "lost", separate_time, shared_time, single_pass_time))
+
+    print()
+    print("objects | pyramid scale | total (ms) | levels (ms)")
+    for n_objects in (1, 3, 6):
+        image, locations = synthetic_image(n_objects)
+        for pyramid_scale in (1, 4, 8):
+            objects = synthetic_objects(n_objects)
+            total_time, levels = time_reacquisition(image, objects, pyramid_scale)
+            check_detection(objects, locations)
+            levels_str = ", ".join("{}: {:.2f}".format(level, level_time) for level, level_time in levels.items())
+            print("{:7d} | {:13d} | {:10.2f} | {}".format(n_objects, pyramid_scale, total_time, levels_str))
+
+    print()
+    print("objects | mode    | serial (ms) | parallel (ms)")
+    for n_objects in (1, 3, 6):
+        for tracked in (True, False):
+            serial_time, serial_coordinates = time_executor(n_objects, tracked, parallel=False)
+            parallel_time, parallel_coordinates = time_executor(n_objects, tracked, parallel=True)
+            assert serial_coordinates == parallel_coordinates
+            print("{:7d} | {:7s} | {:11.2f} | {:13.2f}".format(n_objects, "tracked" if tracked else "lost",
+                                                              serial_time, parallel_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import time
+import numpy as np
+import cv2
+
+from gui_renderer import GuiRenderer
+
+IMAGE_SHAPE = (1080, 1920, 3)
+XY_DISPLAY_SHAPE = (512, 512, 3)
+# The scales of the images in the gui (Gui.IMAGE_SCALES, the gui module needs PySimpleGUI).
+IMAGE_SCALES = (67, 33, 33)
+# The number of game loop iterations and the time of the rest of an iteration (detection, prediction, commands).
+ITERATIONS = 60
+ITERATION_TIME = 0.02
+
+
+def synthetic_images():
+    """
+    :return: random images in the sizes of the frames of the cameras and the xy display (the left, right and xy).
+    """
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, IMAGE_SHAPE, dtype=np.uint8), rng.integers(0, 256, IMAGE_SHAPE, dtype=np.uint8),
+            rng.integers(0, 256, XY_DISPLAY_SHAPE, dtype=np.uint8)]
+
+
+def check_encoding(renderer, images):
+    """
+    Checks the rendered images decode back to the downscaled images.
+    :param renderer: the GuiRenderer.
+    :param images: the rendered images.
+    """
+    for encoded, image, scale_percent in zip(renderer.render(images), images, IMAGE_SCALES):
+        decoded = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == (int(image.shape[0] * scale_percent / 100), int(image.shape[1] * scale_percent / 100),
+                                 3)
+
+
+def time_loop(renderer, images):
+    """
+    Measures the time the game loop spends displaying the frames, as in Gui.display_frames_gui.
+    :param renderer: the GuiRenderer.
+    :param images: the images to display every iteration.
+    :return: the mean time of displaying in an iteration in milliseconds, and the number of displayed frames.
+    """
+    renderer.start()
+    total, displayed = 0, 0
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        if renderer.due():
+            renderer.submit(images)
+        if renderer.take_rendered():
+            displayed += 1
+        total += time.perf_counter() - start
+        time.sleep(ITERATION_TIME)
+    renderer.stop()
+    return total / ITERATIONS * 1000, displayed
+
+
+def main():
+    """
+    A benchmark of the time of rendering the frames of the gui (downscaling and encoding) in PNG and PPM,
+    and of the time the game loop spends displaying them when rendering in the loop and in the render thread
+    (with the display FPS limiting the rendered frames).
+    """
+    images = synthetic_images()
+    print("format | asynchronous | render (ms) | loop (ms) | displayed")
+    for image_format in ('.png', '.ppm'):
+        check_encoding(GuiRenderer(IMAGE_SCALES, image_format=image_format), images)
+        for asynchronous in (False, True):
+            renderer = GuiRenderer(IMAGE_SCALES, image_format=image_format, asynchronous=asynchronous)
+            loop_time, displayed = time_loop(renderer, images)
+            print("{:6s} | {:12s} | {:11.2f} | {:9.2f} | {:3d}/{:d}".format(
+                image_format, "yes" if asynchronous else "no", renderer.mean_render_time * 1000, loop_time,
+                displayed, ITERATIONS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import tempfile
+import time
+import numpy as np
+from scipy.integrate import odeint
+
+from prediction import NumericBallPredictor
+from ensemble_prediction import EnsembleBallPredictor
+from trajectory_table import TrajectoryTable
+
+# The number of random balloon states to benchmark on.
+NUM_OF_SAMPLES = 200
+# The bounds of the criteria of the optimal hitting point (as in the SEARCHING_PREDICTION state).
+XY_VEL_BOUND = 30 / 100
+# The precision of the time of the reference optimal hitting point.
+REFERENCE_PRECISION = 1e-4
+END_TIME = 3
+# The standard deviation of the velocity of the ensembles in cm/s.
+VELOCITY_STD = 20
+# The bounds of the random initial velocities the trajectory table is checked on in cm/s (inside its grid).
+MAX_TABLE_XY_VELOCITY = 500
+MAX_TABLE_Z_VELOCITY = 500
+# The times the predictions of the trajectory table are compared at.
+TABLE_TIMES = np.arange(0, 3.001, 0.01)
+
+
+class Balloon:
+    """
+    The state of a balloon in the format of RecognizableObject.
+    """
+
+    def __init__(self, x, y, z, vx, vy, vz):
+        self.time = 0
+        self.x, self.y, self.z = x, y, z
+        self.vx, self.vy, self.vz = vx, vy, vz
+
+
+def random_balloons():
+    """
+    :return: a list of random balloon states thrown upwards, and the height bound of the hitting point of each.
+    """
+    rng = np.random.default_rng(0)
+    balloons = []
+    for _ in range(NUM_OF_SAMPLES):
+        balloon = Balloon(rng.uniform(-100, 100), rng.uniform(100, 400), rng.uniform(-50, 100),
+                          rng.uniform(-200, 200), rng.uniform(-200, 200), rng.uniform(50, 400))
+        balloons.append((balloon, rng.uniform(-80, balloon.z) / 100))
+    return balloons
+
+
+def odeint_solution(predictor, times):
+    """
+    Solves the balloon's ODE with odeint (as the predictor did before the trajectory).
+    :param predictor: the NumericBallPredictor of the balloon.
+    :param times: the times to solve at (starting from 0).
+    :return: the solutions of the ODE at the times.
+    """
+    return odeint(NumericBallPredictor._derivative_func,
+                  np.array([predictor.v_xy_0, predictor.v_z_0, 0, predictor.z_0]), times,
+                  args=(predictor.B, predictor.m, predictor.rho, predictor.V, predictor.g))
+
+
+def two_pass_scan(predictor, solve, z_bound, time_precision=0.01):
+    """
+    The optimal hitting point by a coarse scan of the times and a second scan at 10 times the precision
+    (get_optimal_hitting_point before the root finding).
+    :param predictor: the NumericBallPredictor of the balloon.
+    :param solve: a function solving the ODE of the predictor at times (starting from 0).
+    :param z_bound: the bound on the height.
+    :param time_precision: the precision of the time of the optimal hitting point.
+    :return: the time and location of the optimal hitting point, or (0, (0, 0, 0)).
+    """
+    def legal_hitting_points(times):
+        preds = solve(predictor, np.insert(times, 0, 0))[1:]
+        mask = np.all([preds[:, 3] >= z_bound, np.abs(preds[:, 0]) <= XY_VEL_BOUND], axis=0)
+        return times[mask], preds[mask]
+
+    jump = 10 * time_precision
+    times, preds = legal_hitting_points(np.arange(0, END_TIME + jump / 2, jump))
+    if len(preds) == 0:
+        return 0, (0, 0, 0)
+    if times[0] == 0:
+        return 0, predictor._solution_to_coords(preds)[:, 0]
+    new_jump = jump / 10
+    times, preds = legal_hitting_points(np.arange(times[0] - jump, times[0] + new_jump / 2, new_jump))
+    return times[0], predictor._solution_to_coords(preds)[:, 0]
+
+
+def reference_hitting_time(predictor, z_bound):
+    """
+    :param predictor: the NumericBallPredictor of the balloon.
+    :param z_bound: the bound on the height.
+    :return: the time of the optimal hitting point by a dense scan of an accurate odeint solution (None if there is not).
+    """
+    times = np.arange(0, END_TIME + REFERENCE_PRECISION / 2, REFERENCE_PRECISION)
+    sol = odeint(NumericBallPredictor._derivative_func,
+                 np.array([predictor.v_xy_0, predictor.v_z_0, 0, predictor.z_0]), times,
+                 args=(predictor.B, predictor.m, predictor.rho, predictor.V, predictor.g), rtol=1e-10, atol=1e-12)
+    legal = np.flatnonzero((sol[:, 3] >= z_bound) & (np.abs(sol[:, 0]) <= XY_VEL_BOUND))
+    return times[legal[0]] if len(legal) else None
+
+
+def time_method(method, balloons):
+    """
+    Measures the latency and the error of a method of finding the optimal hitting point.
+    :param method: a function of a balloon and a height bound returning the time of the optimal hitting point.
+    :param balloons: the balloon states and height bounds.
+    :return: the mean latency in milliseconds, and the mean and max error of the time in milliseconds.
+    """
+    total, errors = 0, []
+    for balloon, z_bound in balloons:
+        start = time.perf_counter()
+        hitting_time, coordinates = method(balloon, z_bound)
+        total += time.perf_counter() - start
+        reference = reference_hitting_time(NumericBallPredictor(balloon), z_bound)
+        if reference is not None and np.any(coordinates):
+            errors.append(abs(hitting_time - reference))
+    return total / len(balloons) * 1000, np.mean(errors) * 1000, np.max(errors) * 1000
+
+
+def table_balloons():
+    """
+    :return: a list of random balloon states (inside the grid of the trajectory table).
+    """
+    rng = np.random.default_rng(0)
+    balloons = []
+    for _ in range(NUM_OF_SAMPLES):
+        velocity_xy = rng.uniform(0, MAX_TABLE_XY_VELOCITY)
+        direction = rng.uniform(-np.pi, np.pi)
+        balloons.append(Balloon(rng.uniform(-100, 100), rng.uniform(100, 400), rng.uniform(-50, 150),
+                                velocity_xy * np.cos(direction), velocity_xy * np.sin(direction),
+                                rng.uniform(-MAX_TABLE_Z_VELOCITY, MAX_TABLE_Z_VELOCITY)))
+    return balloons
+
+
+def time_table(table, balloons):
+    """
+    Measures the latency of creating a predictor and predicting its trajectory at TABLE_TIMES, and the error of the
+    predictions compared to an accurate odeint solution.
+    :param table: the TrajectoryTable to interpolate the trajectories from, None to integrate them.
+    :param balloons: the balloon states.
+    :return: the mean latency of creating the predictor and of the predictions in milliseconds,
+             and the max error in centimeters.
+    """
+    NumericBallPredictor.table = table
+    creation, prediction, max_error = 0, 0, 0
+    for balloon in balloons:
+        start = time.perf_counter()
+        predictor = NumericBallPredictor(balloon)
+        created = time.perf_counter()
+        coordinates = predictor._solution_to_coords(predictor._prepare_predictions(TABLE_TIMES))
+        end = time.perf_counter()
+        creation += created - start
+        prediction += end - created
+        reference = odeint(NumericBallPredictor._derivative_func,
+                           np.array([predictor.v_xy_0, predictor.v_z_0, 0, predictor.z_0]), TABLE_TIMES,
+                           args=(predictor.B, predictor.m, predictor.rho, predictor.V, predictor.g),
+                           rtol=1e-10, atol=1e-12)
+        max_error = max(max_error, np.abs(coordinates - predictor._solution_to_coords(reference)).max())
+    NumericBallPredictor.table = None
+    return creation / len(balloons) * 1000, prediction / len(balloons) * 1000, max_error
+
+
+def time_ensemble(balloons, num_of_samples):
+    """
+    Measures the time of predicting with an ensemble as in a frame (creating it, a prediction and a hitting point).
+    :param balloons: the balloon states and height bounds.
+    :param num_of_samples: the number of members in the ensemble.
+    :return: the mean time in milliseconds, and the mean spread of the time (ms) and the height (cm) of the hitting point.
+    """
+    rng = np.random.default_rng(0)
+    total, time_spreads, z_spreads = 0, [], []
+    for balloon, z_bound in balloons:
+        start = time.perf_counter()
+        ensemble = EnsembleBallPredictor(balloon, num_of_samples, (VELOCITY_STD,) * 3, rng)
+        ensemble.get_prediction(0.85)
+        _, _, spread, fraction = ensemble.get_optimal_hitting_point(end_time=END_TIME, xy_vel_bound=XY_VEL_BOUND,
+                                                                    z_bound=z_bound)
+        total += time.perf_counter() - start
+        if fraction:
+            time_spreads.append(spread[0] * 1000)
+            z_spreads.append(spread[3])
+    return total / len(balloons) * 1000, np.mean(time_spreads), np.mean(z_spreads)
+
+
+def main():
+    """
+    A benchmark of the latency and accuracy of finding the optimal hitting point of random balloon states:
+    a two pass scan of odeint solutions (the original predictor), a two pass scan of the trajectory,
+    and root finding on the trajectory (get_optimal_hitting_point) with the default and a fine precision.
+    The errors are of the time compared to a dense scan of an accurate solution (up to its 0.1 ms precision).
+    Then checks the trajectories interpolated from the trajectory table (saved and memory mapped) are within its
+    error bound of odeint and faster to create than the integrated ones, and measures the time of predicting with
+    ensembles of several sizes, with trajectories integrated and interpolated from the table.
+    """
+    balloons = random_balloons()
+    methods = {
+        "two pass scan, odeint": lambda balloon, z_bound: two_pass_scan(
+            NumericBallPredictor(balloon), odeint_solution, z_bound),
+        "two pass scan, trajectory": lambda balloon, z_bound: two_pass_scan(
+            NumericBallPredictor(balloon), lambda predictor, times: predictor._prepare_predictions(times), z_bound),
+        "root finding, 10 ms": lambda balloon, z_bound: NumericBallPredictor(balloon).get_optimal_hitting_point(
+            end_time=END_TIME, xy_vel_bound=XY_VEL_BOUND, z_bound=z_bound),
+        "root finding, 1 us": lambda balloon, z_bound: NumericBallPredictor(balloon).get_optimal_hitting_point(
+            end_time=END_TIME, time_precision=1e-6, xy_vel_bound=XY_VEL_BOUND, z_bound=z_bound),
+    }
+    print("method                    | latency (ms) | mean error (ms) | max error (ms)")
+    for name, method in methods.items():
+        latency, mean_error, max_error = time_method(method, balloons)
+        print("{:25s} | {:12.3f} | {:15.3f} | {:14.3f}".format(name, latency, mean_error, max_error))
+
+    print()
+    print("trajectory   | predictor (ms) | {} predictions (ms) | max error (cm)".format(len(TABLE_TIMES)))
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "trajectory_table.npy")
+        TrajectoryTable.generate().save(filename)
+        table = TrajectoryTable.load(filename)
+        results = {name: time_table(trajectory_table, table_balloons())
+                   for name, trajectory_table in (("integrated", None), ("from table", table))}
+        del table
+    for name, (creation_time, prediction_time, max_error) in results.items():
+        print("{:12s} | {:14.3f} | {:20.3f} | {:14.3f}".format(name, creation_time, prediction_time, max_error))
+    assert results["from table"][2] <= TrajectoryTable.ERROR_BOUND
+    assert results["from table"][0] < results["integrated"][0]
+
+    print()
+    print("members | table | frame (ms) | time spread (ms) | height spread (cm)")
+    for table in (None, TrajectoryTable.generate()):
+        NumericBallPredictor.table = table
+        for num_of_samples in (16, 64, 256):
+            frame_time, time_spread, z_spread = time_ensemble(balloons, num_of_samples)
+            print("{:7d} | {:5s} | {:10.2f} | {:16.1f} | {:18.1f}".format(
+                num_of_samples, "yes" if table else "no", frame_time, time_spread, z_spread))
+    NumericBallPredictor.table = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import numpy as np
+
+from recognizable_object import RecognizableObject
+from state_estimation import ConstantAccelerationKF, BalloonEKF
+from utils.consts import FLOOR_HEIGHT
+
+# The frame rate of the cameras.
+FPS = 30
+# The standard deviation of the measured coordinates in cm.
+MEASUREMENT_STD = 3
+# The time the objects are tracked before they are lost, and the time they are lost for, in seconds.
+TRACKED_TIME = 2
+DROPOUT_TIME = 5
+
+
+def drone_coordinates(time):
+    """
+    :param time: a time in seconds.
+    :return: the (x, y, z) coordinates of a drone hovering in circles.
+    """
+    return np.array([80 + 20 * np.sin(time), 200 + 20 * np.cos(time), -40 + 5 * np.sin(2 * time)])
+
+
+def balloon_coordinates(time):
+    """
+    :param time: a time in seconds.
+    :return: the (x, y, z) coordinates of a balloon thrown upwards (before it falls).
+    """
+    return np.array([30 * time, 250 - 20 * time, 60 * time - 40 * time ** 2])
+
+
+def track_with_dropout(recognizable_object, coordinates, rng):
+    """
+    Updates an object with noisy measurements, and then with frames in which it is not detected.
+    :param recognizable_object: the RecognizableObject.
+    :param coordinates: a function of the real coordinates of the object by the time.
+    :param rng: the random generator of the noise.
+    :return: the last measured coordinates, and the (x, y, z) coordinates and (vx, vy, vz) velocity of the object
+             after the dropout (its reported and extrapolated to a command 100 ms later).
+    """
+    times = np.arange(0, TRACKED_TIME, 1 / FPS)
+    measured = None
+    for time in times:
+        measured = coordinates(time) + rng.normal(0, MEASUREMENT_STD, 3)
+        recognizable_object.update(time, measured)
+    for time in np.arange(TRACKED_TIME, TRACKED_TIME + DROPOUT_TIME, 1 / FPS):
+        recognizable_object.update(time, None)
+    reported = np.array([recognizable_object.x, recognizable_object.y, recognizable_object.z])
+    extrapolated, _ = recognizable_object.state_at(recognizable_object.time + 0.1)
+    return measured, reported, np.array(extrapolated), \
+        np.array([recognizable_object.vx, recognizable_object.vy, recognizable_object.vz])
+
+
+def main():
+    """
+    Checks the states of the objects estimated by the Kalman filters through a long dropout of the detection:
+    a lost object is held at its last measured state instead of being predicted away (as a drone drifting off or
+    a balloon falling through the floor).
+    """
+    rng = np.random.default_rng(0)
+    for name, estimator, coordinates in (("drone", ConstantAccelerationKF(), drone_coordinates),
+                                         ("balloon", BalloonEKF(), balloon_coordinates)):
+        recognizable_object = RecognizableObject((0, 0, 0), name)
+        recognizable_object.estimator = estimator
+        measured, reported, extrapolated, velocity = track_with_dropout(recognizable_object, coordinates, rng)
+        print("{}: last measured ({:.0f}, {:.0f}, {:.0f}), after a {} s dropout ({:.0f}, {:.0f}, {:.0f}), "
+              "velocity ({:.0f}, {:.0f}, {:.0f})".format(name, *measured, DROPOUT_TIME, *reported, *velocity))
+        assert not recognizable_object.object_exists
+        assert np.all(np.abs(reported - measured) < 5 * MEASUREMENT_STD)
+        assert np.allclose(extrapolated, reported)
+        assert reported[2] > FLOOR_HEIGHT
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import numpy as np
 import cv2
 
 from frame import Frame
+from utils.time_utils import now
 
 
 class Camera:
@@ -24,6 +25,11 @@ class Camera:
         self.is_flipped = is_flipped
         self.vid = None
         self.last_capture = None
+        self.grab_time = 0
+        # Lookup tables of the pixels rays, calculated once per resolution (see get_rays).
+        self._tables_resolution = None
+        self._focal_horz = self._focal_vert = 0
+        self._ray_x = self._ray_z = None
 
     def __str__(self):
         """
@@ -33,20 +39,81 @@ class Camera:
         n_pix_str = "{:.0f},{:.0f}".format(self.last_capture.x_n_pix, self.last_capture.z_n_pix) if self.last_capture else ""
         return fov_str + n_pix_str + '\n'
 
+    def _open(self):
+        """
+        Initializes the video capture of the camera if it is not yet set.
+        """
+        if not self.vid:
+            self.vid = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+
     def capture(self):
         """
         Capture an image from the camera and save it as a Frame. if the video capture is not yet set - initialize it.
         :return: whether the capture succeeded or not.
         """
-        if not self.vid:
-            self.vid = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
-        ret, image = self.vid.read()
-        if not ret:
+        if not self.grab():
+            return False
+        frame = self.retrieve()
+        if frame is None:
             return False
-        self.last_capture = Frame(image)
+        self.last_capture = frame
 
         return True
 
+    def grab(self):
+        """
+        Grabs the next image from the camera without decoding it (so the grabs of both cameras can be synchronized).
+        If the video capture is not yet set - initialize it.
+        :return: whether the grab succeeded or not.
+        """
+        self._open()
+        grabbed = self.vid.grab()
+        self.grab_time = now()
+        return grabbed
+
+    def retrieve(self):
+        """
+        Decodes the last grabbed image of the camera, the Frame is stamped with the time of the grab.
+        The Frame is not saved as the last capture, it is up to the caller to do so.
+        :return: the Frame of the grabbed image, or None if the decoding failed.
+        """
+        ret, image = self.vid.retrieve()
+        if not ret:
+            return None
+        return Frame(image, self.grab_time)
+
+    def _update_tables(self):
+        """
+        Calculates the focal lengths and the rays lookup tables if the resolution of the last capture is new.
+        """
+        resolution = (self.last_capture.x_n_pix, self.last_capture.z_n_pix)
+        if resolution == self._tables_resolution:
+            return
+        x_n_pix, z_n_pix = resolution
+        self._focal_horz = x_n_pix / 2 / np.tan(self.fov_horz / 2)
+        self._focal_vert = z_n_pix / 2 / np.tan(self.fov_vert / 2)
+        self._ray_x = (np.arange(x_n_pix) - x_n_pix / 2) / self._focal_horz
+        self._ray_z = (z_n_pix / 2 - np.arange(z_n_pix)) / self._focal_vert
+        self._tables_resolution = resolution
+
+    def get_focal_lengths(self):
+        """
+        :return: the horizontal and vertical focal lengths of the camera in pixels, for the resolution of the last capture.
+        """
+        self._update_tables()
+        return self._focal_horz, self._focal_vert
+
+    def get_rays(self):
+        """
+        Returns lookup tables of the rays of the pixels of the camera, for the resolution of the last capture.
+        The ray of a column is the tangent of its horizontal angle from the center of the frame (positive to the right),
+        and the ray of a row is the tangent of its vertical angle from the center of the frame (positive upwards).
+        The tables do not consider the flip of the camera.
+        :return: the rays of the columns and the rays of the rows.
+        """
+        self._update_tables()
+        return self._ray_x, self._ray_z
+
     def release(self):
         """
         Release the video capture of the camera.
@@ -0,0 +1,84 @@
+import socket
+import sys
+
+
+class ControlSocket:
+    """
+    A class receiving the commands of the user from a local UDP socket, for running the game loops headless
+    (without the keyboard of the OpenCV windows and the buttons of the gui).
+    Every datagram is a command: the key or the gui event to trigger (as in the interactive loops, e.g. 'q' or
+    'Start Play'), optionally followed by values of the gui in the format 'key=value' separated by ';'
+    (e.g. 'received_input;distance=110'). Reading is non-blocking, so the game loop never waits for commands.
+    Commands can be sent by a script with ControlSocket.send, or from the shell:
+    python control_socket.py <command> [<command> ...]
+    """
+    HOST = "127.0.0.1"
+    PORT = 9000
+    # The maximal size of a command in bytes.
+    BUFFER_SIZE = 1024
+    # The value of cv2.waitKey(1) & 0xFF when no key was pressed.
+    NO_KEY = 0xFF
+    # The event read when there is no command (as the timeout event of a PySimpleGUI window).
+    TIMEOUT_EVENT = '__TIMEOUT__'
+
+    def __init__(self, port=PORT, host=HOST):
+        """
+        Opens the socket.
+        :param port: the port to receive the commands on.
+        :param host: the address to receive the commands on (local only by default).
+        """
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(self.address)
+        self.socket.setblocking(False)
+        self.commands = 0
+
+    def close(self):
+        """
+        Closes the socket.
+        """
+        self.socket.close()
+
+    def read(self):
+        """
+        Reads the next command, if there is.
+        :return: the event of the command (TIMEOUT_EVENT if there is no command) and a dictionary of its values
+                 ('True' and 'False' are converted to booleans, the rest of the values are strings).
+        """
+        try:
+            data = self.socket.recv(ControlSocket.BUFFER_SIZE)
+        except (BlockingIOError, ConnectionError):
+            return ControlSocket.TIMEOUT_EVENT, {}
+        self.commands += 1
+        event, *pairs = data.decode(errors="replace").strip().split(";")
+        values = {}
+        for pair in pairs:
+            key, _, value = pair.partition("=")
+            values[key.strip()] = {"True": True, "False": False}.get(value.strip(), value.strip())
+        return event, values
+
+    def read_key(self):
+        """
+        Reads the next command as a key, as cv2.waitKey(1) & 0xFF (for the loops controlled with the keyboard).
+        :return: the key code of a single character command, or NO_KEY if there is no such command.
+        """
+        event, _ = self.read()
+        if len(event) != 1:
+            return ControlSocket.NO_KEY
+        return ord(event)
+
+    @staticmethod
+    def send(command, port=PORT, host=HOST):
+        """
+        Sends a command to a game loop.
+        :param command: the command (see ControlSocket).
+        :param port: the port of the game loop's control socket.
+        :param host: the address of the game loop's control socket.
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            sender.sendto(command.encode(), (host, port))
+
+
+if __name__ == "__main__":
+    for argument in sys.argv[1:]:
+        ControlSocket.send(argument)
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from camera import Camera
+from stereo_rig import StereoRig
+
+
+class DetectionExecutor:
+    """
+    A class detecting the recognizable objects in the frames of both cameras.
+    The detection of every (object, side) pair is independent, so when running in parallel they are all
+    submitted to a thread pool (OpenCV releases the GIL, so the detections run concurrently).
+    All the detections are joined before the real life coordinates of all the objects are calculated together,
+    so the results are the same as in a serial run.
+    """
+
+    def __init__(self, recognizable_objects, parallel=True, max_workers=None):
+        """
+        Initializes the detection executor.
+        :param recognizable_objects: a list of the RecognizableObjects to detect.
+        :param parallel: whether to detect in parallel or serially (in the calling thread).
+        :param max_workers: the number of threads in the pool (by default a thread per (object, side) pair).
+        """
+        self.recognizable_objects = recognizable_objects
+        self.parallel = parallel
+        self.stereo_rig = StereoRig()
+        self._pool = None
+        if parallel and (max_workers or recognizable_objects):
+            self._pool = ThreadPoolExecutor(max_workers or 2 * len(recognizable_objects),
+                                            thread_name_prefix="detection")
+        # The time (in seconds) of the detection of all the objects in the last frame.
+        self.last_detection_time = 0
+
+    def detect_and_set_coordinates(self, left: Camera, right: Camera, d):
+        """
+        Detects and sets the real life coordinates and velocity of all the objects.
+        :param left: the left camera's Camera object.
+        :param right: the right camera's Camera object.
+        :param d: the distance between the cameras
+        """
+        start = time.perf_counter()
+        detections = []
+        for recognizable_object in self.recognizable_objects:
+            recognizable_object.set_frames(left.last_capture, right.last_capture)
+            # The distance from the cameras is taken before any coordinates of this frame are set.
+            detections.append((recognizable_object.frame_left, recognizable_object.y))
+            detections.append((recognizable_object.frame_right, recognizable_object.y))
+
+        if self._pool:
+            futures = [self._pool.submit(side.detect_pixel_coordinates, distance) for side, distance in detections]
+            # Join all the detections (and raise their errors) before calculating the coordinates.
+            for future in futures:
+                future.result()
+        else:
+            for side, distance in detections:
+                side.detect_pixel_coordinates(distance)
+        self.last_detection_time = time.perf_counter() - start
+
+        self.stereo_rig.set_coordinates(self.recognizable_objects, left, right, d)
+
+    def shutdown(self):
+        """
+        Stops the threads of the pool.
+        """
+        if self._pool:
+            self._pool.shutdown()
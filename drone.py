@@ -1,13 +1,13 @@
-from datetime import datetime
 import numpy as np
 
-from utils.consts import DRONE_DEFAULT_HEIGHT
+from utils.consts import DRONE_DEFAULT_HEIGHT, ASYNC_TELLO
+from utils.time_utils import now
 from obstacle import Obstacle
 from recognizable_object import RecognizableObject
 # from loop_state_machine_human_drone import ON_GROUND
 # from loop_state_machine_passive_test import ON_GROUND
 from loop_state_machine_two_drones_volleyball import ON_GROUND
-from tello_drone_control import TelloDroneControl
+from tello_drone_control import TelloDroneControl, AsyncTelloDroneControl
 
 
 class Drone:
@@ -26,7 +26,7 @@ class Drone:
         :param iface_ip: the ip of the interface that connects to the specific drone.
         """
         self.recognizable_object = RecognizableObject(text_color, "drone" + str(ident))
-        self.drone_control = TelloDroneControl(iface_ip)
+        self.drone_control = AsyncTelloDroneControl(iface_ip) if ASYNC_TELLO else TelloDroneControl(iface_ip)
         self.home = (0, 0)
         self.ident = ident
         self.tookoff = self.start = self.active = False
@@ -123,6 +123,12 @@ class Drone:
         """
         self.drone_control.stop()
 
+    def close(self):
+        """
+        Releases the drone's controller (after landing).
+        """
+        self.drone_control.close()
+
     def start_track(self):
         """
         Sets the drone to start tracking, and it's initial xy coordinates.
@@ -143,7 +149,7 @@ class Drone:
         """
         Resets the search prediction parameters of the drone.
         """
-        self.drone_search_pred_time = datetime.now()
+        self.drone_search_pred_time = now()
         self.drone_search_pred_coords = (self.x, self.y, self.z)
         self.old_dest_coords = np.zeros((0, 3))
 
@@ -151,7 +157,7 @@ class Drone:
         """
         Resets the hitting parameters of the drone.
         """
-        self.start_hit_timer = datetime.now()
+        self.start_hit_timer = now()
         self.start_hit_vx = self.vx
         self.start_hit_vy = self.vy
         print("hit v0: ({:.0f}, {:.0f})".format(self.vx, self.vy))
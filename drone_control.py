@@ -1,11 +1,51 @@
 import numpy as np
 
+from latency_histogram import LatencyHistogram
+from utils.time_utils import now
+
 
 class DroneControl:
     """
     A base class for controlling a drone.
+    The commands are calculated from the state of the drone at the time they are sent: the time from the capture of
+    the frames the state was measured in to the command (the latency) is measured for every command, and if latency
+    compensation is on the state is extrapolated by it.
     """
 
+    def __init__(self, latency_compensation=True):
+        """
+        Initializes the drone controller.
+        :param latency_compensation: whether to extrapolate the state of the drone to the time of the commands.
+        """
+        self.latency_compensation = latency_compensation
+        # The latencies from the capture of the frames to the commands.
+        self.latency = LatencyHistogram("capture to command")
+        # A function called with every rc command sent to the drone (e.g. by session_recording.SessionRecorder).
+        self.command_listener = None
+
+    def _current_state(self, recognizable_object):
+        """
+        Returns the state of the drone at the time of the command (now), and adds its latency to the histogram.
+        :param recognizable_object: the drones RecognizableObject.
+        :return: the (x, y, z) coordinates and (vx, vy, vz) velocity of the drone.
+        """
+        command_time = now()
+        if recognizable_object.time:
+            self.latency.add(command_time - recognizable_object.time)
+            return self._state_at(recognizable_object,
+                                  command_time if self.latency_compensation else recognizable_object.time)
+        return (recognizable_object.x, recognizable_object.y, recognizable_object.z), \
+            (recognizable_object.vx, recognizable_object.vy, recognizable_object.vz)
+
+    def _state_at(self, recognizable_object, time):
+        """
+        Estimates the state of the drone at a time (a subclass may fuse the drone's own telemetry).
+        :param recognizable_object: the drones RecognizableObject.
+        :param time: the time to estimate the state at.
+        :return: the (x, y, z) coordinates and (vx, vy, vz) velocity of the drone at the time.
+        """
+        return recognizable_object.state_at(time)
+
     def connect(self):
         """
         Initializes the connection to the drone.
@@ -30,6 +70,12 @@ class DroneControl:
         """
         raise NotImplemented
 
+    def close(self):
+        """
+        Releases the resources of the controller (e.g. its threads), after the drone landed.
+        """
+        pass
+
     def track_descending(self, dest_x, dest_y, recognizable_object):
         """
         Uses the RecognizableObject of the drone to track the inputted destination while descending.
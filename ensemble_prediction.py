@@ -0,0 +1,132 @@
+import numpy as np
+
+from balloon_trajectory import BalloonTrajectory
+from prediction import NumericBallPredictor
+from recognizable_object import RecognizableObject
+
+
+class EnsembleBallPredictor:
+    """
+    A predictor of the balloon's location that accounts for the uncertainty of its measured velocity.
+    An ensemble of initial velocities is sampled around the measured velocity (with its standard deviation, see
+    RecognizableObject.velocity_std), and the trajectories of all the members are interpolated from the trajectory
+    table (or integrated with RK4 if there is no table) together, so all the predictions of all the members at all
+    the times are single array operations.
+    The predictions are returned as the mean and the spread (standard deviation) over the members.
+    """
+    NUM_OF_SAMPLES = 64
+    # The standard deviation of the velocity in cm/s, when the balloon's can not be estimated.
+    DEFAULT_VELOCITY_STD = 20
+    # The maximal step of the trajectories in seconds (coarser than a single trajectory to save time).
+    STEP = 0.05
+
+    def __init__(self, balloon: RecognizableObject, num_of_samples=NUM_OF_SAMPLES, velocity_std=None, rng=None):
+        """
+        Samples the initial velocities of the ensemble and calculates their trajectories.
+        :param balloon: the object representing the balloon.
+        :param num_of_samples: the number of members in the ensemble.
+        :param velocity_std: the (vx, vy, vz) standard deviation of the velocity in cm/s,
+                             the balloon's estimated standard deviation by default.
+        :param rng: the numpy random Generator to sample with.
+        """
+        rng = rng or np.random.default_rng()
+        if velocity_std is None:
+            velocity_std = balloon.velocity_std()
+        if velocity_std is None:
+            velocity_std = (self.DEFAULT_VELOCITY_STD,) * 3
+        self.time = balloon.time
+        self.x_0 = balloon.x / 100
+        self.y_0 = balloon.y / 100
+        self.z_0 = balloon.z / 100
+        # the velocities of the members (in m/s)
+        self.velocities = (np.array([balloon.vx, balloon.vy, balloon.vz])
+                           + np.asarray(velocity_std) * rng.standard_normal((num_of_samples, 3))) / 100
+        self.phi = np.arctan2(self.velocities[:, 1], self.velocities[:, 0])
+        v_xy_0 = np.hypot(self.velocities[:, 0], self.velocities[:, 1])
+        v_z_0 = self.velocities[:, 2]
+        self.trajectory = None
+        if NumericBallPredictor.table is not None:
+            self.trajectory = NumericBallPredictor.table.trajectory(v_xy_0, v_z_0, self.z_0, NumericBallPredictor.DRAG,
+                                                                    NumericBallPredictor.ACCELERATION, self.STEP)
+        if self.trajectory is None:
+            self.trajectory = BalloonTrajectory(v_xy_0, v_z_0, self.z_0, NumericBallPredictor.DRAG,
+                                                NumericBallPredictor.ACCELERATION, step=self.STEP)
+
+    def _solution_to_coords(self, sol):
+        """
+        Transform solutions of the ODE of all the members back to the original coordinates in centimeters.
+        :param sol: the solutions of the ODE, an array of shape (..., 4, members).
+        :return: the (x, y, z) coordinates of the solutions, an array of shape (..., members, 3).
+        """
+        d_xy, z = sol[..., 2, :], sol[..., 3, :]
+        return np.stack([self.x_0 + d_xy * np.cos(self.phi), self.y_0 + d_xy * np.sin(self.phi), z], axis=-1) * 100
+
+    def get_predictions(self, times):
+        """
+        Predict the balloon's location of all the members at all the inputted times.
+        :param times: an array of times (0 is the initial time when creating the instance of the predictor).
+        :return: the (x, y, z) coordinates of the members at the times, an array of shape (times, members, 3).
+        """
+        return self._solution_to_coords(self.trajectory.states(times))
+
+    def get_prediction(self, time):
+        """
+        Predict the balloon's location at a certain time.
+        :param time: a time (0 is the initial time when creating the instance of the predictor).
+        :return: the mean and the standard deviation over the members of the (x, y, z) coordinates at the time.
+        """
+        coordinates = self.get_predictions(np.array([time]))[0]
+        return coordinates.mean(axis=0), coordinates.std(axis=0)
+
+    def get_hitting_points(self, start_time=0, end_time=3, xy_vel_bound=5 / 100, z_bound=30 / 100):
+        """
+        Predict the optimal hitting point (see NumericBallPredictor.get_optimal_hitting_point) of every member.
+        The criteria are checked at the steps of the trajectory, and the time they start to be upheld is linearly
+        interpolated between the steps.
+        :param start_time: the start time of the search window for the optimal hitting point.
+        :param end_time: the end time of the search window for the optimal hitting point.
+        :param xy_vel_bound: the bound on the XY plain velocity.
+        :param z_bound: the bound on the height.
+        :return: whether each member has an optimal hitting point in the time window, and the times and the (x, y, z)
+                 coordinates of the optimal hitting points of the members (arrays of shapes (members,), (members, 3)).
+        """
+        step = self.trajectory.step
+        steps = np.arange(np.floor(start_time / step) + 1, np.ceil(end_time / step)) * step
+        times = np.concatenate([[start_time], steps, [end_time]])
+        # the margins of the members at the times, with the variables in the last axis as in a single solution
+        sol = np.moveaxis(self.trajectory.states(times), 1, -1)
+        margins = NumericBallPredictor._hitting_margin(sol, xy_vel_bound, z_bound)
+        legal = margins >= 0
+        has_hit = legal.any(axis=0)
+        first = legal.argmax(axis=0)
+        # where the first legal time is after the start time, interpolate the root of the margin before it
+        members = np.arange(margins.shape[1])
+        before = np.maximum(first - 1, 0)
+        margin_before, margin_after = margins[before, members], margins[first, members]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(first > 0, margin_before / (margin_before - margin_after), 1)
+        hit_times = times[before] + fraction * (times[first] - times[before])
+        # the coordinates of each member at its own time
+        coordinates = self._solution_to_coords(self.trajectory.states_of_each(hit_times).T)
+        return has_hit, hit_times, coordinates
+
+    def get_optimal_hitting_point(self, start_time=0, end_time=3, xy_vel_bound=5 / 100, z_bound=30 / 100):
+        """
+        Predict the optimal hitting point of the ensemble (see get_hitting_points).
+        :param start_time: the start time of the search window for the optimal hitting point.
+        :param end_time: the end time of the search window for the optimal hitting point.
+        :param xy_vel_bound: the bound on the XY plain velocity.
+        :param z_bound: the bound on the height.
+        :return: the mean time, the mean (x, y, z) coordinates and their standard deviations over the members that have
+                 an optimal hitting point, and the fraction of the members that have it in the following format:
+                 (t, (x, y, z), (t std, x std, y std, z std), fraction).
+                 If no member has an optimal hitting point (0, (0, 0, 0), (0, 0, 0, 0), 0) is returned.
+        """
+        if start_time > end_time:
+            return 0, (0, 0, 0), (0, 0, 0, 0), 0
+        has_hit, hit_times, coordinates = self.get_hitting_points(start_time, end_time, xy_vel_bound, z_bound)
+        if not has_hit.any():
+            return 0, (0, 0, 0), (0, 0, 0, 0), 0
+        hit_times, coordinates = hit_times[has_hit], coordinates[has_hit]
+        spread = np.concatenate([[hit_times.std()], coordinates.std(axis=0)])
+        return hit_times.mean(), coordinates.mean(axis=0), spread, has_hit.mean()
@@ -1,4 +1,8 @@
-import datetime
+import threading
+import numpy as np
+import cv2
+
+from utils.time_utils import now
 
 
 class Frame:
@@ -7,16 +11,95 @@ class Frame:
     """
     SEARCH_RANGE_SCALE_A = -0.25
     SEARCH_RANGE_SCALE_B = 140
+    # The number of tiles in each axis the HSV image is converted in.
+    HSV_TILES = 16
+    # The states of a tile of the HSV image.
+    TILE_MISSING, TILE_CONVERTING, TILE_CONVERTED = 0, 1, 2
 
-    def __init__(self, image):
+    def __init__(self, image, capture_time=None):
         """
         Initializes a frame captured from the camera.
         :param image: the image captured.
+        :param capture_time: the time the image was grabbed (from utils.time_utils.now), the current time if not given.
         """
         self.image = image
         self.threshold_size = image.shape[1] // 120
-        self.capture_time = datetime.datetime.now()
+        self.capture_time = now() if capture_time is None else capture_time
         self.x_n_pix, self.z_n_pix = image.shape[1], image.shape[0]
+        self._hsv = np.empty_like(image)
+        self._hsv_tiles = np.full((Frame.HSV_TILES, Frame.HSV_TILES), Frame.TILE_MISSING, dtype=np.uint8)
+        self._tile_width = -(-self.x_n_pix // Frame.HSV_TILES)
+        self._tile_height = -(-self.z_n_pix // Frame.HSV_TILES)
+        self._downscaled_hsv = {}
+        # The objects may be detected in parallel (see DetectionExecutor): the tiles are claimed and published under
+        # this lock, and converted outside of it (a thread waits only for tiles another thread is converting).
+        self._hsv_condition = threading.Condition()
+
+    @property
+    def hsv(self):
+        """
+        :return: the image of the frame in HSV (converted once and shared by all the objects searched in the frame).
+        """
+        return self.get_hsv(0, self.x_n_pix, 0, self.z_n_pix)
+
+    def get_hsv(self, x_min, x_max, y_min, y_max):
+        """
+        Returns a region of the image in HSV.
+        The image is converted in tiles, only tiles that were not converted yet for this frame are converted,
+        so the regions searched by different objects share the conversion. Threads searching overlapping regions
+        convert different tiles concurrently.
+        :param x_min: the first column of the region.
+        :param x_max: the column after the last column of the region.
+        :param y_min: the first row of the region.
+        :param y_max: the row after the last row of the region.
+        :return: the HSV image of the region.
+        """
+        tiles_x = slice(x_min // self._tile_width, -(-x_max // self._tile_width))
+        tiles_y = slice(y_min // self._tile_height, -(-y_max // self._tile_height))
+        with self._hsv_condition:
+            tiles = self._hsv_tiles[tiles_y, tiles_x]
+            claimed = tiles == Frame.TILE_MISSING
+            tiles[claimed] = Frame.TILE_CONVERTING
+        if claimed.any():
+            self._convert_tiles(claimed, tiles_y.start, tiles_x.start)
+            with self._hsv_condition:
+                tiles[claimed] = Frame.TILE_CONVERTED
+                self._hsv_condition.notify_all()
+        if not (tiles == Frame.TILE_CONVERTED).all():
+            with self._hsv_condition:
+                # tiles of the region claimed by other threads
+                self._hsv_condition.wait_for(lambda: (tiles == Frame.TILE_CONVERTED).all())
+        return self._hsv[y_min:y_max, x_min:x_max]
+
+    def _convert_tiles(self, claimed, first_tile_y, first_tile_x):
+        """
+        Converts claimed tiles to HSV, each run of consecutive claimed tiles in a row of tiles at once.
+        :param claimed: a boolean array of the claimed tiles of a region.
+        :param first_tile_y: the row of the first tile of the region.
+        :param first_tile_x: the column of the first tile of the region.
+        """
+        for tile_y, row in enumerate(claimed, first_tile_y):
+            # the starts and ends of the runs of claimed tiles in the row
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row.astype(np.int8), [0]))))
+            rows = slice(tile_y * self._tile_height, (tile_y + 1) * self._tile_height)
+            for start, end in zip(edges[::2] + first_tile_x, edges[1::2] + first_tile_x):
+                cols = slice(start * self._tile_width, end * self._tile_width)
+                self._hsv[rows, cols] = cv2.cvtColor(self.image[rows, cols], cv2.COLOR_BGR2HSV)
+
+    def get_downscaled_hsv(self, scale):
+        """
+        Returns the image of the frame downscaled and in HSV (converted once per scale for this frame).
+        :param scale: the factor the image is downscaled by in each axis.
+        :return: the downscaled HSV image.
+        """
+        downscaled_hsv = self._downscaled_hsv.get(scale)
+        if downscaled_hsv is None:
+            # converted outside the lock (threads asking for a new scale together may both convert it)
+            size = (self.x_n_pix // scale, self.z_n_pix // scale)
+            downscaled = cv2.resize(self.image, size, interpolation=cv2.INTER_AREA)
+            with self._hsv_condition:
+                downscaled_hsv = self._downscaled_hsv.setdefault(scale, cv2.cvtColor(downscaled, cv2.COLOR_BGR2HSV))
+        return downscaled_hsv
 
     @staticmethod
     def search_range_scale(distance):
@@ -0,0 +1,20 @@
+import time
+
+from trajectory_table import TrajectoryTable
+from utils.consts import TRAJECTORY_TABLE_FILENAME
+
+
+def main():
+    """
+    Generates the trajectory table of the balloon and saves it (its accuracy and latency are checked by
+    benchmark_prediction.py).
+    """
+    start = time.perf_counter()
+    TrajectoryTable.generate().save(TRAJECTORY_TABLE_FILENAME)
+    print("Generated {} {} in {:.2f} seconds".format(TRAJECTORY_TABLE_FILENAME, TrajectoryTable.shape(),
+                                                        time.perf_counter() - start))
+    assert TrajectoryTable.load(TRAJECTORY_TABLE_FILENAME) is not None
+
+
+if __name__ == "__main__":
+    main()
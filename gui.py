@@ -1,9 +1,10 @@
 from utils.image_utils import display_frames
+from gui_renderer import GuiRenderer
+from gui_commands import GuiCommands
 import PySimpleGUI as sg
-import cv2
 
 
-class Gui:
+class Gui(GuiCommands):
     """
     A class for the Graphic User Interface.
     """
@@ -60,59 +61,49 @@ class Gui:
               [sg.Push(), sg.Frame('Play', [[play_func]]), sg.Frame('State 1', [[sg.Text('', key='state_1')]]),
                sg.Frame('State 2', [[sg.Text('', key='state_2')]]), sg.Push()]]
 
-    def __init__(self):
+    # The percentage of down scaling of the left image, the right image and the xy display.
+    IMAGE_SCALES = (67, 33, 33)
+
+    def __init__(self, display_fps=GuiRenderer.DISPLAY_FPS, image_format=GuiRenderer.IMAGE_FORMAT,
+                 asynchronous_rendering=True):
         """
         Initializes the gui.
+        :param display_fps: the maximal rate of the displayed frames in frames per second.
+        :param image_format: the format the images are encoded in for the window ('.ppm' or '.png').
+        :param asynchronous_rendering: whether to encode the images in a render thread (see GuiRenderer).
         """
         self.window = None
+        self.renderer = GuiRenderer(Gui.IMAGE_SCALES, display_fps, image_format, asynchronous_rendering)
+
+    def __str__(self):
+        """
+        :return: a string representation of the rendering statistics.
+        """
+        return str(self.renderer)
 
     def show_gui(self):
         """
         Prepares the qui window to show.
         """
         self.window = sg.Window('FlyBall', Gui.layout, finalize=True, margins=(0, 0), return_keyboard_events=True)
+        self.renderer.start()
 
-    def update_val(self, left_cam, right_cam, drone_1, drone_2, distance, values):
+    def read(self, timeout=1):
         """
-        Updates values of configurable variables (cameras indices, distance between cameras, drone's homes).
-        :param left_cam: the left camera's Camera.
-        :param right_cam: the right camera's Camera.
-        :param drone_1: the first Drone.
-        :param drone_2: the second Drone.
-        :param distance: the current distance between the cameras.
-        :param values: the values to set.
-        :return: the distance between the cameras.
+        Reads the next event of the window.
+        :param timeout: the maximal time to wait for an event in milliseconds.
+        :return: the event (None if there is no event) and the values of the window.
         """
-        if values['left_index'] != '':
-            left_cam.index = int(values['left_index'])
-            left_cam.vid = None
-
-        if values['right_index'] != '':
-            right_cam.index = int(values['right_index'])
-            right_cam.vid = None
-
-        if values['set_home_1'] != '' or values['set_home_2'] != '':
-            self.update_homes(drone_1, drone_2, values)
+        return self.window.read(timeout=timeout)
 
-        if values['distance'] != '':
-            distance = int(values['distance'])
-
-        return distance
-
-    def update_homes(self, drone_1, drone_2, values):
+    def close(self):
         """
-        Updates the drones homes.
-        :param drone_1: the first drone.
-        :param drone_2: the second drone.
-        :param values: the values of configurable variables.
+        Stops the rendering of the frames and closes the gui window.
         """
-        if values['set_home_1'] != '':
-            x, y = values['set_home_1'].split(',')
-            drone_1.home = (float(x), float(y))
-        if values['set_home_2'] != '':
-            x, y = values['set_home_2'].split(',')
-            drone_2.home = (float(x), float(y))
-        self.show_homes_gui(drone_1.home, drone_2.home)
+        self.renderer.stop()
+        if self.window:
+            self.window.close()
+            self.window = None
 
     def show_homes_gui(self, home_1, home_2):
         """
@@ -125,85 +116,22 @@ class Gui:
 
     def display_frames_gui(self, balloon, drones, left, right, borders):
         """
-        Displays the frames in the gui
+        Displays the frames in the gui without waiting for their rendering: the frames are submitted to the renderer
+        (at most at the display FPS), and the latest rendered frames are shown.
         :param balloon: the balloon's RecognizableObject.
         :param drones: a list of the Drones.
         :param left: the left Camera.
         :param right: the right Camera.
         :param borders: the Borders.
         """
-        left_img, right_img, xy_display = display_frames(balloon, drones, left, right, borders)
-        left_img = self.downscale_image(left_img, 67)
-        right_img = self.downscale_image(right_img, 33)
-        xy_display = self.downscale_image(xy_display, 33)
-        imgbytes_left = cv2.imencode('.png', left_img)[1].tobytes()
-        self.window['image_left'].update(data=imgbytes_left)
-        imgbytes_right = cv2.imencode('.png', right_img)[1].tobytes()
-        self.window['image_right'].update(data=imgbytes_right)
-        imgbytes_xy = cv2.imencode('.png', xy_display)[1].tobytes()
-        self.window['xy_display'].update(data=imgbytes_xy)
-
-    def update_hsv(self, recognizable_objects, event, values):
-        """
-        Updates the HSV values for the objects.
-        :param recognizable_objects: a list of the RecognizableObjects.
-        :param event: the event occurred.
-        :param values: the values to set,
-        """
-        if event == 'SLIDER_H':
-            new_h = int(values['SLIDER_H'])
-            self.update_h(recognizable_objects, new_h)
-        elif event == 'SLIDER_S':
-            new_s = int(values['SLIDER_S'])
-            self.update_s(recognizable_objects, new_s)
-        elif event == 'SLIDER_V':
-            new_v = int(values['SLIDER_V'])
-            self.update_v(recognizable_objects, new_v)
-        elif event == 'SLIDER_T':
-            new_tres = int(values['SLIDER_T'])
-            self.update_tres(recognizable_objects, new_tres)
-
-    def update_h(self, recognizable_objects, new_h):
-        """
-        Updates the H value (from HSV) for the objects.
-        :param recognizable_objects: a list of the RecognizableObjects.
-        :param new_h: the new H value.
-        """
-        for recognizable_object in recognizable_objects:
-            recognizable_object.frame_left.h_range = new_h
-            recognizable_object.frame_right.h_range = new_h
-
-    def update_s(self, recognizable_objects, new_s):
-        """
-        Updates the S value (from HSV) for the objects.
-        :param recognizable_objects: a list of the RecognizableObjects.
-        :param new_s: the new S value.
-        """
-        for recognizable_object in recognizable_objects:
-            recognizable_object.frame_left.s_range = new_s
-            recognizable_object.frame_right.s_range = new_s
-
-    def update_v(self, recognizable_objects, new_v):
-        """
-        Updates the V value (from HSV) for the objects.
-        :param recognizable_objects: a list of the RecognizableObjects.
-        :param new_v: the new V value.
-        """
-        for recognizable_object in recognizable_objects:
-            recognizable_object.frame_left.v_range = new_v
-            recognizable_object.frame_right.v_range = new_v
-
-    def update_tres(self, recognizable_objects, new_tres):
-        """
-        Updates the color recognition threshold.
-        :param recognizable_objects: a list of the RecognizableObjects.
-        :param new_tres: the new threshold value.
-        """
-        for recognizable_object in recognizable_objects:
-            image_left = recognizable_object.frame_left.frame.image
-            recognizable_object.frame_left.frame.threshold_size = image_left.shape[1] // new_tres
-            image_right = recognizable_object.frame_right.frame.image
-            recognizable_object.frame_right.frame.threshold_size = image_right.shape[1] // new_tres
+        if self.renderer.due():
+            self.renderer.submit(list(display_frames(balloon, drones, left, right, borders)))
+        rendered = self.renderer.take_rendered()
+        if rendered:
+            imgbytes_left, imgbytes_right, imgbytes_xy = rendered
+            self.window['image_left'].update(data=imgbytes_left)
+            self.window['image_right'].update(data=imgbytes_right)
+            self.window['xy_display'].update(data=imgbytes_xy)
 
     def update_states(self, state_1, state_2):
         """
@@ -214,20 +142,6 @@ class Gui:
         self.window['state_1'].update(state_1)
         self.window['state_2'].update(state_2)
 
-    def downscale_image(self, image, scale_percent):
-        """
-        Downscales an image before shown in the gui window.
-        :param image: the image to be shown.
-        :param scale_percent: the percentage of down scaling.
-        :return: the resized window.
-        """
-        width = int(image.shape[1] * scale_percent / 100)
-        height = int(image.shape[0] * scale_percent / 100)
-        dim = (width, height)
-        resized = cv2.resize(image, dim, interpolation=cv2.INTER_AREA)
-
-        return resized
-
     def update_borders_button(self, index):
         """
         Updates the borders button according to the index of corners set.
@@ -0,0 +1,159 @@
+class GuiCommands:
+    """
+    A base class for the user interfaces of the game, applying the commands of the user (see Gui and HeadlessGui).
+    A subclass defines how the commands are read and how the game is shown.
+    """
+    # The event of closing the user interface.
+    WINDOW_CLOSED = None
+
+    def read(self, timeout=1):
+        """
+        Reads the next command of the user.
+        :param timeout: the maximal time to wait for a command in milliseconds.
+        :return: the event of the command and a dictionary of its values.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Closes the user interface.
+        """
+        raise NotImplementedError
+
+    def show_homes_gui(self, home_1, home_2):
+        """
+        Shows the location of the homes of the drones.
+        :param home_1: the home of the first drone.
+        :param home_2: the home of the second drone.
+        """
+        raise NotImplementedError
+
+    def display_frames_gui(self, balloon, drones, left, right, borders):
+        """
+        Displays the frames.
+        :param balloon: the balloon's RecognizableObject.
+        :param drones: a list of the Drones.
+        :param left: the left Camera.
+        :param right: the right Camera.
+        :param borders: the Borders.
+        """
+        raise NotImplementedError
+
+    def update_states(self, state_1, state_2):
+        """
+        Updates the states of the drones on the view.
+        :param state_1: the state of the first drone.
+        :param state_2: the state of the second drone.
+        """
+        raise NotImplementedError
+
+    def update_borders_button(self, index):
+        """
+        Updates the borders button according to the index of corners set.
+        :param index: the new index of the corners.
+        """
+        raise NotImplementedError
+
+    def update_val(self, left_cam, right_cam, drone_1, drone_2, distance, values):
+        """
+        Updates values of configurable variables (cameras indices, distance between cameras, drone's homes).
+        :param left_cam: the left camera's Camera.
+        :param right_cam: the right camera's Camera.
+        :param drone_1: the first Drone.
+        :param drone_2: the second Drone.
+        :param distance: the current distance between the cameras.
+        :param values: the values to set.
+        :return: the distance between the cameras.
+        """
+        if values['left_index'] != '':
+            left_cam.index = int(values['left_index'])
+            left_cam.vid = None
+
+        if values['right_index'] != '':
+            right_cam.index = int(values['right_index'])
+            right_cam.vid = None
+
+        if values['set_home_1'] != '' or values['set_home_2'] != '':
+            self.update_homes(drone_1, drone_2, values)
+
+        if values['distance'] != '':
+            distance = int(values['distance'])
+
+        return distance
+
+    def update_homes(self, drone_1, drone_2, values):
+        """
+        Updates the drones homes.
+        :param drone_1: the first drone.
+        :param drone_2: the second drone.
+        :param values: the values of configurable variables.
+        """
+        if values['set_home_1'] != '':
+            x, y = values['set_home_1'].split(',')
+            drone_1.home = (float(x), float(y))
+        if values['set_home_2'] != '':
+            x, y = values['set_home_2'].split(',')
+            drone_2.home = (float(x), float(y))
+        self.show_homes_gui(drone_1.home, drone_2.home)
+
+    def update_hsv(self, recognizable_objects, event, values):
+        """
+        Updates the HSV values for the objects.
+        :param recognizable_objects: a list of the RecognizableObjects.
+        :param event: the event occurred.
+        :param values: the values to set,
+        """
+        if event == 'SLIDER_H':
+            new_h = int(values['SLIDER_H'])
+            self.update_h(recognizable_objects, new_h)
+        elif event == 'SLIDER_S':
+            new_s = int(values['SLIDER_S'])
+            self.update_s(recognizable_objects, new_s)
+        elif event == 'SLIDER_V':
+            new_v = int(values['SLIDER_V'])
+            self.update_v(recognizable_objects, new_v)
+        elif event == 'SLIDER_T':
+            new_tres = int(values['SLIDER_T'])
+            self.update_tres(recognizable_objects, new_tres)
+
+    def update_h(self, recognizable_objects, new_h):
+        """
+        Updates the H value (from HSV) for the objects.
+        :param recognizable_objects: a list of the RecognizableObjects.
+        :param new_h: the new H value.
+        """
+        for recognizable_object in recognizable_objects:
+            recognizable_object.frame_left.h_range = new_h
+            recognizable_object.frame_right.h_range = new_h
+
+    def update_s(self, recognizable_objects, new_s):
+        """
+        Updates the S value (from HSV) for the objects.
+        :param recognizable_objects: a list of the RecognizableObjects.
+        :param new_s: the new S value.
+        """
+        for recognizable_object in recognizable_objects:
+            recognizable_object.frame_left.s_range = new_s
+            recognizable_object.frame_right.s_range = new_s
+
+    def update_v(self, recognizable_objects, new_v):
+        """
+        Updates the V value (from HSV) for the objects.
+        :param recognizable_objects: a list of the RecognizableObjects.
+        :param new_v: the new V value.
+        """
+        for recognizable_object in recognizable_objects:
+            recognizable_object.frame_left.v_range = new_v
+            recognizable_object.frame_right.v_range = new_v
+
+    def update_tres(self, recognizable_objects, new_tres):
+        """
+        Updates the color recognition threshold.
+        :param recognizable_objects: a list of the RecognizableObjects.
+        :param new_tres: the new threshold value.
+        """
+        for recognizable_object in recognizable_objects:
+            image_left = recognizable_object.frame_left.frame.image
+            recognizable_object.frame_left.frame.threshold_size = image_left.shape[1] // new_tres
+            image_right = recognizable_object.frame_right.frame.image
+            recognizable_object.frame_right.frame.threshold_size = image_right.shape[1] // new_tres
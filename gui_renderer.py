@@ -0,0 +1,141 @@
+import threading
+import time
+
+import cv2
+
+
+class GuiRenderer:
+    """
+    A class preparing the images of the gui off the game loop.
+    The game loop submits the images to show (at most at the display FPS), and a render thread downscales and encodes
+    them. Only the latest submitted images are kept, so the game loop never waits for the rendering - images that are
+    replaced before they are rendered are dropped. The encoded images are taken by the thread of the window (tkinter
+    is not thread safe), which only sets them.
+    The images are encoded as PPM by default: a raw format that is much cheaper to encode than PNG, and to decode in
+    the window.
+    """
+    # The maximal rate of the displayed images in frames per second.
+    DISPLAY_FPS = 15
+    # The format of the encoded images (an extension supported by cv2.imencode and the window, '.ppm' or '.png').
+    IMAGE_FORMAT = '.ppm'
+
+    def __init__(self, scales, display_fps=DISPLAY_FPS, image_format=IMAGE_FORMAT, asynchronous=True):
+        """
+        Initializes the renderer (the render thread is started by start).
+        :param scales: the percentage of down scaling of each of the images (in the order they are submitted).
+        :param display_fps: the maximal rate of the displayed images in frames per second.
+        :param image_format: the format of the encoded images.
+        :param asynchronous: whether to render in a thread or in the game loop (when the images are submitted).
+        """
+        self.scales = scales
+        self.display_period = 1 / display_fps
+        self.image_format = image_format
+        self.asynchronous = asynchronous
+        self._condition = threading.Condition()
+        self._pending = None
+        self._rendered = None
+        self._thread = None
+        self._running = False
+        self._last_submit_time = None
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+        self._total_render_time = 0
+
+    def __str__(self):
+        """
+        :return: a string representation of the rendering statistics.
+        """
+        return "rendered: {:d}, dropped: {:d}, render time (ms) mean: {:.2f}".format(
+            self.rendered, self.dropped, self.mean_render_time * 1000)
+
+    @property
+    def mean_render_time(self):
+        """
+        :return: the mean time of rendering the images in seconds.
+        """
+        return self._total_render_time / self.rendered if self.rendered else 0
+
+    def start(self):
+        """
+        Starts the render thread (if rendering asynchronously).
+        """
+        if self._running or not self.asynchronous:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._render_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the render thread.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def due(self):
+        """
+        :return: whether it is time to submit new images to display (according to the display FPS).
+        """
+        return self._last_submit_time is None or time.perf_counter() - self._last_submit_time >= self.display_period
+
+    def submit(self, images):
+        """
+        Submits images to render, replacing the submitted images that were not rendered yet.
+        The images must not be changed after they are submitted.
+        :param images: a list of the images to display (BGR).
+        """
+        self._last_submit_time = time.perf_counter()
+        self.submitted += 1
+        if not self.asynchronous:
+            self._rendered = self.render(images)
+            return
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = images
+            self._condition.notify()
+
+    def take_rendered(self):
+        """
+        Takes the latest rendered images (each is taken once).
+        :return: a list of the encoded images, or None if no images were rendered since the last call.
+        """
+        with self._condition:
+            rendered, self._rendered = self._rendered, None
+        return rendered
+
+    def render(self, images):
+        """
+        Downscales and encodes images.
+        :param images: a list of the images to render.
+        :return: a list of the encoded images (bytes).
+        """
+        start = time.perf_counter()
+        encoded = []
+        for image, scale_percent in zip(images, self.scales):
+            width = int(image.shape[1] * scale_percent / 100)
+            height = int(image.shape[0] * scale_percent / 100)
+            resized = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            encoded.append(cv2.imencode(self.image_format, resized)[1].tobytes())
+        self._total_render_time += time.perf_counter() - start
+        self.rendered += 1
+        return encoded
+
+    def _render_loop(self):
+        """
+        The loop of the render thread - waits for submitted images and renders the latest.
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or not self._running)
+                if not self._running:
+                    break
+                images, self._pending = self._pending, None
+            rendered = self.render(images)
+            with self._condition:
+                self._rendered = rendered
@@ -0,0 +1,57 @@
+from control_socket import ControlSocket
+from gui_commands import GuiCommands
+
+
+class HeadlessGui(GuiCommands):
+    """
+    A user interface without a window, for running the game headless: the commands are received from a
+    ControlSocket (with the same events as the buttons and keys of the Gui), and nothing is drawn or shown.
+    """
+    # The values of the text inputs of the Gui, when not given in a command.
+    DEFAULT_VALUES = {'distance': '', 'set_home_1': '', 'set_home_2': '', 'left_index': '', 'right_index': ''}
+
+    def __init__(self, port=ControlSocket.PORT):
+        """
+        Initializes the headless gui.
+        :param port: the local port of the control socket.
+        """
+        self.control = ControlSocket(port)
+
+    def __str__(self):
+        """
+        :return: a string representation of the received commands.
+        """
+        return "headless, commands received: {:d}".format(self.control.commands)
+
+    def show_gui(self):
+        """
+        Nothing to show.
+        """
+        pass
+
+    def read(self, timeout=1):
+        """
+        Reads the next command from the control socket (without waiting).
+        :param timeout: ignored, the socket is never waited for.
+        :return: the event of the command (ControlSocket.TIMEOUT_EVENT if there is no command) and its values.
+        """
+        event, values = self.control.read()
+        return event, dict(HeadlessGui.DEFAULT_VALUES, **values)
+
+    def close(self):
+        """
+        Closes the control socket.
+        """
+        self.control.close()
+
+    def show_homes_gui(self, home_1, home_2):
+        print("Home 1 = ({:.3f},{:.3f}), Home 2 = ({:.3f},{:.3f})".format(*home_1, *home_2))
+
+    def display_frames_gui(self, balloon, drones, left, right, borders):
+        pass
+
+    def update_states(self, state_1, state_2):
+        pass
+
+    def update_borders_button(self, index):
+        pass
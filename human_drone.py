@@ -6,19 +6,28 @@ from utils.config_utils import *
 from utils.consts import *
 from borders import Borders
 from camera import Camera
+from stereo_capture import StereoCapture
+from segmentation import ColorSegmentation
+from detection_executor import DetectionExecutor
+from prediction import NumericBallPredictor
+from prediction_cache import BalloonPredictionCache
+from state_estimation import BalloonEKF, ConstantAccelerationKF
 from utils.image_utils import display_frames
+from control_socket import ControlSocket
+from latency_histogram import LoopRate
 
 
-def interactive_loop(borders, left_cam, balloon, drone_1):
+def interactive_loop(borders, left_cam, balloon, drone_1, control=None):
     """
     The interactive loop for receiving commands from the user.
     :param borders: the Borders.
     :param left_cam: the left Camera.
     :param balloon: the balloon's RecognizableObject.
     :param drone_1: the Drone.
+    :param control: the ControlSocket to receive the commands from in headless mode (the keyboard if None).
     :return: whether to continue or not.
     """
-    key = cv2.waitKey(1) & 0xFF
+    key = control.read_key() if control else cv2.waitKey(1) & 0xFF
     str_colors_changed = "Color bounds changed"
 
     # the 'v' button is set as the detect color of recognizable_object in the left_cam cam
@@ -99,23 +108,31 @@ def game_loop(drone_1: Drone, balloon: RecognizableObject, cameras_distance, lef
     drone_1.set_home((100, 320))
 
     drone_1.active = True
-    
+
+    segmentation = ColorSegmentation(recognizable_objects) if SINGLE_PASS_SEGMENTATION else None
+    detection_executor = DetectionExecutor(recognizable_objects, PARALLEL_DETECTION)
+    stereo_capture = StereoCapture(left, right)
+    stereo_capture.start()
+    control = ControlSocket(CONTROL_PORT) if HEADLESS else None
+    loop_rate = LoopRate("game loop")
+
     while continue_loop:
         state = drone_1.state
         # Capture the video frame by frame
-        if not left.capture():
-            continue
-        if not right.capture():
+        if not stereo_capture.capture():
             continue
 
-        for recognizable_object in recognizable_objects:
-            # Process frames
-            recognizable_object.detect_and_set_coordinates(left, right, cameras_distance)
+        # Process frames
+        if segmentation:
+            segmentation.detect_and_set_coordinates(left, right, cameras_distance)
+        else:
+            detection_executor.detect_and_set_coordinates(left, right, cameras_distance)
             
-        left_img, right_img, xy_display = display_frames(balloon, drones, left, right, borders)
-        cv2.imshow("Left", left_img)
-        cv2.imshow("Right", right_img)
-        cv2.imshow("XY Display", xy_display)
+        if not HEADLESS:
+            left_img, right_img, xy_display = display_frames(balloon, drones, left, right, borders)
+            cv2.imshow("Left", left_img)
+            cv2.imshow("Right", right_img)
+            cv2.imshow("XY Display", xy_display)
 
         # State2Drones Machine
         state.run(drone_1, balloon, borders)
@@ -126,16 +143,31 @@ def game_loop(drone_1: Drone, balloon: RecognizableObject, cameras_distance, lef
             print(state)
             state.setup(drone_1, balloon, borders)
 
-        continue_loop = interactive_loop(borders, left, balloon, drone_1)
+        loop_rate.tick()
+        continue_loop = interactive_loop(borders, left, balloon, drone_1, control)
     
     if drone_1.tookoff:
         drone_1.land()
-
-    # After the loop release the cap object
+    drone_1.close()
+
+    # After the loop stop the capture threads and release the cap object
+    stereo_capture.stop()
+    print(stereo_capture)
+    print(balloon.prediction_cache)
+    print(drone_1.drone_control.latency)
+    for command_latency in drone_1.drone_control.get_command_latencies().values():
+        print(command_latency)
+    if drone_1.drone_control.rc_scheduler:
+        print(drone_1.drone_control.rc_scheduler)
+    print(loop_rate)
+    detection_executor.shutdown()
     left.release()
     right.release()
-    # Destroy all the windows
-    cv2.destroyAllWindows()
+    if control:
+        control.close()
+    else:
+        # Destroy all the windows
+        cv2.destroyAllWindows()
 
 
 def main():
@@ -146,7 +178,12 @@ def main():
     right_cam = C920_NIR_2
 
     drone_1 = Drone(1, (0, 191, 255), iface_ip="192.168.10.2")
+    NumericBallPredictor.load_table(TRAJECTORY_TABLE_FILENAME)
     balloon = RecognizableObject((255, 54, 89), "balloon")
+    balloon.prediction_cache = BalloonPredictionCache(balloon, LATENCY_COMPENSATION)
+    if KALMAN_ESTIMATION:
+        balloon.estimator = BalloonEKF()
+        drone_1.recognizable_object.estimator = ConstantAccelerationKF()
 
     distance = 111.9
     game_loop(drone_1, balloon, distance, left_cam, right_cam)
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with fixed width bins (the last bin counts all the latencies above the maximum),
+    adding a latency is O(1) and keeps no samples.
+    """
+    # The width of a bin and the maximal latency in the bins in seconds.
+    BIN_WIDTH = 0.005
+    MAX_LATENCY = 0.3
+
+    def __init__(self, name, bin_width=BIN_WIDTH, max_latency=MAX_LATENCY):
+        """
+        Initializes an empty histogram.
+        :param name: the name of the latency (shown in the string of the histogram).
+        :param bin_width: the width of a bin in seconds.
+        :param max_latency: the maximal latency in the bins in seconds.
+        """
+        self.name = name
+        self.bin_width = bin_width
+        self.counts = np.zeros(int(np.ceil(max_latency / bin_width)) + 1, dtype=int)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def __str__(self):
+        return "{} latency {}".format(self.name, self.summary())
+
+    def summary(self):
+        """
+        :return: a string of the number of samples, the mean, the percentiles and the maximum of the latencies.
+        """
+        if not self.count:
+            return "(no samples)"
+        return "({} samples): mean {:.1f} ms, p50 {:.1f} ms, p90 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms".format(
+            self.count, self.mean * 1000, self.percentile(50) * 1000, self.percentile(90) * 1000,
+            self.percentile(99) * 1000, self.max * 1000)
+
+    def add(self, latency):
+        """
+        Adds a latency to the histogram.
+        :param latency: the latency in seconds.
+        """
+        self.counts[min(max(int(latency / self.bin_width), 0), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    @property
+    def mean(self):
+        """
+        :return: the mean latency in seconds.
+        """
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percent):
+        """
+        :param percent: the percent of the latencies that are below the returned latency.
+        :return: the upper edge of the bin of the percentile in seconds (the maximum for the last bin).
+        """
+        if not self.count:
+            return 0
+        index = np.searchsorted(np.cumsum(self.counts), percent / 100 * self.count)
+        return self.max if index == len(self.counts) - 1 else min((index + 1) * self.bin_width, self.max)
+
+    def bins(self):
+        """
+        :return: the lower edges of the bins in seconds and their counts (for tuning the latency compensation).
+        """
+        return np.arange(len(self.counts)) * self.bin_width, self.counts.copy()
+
+
+class LoopRate(LatencyHistogram):
+    """
+    A histogram of the periods of the iterations of a loop, reporting the rate of the loop.
+    """
+
+    def __init__(self, name, bin_width=LatencyHistogram.BIN_WIDTH, max_latency=LatencyHistogram.MAX_LATENCY):
+        """
+        Initializes an empty histogram.
+        :param name: the name of the loop.
+        :param bin_width: the width of a bin in seconds.
+        :param max_latency: the maximal period in the bins in seconds.
+        """
+        super().__init__(name, bin_width, max_latency)
+        self._last_tick = None
+
+    def __str__(self):
+        return "{} rate: {:.1f} Hz, period {}".format(self.name, self.rate, self.summary())
+
+    @property
+    def rate(self):
+        """
+        :return: the mean number of iterations per second.
+        """
+        return 1 / self.mean if self.mean else 0
+
+    def tick(self):
+        """
+        Marks the end of an iteration, and adds its period (from the end of the previous iteration) to the histogram.
+        """
+        tick_time = time.perf_counter()
+        if self._last_tick is not None:
+            self.add(tick_time - self._last_tick)
+        self._last_tick = tick_time
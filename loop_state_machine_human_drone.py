@@ -1,8 +1,7 @@
-from datetime import datetime
 import numpy as np
 
 from loop_state_machine import State1Drone
-from prediction import NumericBallPredictor
+from utils.time_utils import seconds_since
 from utils.drone_utils import reachability
 from utils.consts import FLOOR_HEIGHT, DRONE_DEFAULT_HEIGHT
 
@@ -120,7 +119,7 @@ class SEARCHING_PREDICTION(State1Drone):
         return 0
 
     def run(self, drone, balloon, borders):
-        pred = NumericBallPredictor(balloon)
+        pred = balloon.prediction_cache
         pred_time, pred_coords = pred.get_optimal_hitting_point(z_bound=drone.z / 100,
                                                                 xy_vel_bound=self.XY_VEL_BOUND / 100)
 
@@ -132,7 +131,7 @@ class SEARCHING_PREDICTION(State1Drone):
         x_to_target = abs(x_dest - drone.drone_search_pred_coords[0])
         y_to_target = abs(y_dest - drone.drone_search_pred_coords[1])
         time_to_hit_from_start = max(reachability(x_to_target, offset=0.6), reachability(y_to_target, offset=0.6))
-        time_until_hit = time_to_hit_from_start + (drone.drone_search_pred_time - datetime.now()).total_seconds()
+        time_until_hit = time_to_hit_from_start - seconds_since(drone.drone_search_pred_time)
         pred_time, pred_coords = pred.get_optimal_hitting_point(z_bound=drone.z / 100,
                                                                 xy_vel_bound=self.XY_VEL_BOUND / 100,
                                                                 start_time=time_until_hit)
@@ -168,7 +167,7 @@ class SEARCHING(State1Drone):
         # x_rel = balloon.x - drone.x
         # y_rel = balloon.y - drone.y
 
-        pred = NumericBallPredictor(balloon)
+        pred = balloon.prediction_cache
         _, _, z_dest = pred.get_prediction(reachability(distance=0))
 
         z_rel = z_dest - drone.z
@@ -187,7 +186,7 @@ class SEARCHING(State1Drone):
         return 0
 
     def run(self, drone, balloon, borders):
-        pred = NumericBallPredictor(balloon)
+        pred = balloon.prediction_cache
         x_dest, y_dest, z_dest = pred.get_prediction(reachability(distance=0))
         z_dest = drone.z
         drone.track_3d(x_dest, y_dest, z_dest)
@@ -216,8 +215,8 @@ class HITTING(State1Drone):
         return transition
 
     def run(self, drone, balloon, borders):
-        time_since_hitting = (datetime.now() - drone.start_hit_timer).total_seconds()
-        pred = NumericBallPredictor(balloon)
+        time_since_hitting = seconds_since(drone.start_hit_timer)
+        pred = balloon.prediction_cache
         x_dest, y_dest, z_dest = pred.get_prediction(reachability(0) - time_since_hitting)
 
         drone.track_hitting(x_dest, y_dest, z_dest)
@@ -1,8 +1,7 @@
-from datetime import datetime
 import numpy as np
 
 from loop_state_machine import State2Drones
-from prediction import NumericBallPredictor
+from utils.time_utils import seconds_since
 from utils.drone_utils import reachability, first_on_second_off
 from utils.consts import DRONE_MIN_HEIGHT
 
@@ -135,7 +134,7 @@ class SEARCHING_PREDICTION(State2Drones):
         return 0
 
     def run(self, drone, other_drone, balloon, borders):
-        pred = NumericBallPredictor(balloon)
+        pred = balloon.prediction_cache
         pred_time, pred_coords = pred.get_optimal_hitting_point(z_bound=drone.z / 100,
                                                                 xy_vel_bound=self.XY_VEL_BOUND / 100)
 
@@ -147,7 +146,7 @@ class SEARCHING_PREDICTION(State2Drones):
         x_to_target = abs(x_dest - drone.drone_search_pred_coords[0])
         y_to_target = abs(y_dest - drone.drone_search_pred_coords[1])
         time_to_hit_from_start = max(reachability(x_to_target, offset=0.6), reachability(y_to_target, offset=0.6))
-        time_until_hit = time_to_hit_from_start + (drone.drone_search_pred_time - datetime.now()).total_seconds()
+        time_until_hit = time_to_hit_from_start - seconds_since(drone.drone_search_pred_time)
         pred_time, pred_coords = pred.get_optimal_hitting_point(z_bound=drone.z / 100,
                                                                 xy_vel_bound=self.XY_VEL_BOUND / 100,
                                                                 start_time=time_until_hit)
@@ -177,7 +176,7 @@ class SEARCHING(State2Drones):
         UPPER_LIMIT = 110
         Z_LIMIT = 50
 
-        pred = NumericBallPredictor(balloon)
+        pred = balloon.prediction_cache
         _, _, z_dest = pred.get_prediction(reachability(distance=0))
 
         z_rel = z_dest - drone.z
@@ -196,7 +195,7 @@ class SEARCHING(State2Drones):
         return 0
 
     def run(self, drone, other_drone, balloon, borders):
-        pred = NumericBallPredictor(balloon)
+        pred = balloon.prediction_cache
         x_dest, y_dest, z_dest = pred.get_prediction(reachability(distance=0))
         z_dest = drone.z
         drone.track_3d(x_dest, y_dest, z_dest)
@@ -228,8 +227,8 @@ class HITTING(State2Drones):
         return transition
 
     def run(self, drone, other_drone, balloon, borders):
-        time_since_hitting = (datetime.now() - drone.start_hit_timer).total_seconds()
-        pred = NumericBallPredictor(balloon)
+        time_since_hitting = seconds_since(drone.start_hit_timer)
+        pred = balloon.prediction_cache
         x_dest, y_dest, z_dest = pred.get_prediction(reachability(0) - time_since_hitting)
 
         drone.track_hitting(x_dest, y_dest, z_dest)
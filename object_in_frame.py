@@ -1,3 +1,5 @@
+import time
+
 import numpy as np
 import cv2
 
@@ -13,6 +15,25 @@ class ObjectInFrame:
     NO_LOWER_BOUNDS = (0, 0, 0)
     NO_UPPER_BOUNDS = (255, 255, 255)
 
+    # Detection modes:
+    # the centroid of all the pixels in the color bounds (calculated from the image moments of the mask).
+    MODE_MOMENTS = 'moments'
+    # the centroid of the best blob (connected component) of pixels in the color bounds.
+    MODE_BLOB = 'blob'
+    DETECTION_MODE = MODE_MOMENTS
+
+    # Blob selection in MODE_BLOB:
+    # the blob with the largest area.
+    BLOB_LARGEST = 'largest'
+    # the blob with the largest area weighted by how circular it is (the balloons are circular).
+    BLOB_CIRCULAR = 'circular'
+    BLOB_SELECTION = BLOB_LARGEST
+
+    # The factor the frame is downscaled by when searching for a lost object (1 searches the full frame as is).
+    PYRAMID_SCALE = 4
+    # The margin (in pixels of the downscaled frame) around the coarse detection that is refined in full resolution.
+    PYRAMID_REFINE_MARGIN = 2
+
     def __init__(self):
         """
         Initialize the object in the frame.
@@ -21,6 +42,14 @@ class ObjectInFrame:
         self.x = 0
         self.y = 0
         self.search_range = 0
+        self.area = 0
+        self.radius = 0
+        self.bounding_box = (0, 0, 0, 0)
+        self.detection_mode = ObjectInFrame.DETECTION_MODE
+        self.blob_selection = ObjectInFrame.BLOB_SELECTION
+        self.pyramid_scale = ObjectInFrame.PYRAMID_SCALE
+        # The time (in seconds) each level of the last detection took ('window', 'full', or 'coarse' and 'fine').
+        self.timings = {}
         self.lower_hsv = ObjectInFrame.NO_LOWER_BOUNDS
         self.upper_hsv = ObjectInFrame.NO_UPPER_BOUNDS
 
@@ -41,35 +70,147 @@ class ObjectInFrame:
     def detect_pixel_coordinates(self, distance):
         """
         Detects the pixel coordinates of the object in the frame.
+        If the object was detected in the previous frame it is searched around its previous location,
+        otherwise it is searched in the full frame (coarse to fine if the pyramid scale is larger than 1).
+        :param distance: the distance of the object from the camera in the previous frame.
+        """
+        self.timings = {}
+        start = time.perf_counter()
+        window = self.search_window(distance)
+        if window is not None:
+            self._detect_in_window(*window)
+            self.timings['window'] = time.perf_counter() - start
+        elif self.pyramid_scale > 1:
+            self._detect_pyramid()
+        else:
+            self._detect_in_window(0, self.image.shape[1], 0, self.image.shape[0])
+            self.timings['full'] = time.perf_counter() - start
+
+    def search_window(self, distance):
+        """
+        Returns the window of the frame the object is searched in around its previous location.
         :param distance: the distance of the object from the camera in the previous frame.
+        :return: the (x_min, x_max, y_min, y_max) of the window (the max are after the last column and row),
+                 or None if the object was not detected in the previous frame (it is searched in the full frame).
         """
         search_range = max(1, self.frame.search_range_scale(distance))
-        x_min, x_max, y_min, y_max = 0, self.image.shape[1], 0, self.image.shape[0]
-        if self.x != 0 and self.y != 0 and search_range != 0:
-            x_min = max(int(self.x - search_range), x_min)
-            x_max = min(int(self.x + search_range) + 1, x_max)
-            y_min = max(int(self.y - search_range), y_min)
-            y_max = min(int(self.y + search_range) + 1, y_max)
-
-        detection_image = self.image[y_min:y_max, x_min:x_max]
-        # convert to hsv
-        hsv = cv2.cvtColor(detection_image, cv2.COLOR_BGR2HSV)
+        if self.x == 0 or self.y == 0:
+            return None
+        return max(int(self.x - search_range), 0), min(int(self.x + search_range) + 1, self.image.shape[1]), \
+            max(int(self.y - search_range), 0), min(int(self.y + search_range) + 1, self.image.shape[0])
+
+    def _detect_in_window(self, x_min, x_max, y_min, y_max):
+        """
+        Detects and sets the pixel coordinates of the object in a window of the frame in full resolution.
+        :param x_min: the first column of the window.
+        :param x_max: the column after the last column of the window.
+        :param y_min: the first row of the window.
+        :param y_max: the row after the last row of the window.
+        """
+        # the hsv image is shared by all the objects in the frame
+        hsv = self.frame.get_hsv(x_min, x_max, y_min, y_max)
+        detection = self._detect_in_hsv(hsv, self.frame.threshold_size)
+        if detection is None:
+            self.set_detection(0, 0, 0, (0, 0, 0, 0))
+            return
+        x_coor, y_coor, area, (x_box, y_box, w_box, h_box) = detection
+        self.set_detection(int(x_coor + x_min), int(y_coor + y_min), area, (x_box + x_min, y_box + y_min, w_box, h_box))
+
+    def _detect_pyramid(self):
+        """
+        Detects and sets the pixel coordinates of the object in the full frame, coarse to fine:
+        the object is detected in a downscaled frame, and then refined in a small full resolution window around
+        the coarse detection.
+        """
+        start = time.perf_counter()
+        scale = self.pyramid_scale
+        hsv = self.frame.get_downscaled_hsv(scale)
+        detection = self._detect_in_hsv(hsv, max(1, self.frame.threshold_size // scale))
+        coarse_end = time.perf_counter()
+        self.timings['coarse'] = coarse_end - start
+        if detection is None:
+            self.set_detection(0, 0, 0, (0, 0, 0, 0))
+            return
+        _, _, _, (x_box, y_box, w_box, h_box) = detection
+        margin = ObjectInFrame.PYRAMID_REFINE_MARGIN
+        x_min = max((x_box - margin) * scale, 0)
+        x_max = min((x_box + w_box + margin) * scale, self.image.shape[1])
+        y_min = max((y_box - margin) * scale, 0)
+        y_max = min((y_box + h_box + margin) * scale, self.image.shape[0])
+        self._detect_in_window(x_min, x_max, y_min, y_max)
+        self.timings['fine'] = time.perf_counter() - coarse_end
+
+    def _detect_in_hsv(self, hsv, threshold_size):
+        """
+        Detects the object in an HSV image (according to the detection mode).
+        :param hsv: the HSV image to detect the object in.
+        :param threshold_size: the size of the kernel used to remove noise.
+        :return: the (x, y) centroid, area and bounding box (x, y, width, height) of the object in the image,
+                 or None if it was not detected.
+        """
         mask = cv2.inRange(hsv, self.lower_hsv, self.upper_hsv)
         # define kernel size
-        kernel = np.ones((self.frame.threshold_size, self.frame.threshold_size), np.uint8)
+        kernel = np.ones((threshold_size, threshold_size), np.uint8)
         # Remove unnecessary noise from mask
         mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
         mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
 
-        balloon_pixels = np.argwhere(mask)
-        if len(balloon_pixels) == 0:
-            self.x, self.y = 0, 0
-            return
-        x_coor = np.mean(balloon_pixels[:, 1])
-        y_coor = np.mean(balloon_pixels[:, 0])
+        if self.detection_mode == ObjectInFrame.MODE_BLOB:
+            return self._detect_blob(mask)
+        return self._detect_moments(mask)
+
+    @staticmethod
+    def _detect_moments(mask):
+        """
+        Detects the object as the centroid of all the pixels of the mask.
+        :param mask: the mask of the pixels in the color bounds of the object.
+        :return: the (x, y) centroid, area and bounding box (x, y, width, height) of the pixels of the mask,
+                 or None if the mask is empty.
+        """
+        moments = cv2.moments(mask, binaryImage=True)
+        if moments['m00'] == 0:
+            return None
+        return moments['m10'] / moments['m00'], moments['m01'] / moments['m00'], moments['m00'], \
+            cv2.boundingRect(mask)
 
-        self.x = int(x_coor + x_min)
-        self.y = int(y_coor + y_min)
+    def _detect_blob(self, mask):
+        """
+        Detects the object as the centroid of the best blob of the mask (according to the blob selection).
+        :param mask: the mask of the pixels in the color bounds of the object.
+        :return: the (x, y) centroid, area and bounding box (x, y, width, height) of the best blob,
+                 or None if the mask is empty.
+        """
+        n_labels, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if n_labels <= 1:
+            return None
+        # label 0 is the background
+        stats, centroids = stats[1:], centroids[1:]
+        areas = stats[:, cv2.CC_STAT_AREA]
+        scores = areas.astype(float)
+        if self.blob_selection == ObjectInFrame.BLOB_CIRCULAR:
+            widths, heights = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+            # the ratio of the blob's area to the area of the ellipse bounded by its bounding box,
+            # times the ratio of the sides of the bounding box (both are 1 for a full circle).
+            fill_ratio = np.minimum(areas / (np.pi * widths * heights / 4), 1)
+            sides_ratio = np.minimum(widths, heights) / np.maximum(widths, heights)
+            scores *= fill_ratio * sides_ratio
+        best = np.argmax(scores)
+        x_box, y_box, w_box, h_box = (int(value) for value in stats[best, :cv2.CC_STAT_AREA])
+        return centroids[best][0], centroids[best][1], int(areas[best]), (x_box, y_box, w_box, h_box)
+
+    def set_detection(self, x, y, area, bounding_box):
+        """
+        Sets the result of a detection of the object.
+        :param x: the x pixel coordinate of the object (0 if it was not detected).
+        :param y: the y pixel coordinate of the object (0 if it was not detected).
+        :param area: the area of the object in pixels.
+        :param bounding_box: the bounding box of the object in pixels (x, y, width, height).
+        """
+        self.x, self.y = x, y
+        self.area = area
+        # the radius of a circle with the same area (the objects are balloons).
+        self.radius = np.sqrt(area / np.pi)
+        self.bounding_box = bounding_box
 
     def detect_color(self):
         """
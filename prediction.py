@@ -1,6 +1,8 @@
 import numpy as np
-from scipy.integrate import odeint
+from scipy.optimize import brentq
 
+from balloon_trajectory import BalloonTrajectory
+from trajectory_table import TrajectoryTable
 from recognizable_object import RecognizableObject
 
 
@@ -8,6 +10,10 @@ class NumericBallPredictor:
     """
     A predictor of the balloon's location in future time depending on its location and velocity
     that solves the balloon's equations of motion using a numeric ODE solver.
+    The ODE is integrated once into a dense trajectory (see balloon_trajectory.BalloonTrajectory) and all the
+    predictions query it. When a trajectory table is loaded (see load_table) the trajectory is interpolated from
+    the table instead of integrated. The predictor of the balloon's current observation is shared by all the states and drones
+    through the balloon's prediction cache (see prediction_cache.BalloonPredictionCache).
     """
     r = (0.69 + 0.73) / 4 / np.pi  # in meters
     g = 9.807  # Gravitational constant
@@ -19,6 +25,11 @@ class NumericBallPredictor:
     B = 0.5 * rho * A * C_d  # A parameter of drag force
     balloon_weight = 1.68 * 10 ** -3  # kg
     m = disp_air_mass + balloon_weight  # Balloon mass.
+    DRAG = B / m  # The drag acceleration divided by the squared speed.
+    ACCELERATION = (rho * V / m - 1) * g  # The acceleration of gravity and buoyancy.
+
+    # The TrajectoryTable the trajectories are interpolated from (None to integrate every trajectory).
+    table = None
 
     def __init__(self, balloon: RecognizableObject):
         """
@@ -35,6 +46,22 @@ class NumericBallPredictor:
         self.phi = np.arctan2(self.v_y_0, self.v_x_0)
         self.v_xy_0 = np.sqrt(self.v_x_0 ** 2 + self.v_y_0 ** 2)
         self.theta = np.arctan2(self.v_xy_0, self.v_z_0)
+        self.trajectory = None
+        if NumericBallPredictor.table is not None:
+            self.trajectory = NumericBallPredictor.table.trajectory(self.v_xy_0, self.v_z_0, self.z_0, self.DRAG,
+                                                                    self.ACCELERATION)
+        if self.trajectory is None:
+            self.trajectory = BalloonTrajectory(self.v_xy_0, self.v_z_0, self.z_0, self.DRAG, self.ACCELERATION)
+
+    @staticmethod
+    def load_table(filename):
+        """
+        Loads the trajectory table all the predictors interpolate their trajectories from.
+        :param filename: the name of the file the table is saved in (see generate_trajectory_table.py).
+        """
+        NumericBallPredictor.table = TrajectoryTable.load(filename)
+        if NumericBallPredictor.table is not None:
+            print("Trajectory Table Loaded")
 
     @staticmethod
     def _derivative_func(variables, time, b, mass, density, volume, gravity):
@@ -61,8 +88,7 @@ class NumericBallPredictor:
                       in which to return the values of the variables of the ODE.
         :return: a list of the values of the variables of the ODE at the inputted wanted times.
         """
-        return odeint(NumericBallPredictor._derivative_func, np.array([self.v_xy_0, self.v_z_0, 0, self.z_0]), times,
-                      args=(self.B, self.m, self.rho, self.V, self.g))
+        return self.trajectory.states(times)
 
     def _solution_to_coords(self, sol):
         """
@@ -84,8 +110,8 @@ class NumericBallPredictor:
         :param time: a time (0 is the initial time when creating the instance of the predictor).
         :return: a prediction of the (x, y, z) coordinates of the balloon at the inputted time.
         """
-        sol = self._prepare_predictions(np.linspace(0, time, 2))
-        return self._solution_to_coords(sol)[:, 1]
+        sol = self._prepare_predictions(np.array([time]))
+        return self._solution_to_coords(sol)[:, 0]
 
     def get_optimal_hitting_point(self, start_time=0, end_time=3, time_precision=0.01, xy_vel_bound=5 / 100,
                                   z_bound=30 / 100):
@@ -94,6 +120,8 @@ class NumericBallPredictor:
         * the balloon's velocity in the XY plains is bellow an inputted bound
         * the height of the balloon is higher than an inputted bound
         The search for the optimal point is only between the inputted start and end times.
+        The criteria are checked at the steps of the trajectory, and the time they start to be upheld is found
+        between two steps by Brent's method on the cubic interpolating the trajectory between them.
         :param start_time: the start time of the search window for the optimal hitting point.
         :param end_time: the end time of the search window for the optimal hitting point.
         :param time_precision: the precision of the time of the optimal hitting point.
@@ -102,30 +130,37 @@ class NumericBallPredictor:
         :return: the time and location of the prediction of the optimal hitting point in the following format: (t, (x, ,y, z)),
                  if there is no time in which the criteria is upheld at the inputted time bounds (0, (0, 0, 0)) is returned.
         """
-        # final precision of the time of the optimal hit is jump/10
-        jump = 10 * time_precision
-        times = np.arange(start_time, end_time + jump / 2, jump)
-        times, preds = self._get_legal_hitting_points_for_times(times, xy_vel_bound, z_bound)
-        if len(preds) == 0:
+        if start_time > end_time:
             return 0, (0, 0, 0)
-        if times[0] == start_time:
-            return start_time, self._solution_to_coords(preds)[:, 0]
-        time = times[0]
-        # make another cycle of searching for optimal hitting point with the precision magnified by 10
-        # (only at the interval that is before the previous cycles optimal hitting point)
-        new_jump = jump / 10
-        times = np.arange(time - jump, time + new_jump / 2, new_jump)
-        times, preds = self._get_legal_hitting_points_for_times(times, xy_vel_bound, z_bound)
-        return times[0], self._solution_to_coords(preds)[:, 0]
+        step = self.trajectory.step
+        # all the steps between the start and end times, so each two consecutive times are on the same cubic
+        steps = np.arange(np.floor(start_time / step) + 1, np.ceil(end_time / step)) * step
+        times = np.concatenate([[start_time], steps, [end_time]])
+        margins = self._hitting_margin(self._prepare_predictions(times), xy_vel_bound, z_bound)
+        legal = np.flatnonzero(margins >= 0)
+        if len(legal) == 0:
+            return 0, (0, 0, 0)
+        if legal[0] == 0:
+            return start_time, self.get_prediction(start_time)
+        before, after = times[legal[0] - 1], times[legal[0]]
+        index = int(np.floor((before + after) / 2 / step))
+        cubic = self.trajectory.cubic(index)
+
+        def margin(time):
+            s = time / step - index
+            return self._hitting_margin(cubic @ (s ** 3, s ** 2, s, 1), xy_vel_bound, z_bound)
 
-    def _get_legal_hitting_points_for_times(self, times, xy_vel_bounds, z_bound):
+        time = brentq(margin, before, after, xtol=time_precision)
+        return time, self.get_prediction(time)
+
+    @staticmethod
+    def _hitting_margin(sol, xy_vel_bound, z_bound):
         """
-        Get the legal hitting point as describes in 'get_optimal_hitting_point' for certain discrete times.
-        :param times: the times to consider for the optimal hitting point.
-        :param xy_vel_bounds: the bound on the XY plain velocity.
+        The margin of the criteria described in 'get_optimal_hitting_point', which is non negative iff they are upheld
+        (and is continuous in time, so the time they start to be upheld is a root of it).
+        :param sol: solutions of the ODE.
+        :param xy_vel_bound: the bound on the XY plain velocity.
         :param z_bound: the bound on the height.
-        :return: the times and the ODE's solutions of all the points upholding the criteria described in 'get_optimal_hitting_point'.
+        :return: the minimum of the height above its bound and the XY plain velocity below its bound.
         """
-        preds = self._prepare_predictions(np.insert(times, 0, 0))[1:]
-        mask = np.all([preds[:, 3] >= z_bound, np.abs(preds[:, 0]) <= xy_vel_bounds], axis=0)
-        return times[mask], preds[mask]
+        return np.minimum(sol[..., 3] - z_bound, xy_vel_bound - np.abs(sol[..., 0]))
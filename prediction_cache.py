@@ -0,0 +1,104 @@
+import numpy as np
+
+from prediction import NumericBallPredictor
+from recognizable_object import RecognizableObject
+from utils.time_utils import now
+
+
+class BalloonPredictionCache:
+    """
+    A cache of the predictions of the balloon's location for its current observation.
+    Several states (of both drones) ask for the same predictions in one iteration of the game loop, so the predictor
+    of the observation and the results of its queries are memoized, and evicted when a new observation of the balloon
+    arrives (a new time of the balloon).
+    Has the same prediction methods as the predictor. With latency compensation the times of the queries are
+    relative to the time the observation is first queried (when the commands of the frame are calculated) instead
+    of the time its frames were captured, so the predictions are not late by the latency of the frame.
+    """
+
+    def __init__(self, balloon: RecognizableObject, latency_compensation=True):
+        """
+        Initializes the cache.
+        :param balloon: the object representing the balloon.
+        :param latency_compensation: whether to compensate the latency from the capture of the frames to the queries.
+        """
+        self.balloon = balloon
+        self.latency_compensation = latency_compensation
+        # The time from the capture of the current observation to its first query.
+        self.time_offset = 0
+        self._time = None
+        self._predictor = None
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        total = self.hits + self.misses
+        return "Prediction cache: {} hits, {} misses ({:.0f}% hits)".format(
+            self.hits, self.misses, 100 * self.hits / total if total else 0)
+
+    @property
+    def predictor(self):
+        """
+        :return: the NumericBallPredictor of the current observation of the balloon.
+        """
+        if self._time != self.balloon.time or self._predictor is None:
+            self._predictor = NumericBallPredictor(self.balloon)
+            self._results.clear()
+            self._time = self.balloon.time
+            self.time_offset = now() - self.balloon.time if self.latency_compensation else 0
+        return self._predictor
+
+    def _query(self, method, *args):
+        """
+        Returns the memoized result of a query of the predictor, queries the predictor on a miss.
+        :param method: a method of the cache querying a predictor with the arguments.
+        :param args: the arguments of the query.
+        :return: the result of the query.
+        """
+        predictor = self.predictor
+        key = (method,) + args
+        if key in self._results:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._results[key] = method(predictor, *args)
+        return self._results[key]
+
+    def _get_prediction(self, predictor, time):
+        """
+        :return: the prediction of the predictor at a time relative to the query time.
+        """
+        return predictor.get_prediction(time + self.time_offset)
+
+    def _get_optimal_hitting_point(self, predictor, start_time, end_time, time_precision, xy_vel_bound, z_bound):
+        """
+        :return: the optimal hitting point of the predictor in times relative to the query time.
+        """
+        time, coordinates = predictor.get_optimal_hitting_point(start_time + self.time_offset,
+                                                                end_time + self.time_offset, time_precision,
+                                                                xy_vel_bound, z_bound)
+        return (time - self.time_offset if np.any(coordinates) else time), coordinates
+
+    def get_prediction(self, time):
+        """
+        Predict the balloons location at a certain time (see NumericBallPredictor.get_prediction).
+        :param time: a time (0 is the time of the current observation, or of its first query with latency
+                     compensation).
+        :return: a prediction of the (x, y, z) coordinates of the balloon at the inputted time.
+        """
+        return self._query(self._get_prediction, time)
+
+    def get_optimal_hitting_point(self, start_time=0, end_time=3, time_precision=0.01, xy_vel_bound=5 / 100,
+                                  z_bound=30 / 100):
+        """
+        Predict an optimal hitting point (see NumericBallPredictor.get_optimal_hitting_point).
+        :param start_time: the start time of the search window for the optimal hitting point.
+        :param end_time: the end time of the search window for the optimal hitting point.
+        :param time_precision: the precision of the time of the optimal hitting point.
+        :param xy_vel_bound: the bound on the XY plain velocity.
+        :param z_bound: the bound on the height.
+        :return: the time and location of the prediction of the optimal hitting point in the format (t, (x, ,y, z)).
+        """
+        return self._query(self._get_optimal_hitting_point, start_time, end_time, time_precision, xy_vel_bound,
+                           z_bound)
@@ -2,7 +2,7 @@ import numpy as np
 import cv2
 from scipy.spatial import distance as dist
 
-from utils.image_utils import phys_to_left_pix
+from utils.image_utils import phys_to_left_pix_img
 from utils.consts import FLOOR_HEIGHT
 import CGALPY
 
@@ -140,13 +140,8 @@ class Quadrangle:
             return
         for i in range(len(self._pixels_coordinates)):
             if self.coordinates[i][1] != 0:
-                self._pixels_coordinates[i][0], self._pixels_coordinates[i][1] = phys_to_left_pix(self.coordinates[i][0],
-                                                                                                  self.coordinates[i][1],
-                                                                                                  FLOOR_HEIGHT - 10,
-                                                                                                  left_cam.last_capture.x_n_pix,
-                                                                                                  left_cam.last_capture.z_n_pix,
-                                                                                                  left_cam.fov_horz,
-                                                                                                  left_cam.fov_vert)
+                self._pixels_coordinates[i][0], self._pixels_coordinates[i][1] = \
+                    phys_to_left_pix_img(self.coordinates[i][0], self.coordinates[i][1], FLOOR_HEIGHT - 10, left_cam)
 
     def _generate_arrangement(self):
         """
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import deque
+
+from latency_histogram import LatencyHistogram
+
+
+class RcScheduler:
+    """
+    A class sending the rc commands of a drone from a thread, off the game loop.
+    The game loop submits the desired rc command every frame, and only the latest one is kept. The thread sends it
+    at most at a fixed rate, so a burst of frames after a stall (or a high frame rate) does not flood the UDP link.
+    A command equal to the last sent one is not sent again, except as a keepalive when no command was sent for a
+    while. The times of the sent commands are kept, and the time from submitting to sending each command is measured.
+    Commands that must not wait (stopping the drone) are sent directly by send_now, replacing the pending command.
+    """
+    # The maximal rate of the sent commands in commands per second.
+    RATE = 20
+    # The time in seconds without sending after which the last command is sent again.
+    KEEPALIVE_INTERVAL = 0.5
+    # The number of sent commands kept (with their submit and send times).
+    HISTORY_SIZE = 1000
+
+    def __init__(self, send, rate=RATE, keepalive_interval=KEEPALIVE_INTERVAL, name="rc"):
+        """
+        Initializes the scheduler (the thread is started by start).
+        :param send: a function sending an rc command, called with its 4 velocities.
+        :param rate: the maximal rate of the sent commands in commands per second.
+        :param keepalive_interval: the time in seconds without sending after which the last command is sent again.
+        :param name: the name of the scheduler in its statistics (e.g. the drone).
+        """
+        self.send = send
+        self.period = 1 / rate
+        self.keepalive_interval = keepalive_interval
+        self._condition = threading.Condition()
+        # Orders the sends of the thread and of send_now, a command taken by the thread before a send_now
+        # (an older generation) is not sent.
+        self._send_lock = threading.Lock()
+        self._generation = 0
+        self._pending = None
+        self._pending_time = None
+        self._last_sent = None
+        self._last_send_time = None
+        self._thread = None
+        self._running = False
+        self.submitted = 0
+        self.sent = 0
+        self.suppressed = 0
+        self.keepalives = 0
+        # The last sent commands: (submit time, send time, command), a keepalive has no submit time.
+        self.history = deque(maxlen=RcScheduler.HISTORY_SIZE)
+        self.latency = LatencyHistogram("{} submit to send".format(name))
+
+    def __str__(self):
+        """
+        :return: a string representation of the scheduling statistics.
+        """
+        return "{}: submitted {:d}, sent {:d}, keepalives {:d}, suppressed repeats {:d}".format(
+            self.latency, self.submitted, self.sent, self.keepalives, self.suppressed)
+
+    def start(self):
+        """
+        Starts the send thread.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the send thread (a pending command is not sent).
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, left_right, for_back, up_down, yaw):
+        """
+        Sets the desired rc command, replacing a command that was not sent yet. Never waits.
+        :param left_right: the left/right velocity (-100 to 100).
+        :param for_back: the forward/backward velocity (-100 to 100).
+        :param up_down: the up/down velocity (-100 to 100).
+        :param yaw: the yaw velocity (-100 to 100).
+        """
+        command = (left_right, for_back, up_down, yaw)
+        with self._condition:
+            self.submitted += 1
+            if self._pending is None and command == self._last_sent:
+                # keeps the keepalive going
+                self.suppressed += 1
+                return
+            if self._pending is None:
+                self._pending_time = time.perf_counter()
+            self._pending = command
+            self._condition.notify()
+
+    def send_now(self, left_right, for_back, up_down, yaw):
+        """
+        Sends an rc command from the calling thread (waiting for a send of the thread in progress), dropping the
+        pending command. It is kept as the last sent command (for the keepalives).
+        :param left_right: the left/right velocity (-100 to 100).
+        :param for_back: the forward/backward velocity (-100 to 100).
+        :param up_down: the up/down velocity (-100 to 100).
+        :param yaw: the yaw velocity (-100 to 100).
+        """
+        command = (left_right, for_back, up_down, yaw)
+        with self._condition:
+            self.submitted += 1
+            self._generation += 1
+            self._pending = None
+            self._last_sent, self._last_send_time = command, time.perf_counter()
+            submit_time = self._last_send_time
+        with self._send_lock:
+            self._send(command, submit_time)
+
+    def clear(self):
+        """
+        Drops the pending command and stops the keepalives until the next submitted command (e.g. when landing).
+        """
+        with self._condition:
+            self._pending = None
+            self._last_sent = None
+
+    def _next_command(self):
+        """
+        Waits for the next command to send: the pending command once the rate allows, or a keepalive.
+        :return: the command, its submit time (None for a keepalive) and the generation it was taken in,
+                 or None if the scheduler was stopped.
+        """
+        with self._condition:
+            while self._running:
+                current_time = time.perf_counter()
+                if self._pending is not None:
+                    wait = self._last_send_time + self.period - current_time if self._last_send_time is not None else 0
+                    if wait <= 0:
+                        command, submit_time = self._pending, self._pending_time
+                        self._pending = None
+                        if command == self._last_sent:
+                            # the command returned to the last sent one before it was sent
+                            self.suppressed += 1
+                            continue
+                        self._last_sent, self._last_send_time = command, current_time
+                        return command, submit_time, self._generation
+                elif self._last_sent is not None:
+                    wait = self._last_send_time + self.keepalive_interval - current_time
+                    if wait <= 0:
+                        self.keepalives += 1
+                        self._last_send_time = current_time
+                        return self._last_sent, None, self._generation
+                else:
+                    wait = None
+                self._condition.wait(wait)
+        return None
+
+    def _send_loop(self):
+        """
+        The loop of the send thread.
+        """
+        while True:
+            next_command = self._next_command()
+            if next_command is None:
+                return
+            command, submit_time, generation = next_command
+            with self._send_lock:
+                if generation == self._generation:
+                    self._send(command, submit_time)
+
+    def _send(self, command, submit_time):
+        """
+        Sends a command and records it (called with the send lock held).
+        :param command: the rc command.
+        :param submit_time: the time the command was submitted, None for a keepalive.
+        """
+        self.send(*command)
+        send_time = time.perf_counter()
+        self.sent += 1
+        self.history.append((submit_time, send_time, command))
+        if submit_time is not None:
+            self.latency.add(send_time - submit_time)
@@ -1,8 +1,7 @@
-import numpy as np
-import datetime
-
 from camera import Camera
 from object_in_frame import ObjectInFrame
+from velocity_history import VelocityHistory
+from stereo_rig import StereoRig
 
 
 class RecognizableObject:
@@ -25,8 +24,16 @@ class RecognizableObject:
         self.text_colors = text_color
         self.object_exists = False
         self.time = 0
-        self.prev_coordinates = np.zeros((0, 3))
-        self.prev_times = np.zeros(0, dtype='datetime64')
+        # The time of the last observation in which the object was detected.
+        self.measurement_time = 0
+        self.history = VelocityHistory(RecognizableObject.NUM_OF_PREVS)
+        # Used when the object is triangulated by itself (the objects are usually triangulated together).
+        self.stereo_rig = StereoRig()
+        # The BalloonPredictionCache of the object's predictions (only set for the balloon).
+        self.prediction_cache = None
+        # The StateEstimator filtering the object's coordinates and velocity (see state_estimation),
+        # the coordinates are the measured ones and the velocity is fitted from the history when there is none.
+        self.estimator = None
         self.name = name
 
     @property
@@ -78,72 +85,63 @@ class RecognizableObject:
         :param right: the right camera's Camera object.
         :param d: the distance between the cameras
         """
-        self.time = datetime.datetime.now()
         self.set_frames(left.last_capture, right.last_capture)
         self._detect_pixel_coordinates()
-        self.object_exists = False
-        if self.frame_left.x != 0 and self.frame_right.x != 0:
-            self.object_exists = True
-            self._calculate_coordinates(left, right, d)
-            # Calculates the object's velocity using the NUM_OF_PREVS last coordinates and the times they where set.
-            now = np.array([self.time], dtype='datetime64')
-            here = [self.x, self.y, self.z]
-            if len(self.prev_times) == RecognizableObject.NUM_OF_PREVS:
-                diff_times = self.prev_times - now
-                diff_times = diff_times.astype('int') * 10 ** -6
-                diff_coordinate = self.prev_coordinates - here
-                velocities = (diff_coordinate.T / diff_times).T
-                self.vx, self.vy, self.vz = np.mean(velocities, axis=0)
-                self.prev_times = np.append(self.prev_times[1:], now)
-                self.prev_coordinates = np.vstack([self.prev_coordinates[1:], here])
-            else:
-                self.prev_times = np.append(self.prev_times, now)
-                self.prev_coordinates = np.vstack([self.prev_coordinates, here])
+        self.set_coordinates(left, right, d)
 
-    def _calculate_coordinates(self, left: Camera, right: Camera, d):
+    def set_coordinates(self, left: Camera, right: Camera, d):
         """
-        Calculates the real life coordinates of the object
+        Sets the real life coordinates and velocity of the object from its detected pixel coordinates on each side.
         :param left: the left camera's Camera object.
         :param right: the right camera's Camera object.
         :param d: the distance between the cameras
         """
-        x_left, x_right = self.frame_left.x, self.frame_right.x
-        self.x, self.y = self._calculate_xy(left, right, d, x_left, x_right)
-        z_pix = self.frame_left.y
-        # y axis in the frame is actually the z axis in our system
-        self.z = self._calculate_z(left, self.y, z_pix)
+        self.stereo_rig.set_coordinates([self], left, right, d)
+
+    def update(self, time, coordinates):
+        """
+        Updates the object with an observation.
+        :param time: the time of the observation.
+        :param coordinates: the real life (x, y, z) coordinates of the object, or None if it was not detected.
+        """
+        self.time = time
+        self.object_exists = coordinates is not None
+        if self.object_exists:
+            self.measurement_time = time
+            self.history.push(self.time, *coordinates)
+        if self.estimator is not None:
+            # The estimated state is predicted through the frames in which the object was not detected.
+            if self.estimator.update(time, coordinates):
+                self.x, self.y, self.z = self.estimator.position
+                self.vx, self.vy, self.vz = self.estimator.velocity
+        elif self.object_exists:
+            self.x, self.y, self.z = coordinates
+            # Calculates the object's velocity using the NUM_OF_PREVS last coordinates and the times they where set.
+            if self.history.is_full:
+                velocity = self.history.velocity()
+                if velocity is not None:
+                    self.vx, self.vy, self.vz = velocity
 
-    def _calculate_xy(self, left: Camera, right: Camera, cam_dist, x_left, x_right):
+    def state_at(self, time):
         """
-        Calculates the real life x,y coordinates of the object in centimeters.
-        :param left: the left camera's Camera object.
-        :param right: the right camera's Camera object.
-        :param cam_dist: the distance between the cameras
-        :param x_left: the x pixel location of the object in the left frame.
-        :param x_right: the x pixel location of the object in the right frame.
-        :return: the x,y coordinates of the object.
-        """
-        # p is just a used for calculation, see documentation.
-        p_left = (self.frame_left.image.shape[1] / 2) / np.tan(left.fov_horz / 2)
-        angle_left = np.pi / 2 - np.arctan2(left.flip * (x_left - self.frame_left.image.shape[1] / 2), p_left)
-        p_right = (self.frame_right.image.shape[1] / 2) / np.tan(right.fov_horz / 2)
-        angle_right = np.pi / 2 - np.arctan2(right.flip * (-x_right + self.frame_right.image.shape[1] / 2), p_right)
-        # left_cam camera is at (0,0) and right_cam at (0,d)
-        x = cam_dist * np.tan(angle_right) / (np.tan(angle_right) + np.tan(angle_left))
-        y = x * np.tan(angle_left)
-        return x, y
+        Extrapolates the object's state with the estimator's model if there is, else at a constant velocity from the
+        time of its last detection (the coordinates are not updated in the observations it is not detected in).
+        :param time: the time to extrapolate the state to.
+        :return: the (x, y, z) coordinates and (vx, vy, vz) velocity of the object at the time.
+        """
+        if self.estimator is not None and self.estimator.time is not None:
+            return self.estimator.state_at(time)
+        dt = time - self.measurement_time
+        return (self.x + self.vx * dt, self.y + self.vy * dt, self.z + self.vz * dt), (self.vx, self.vy, self.vz)
 
-    def _calculate_z(self, cam: Camera, y_cm, z_pix):
+    def velocity_std(self):
         """
-        Calculates the real life z point of the object in centimeters.
-        :param cam: one of the camera's Camera object (arbitrarily the left camera).
-        :param y_cm: the real life y point of the objet
-        :param z_pix: the z pixel location of the object in the frame of the inputted camera.
-        :return: the z point of the object.
+        :return: the standard deviation of the object's (vx, vy, vz) velocity,
+                 or None if there are not enough measurements to estimate it.
         """
-        n_pixels = self.frame_right.image.shape[0]  # Number of pixels in z axis.
-        p = (n_pixels / 2) / np.tan(cam.fov_vert / 2)
-        return y_cm * (n_pixels / 2 - z_pix) / p
+        if self.estimator is not None:
+            return self.estimator.velocity_std if self.estimator.time is not None else None
+        return self.history.velocity_std()
 
     def detect_color(self, is_left):
         """
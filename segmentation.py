@@ -0,0 +1,187 @@
+import numpy as np
+import cv2
+
+from camera import Camera
+from object_in_frame import ObjectInFrame
+from stereo_rig import StereoRig
+
+
+class ColorSegmentation:
+    """
+    A class detecting all the recognizable objects in a frame in a single pass over the regions they are searched in.
+    Every object is searched in a window around its previous location, or in the full frame if it was lost (as in
+    ObjectInFrame.detect_pixel_coordinates). The windows are merged into regions, and every pixel of a region is
+    labeled once with a bitmask of the objects whose color bounds contain it using per channel lookup tables (the
+    color bounds are boxes in HSV, so a pixel is inside an object's bounds iff each of its channels is inside the
+    object's bounds of that channel). The noise is removed from the mask of each object in its own window, and its
+    centroid and bounding box are calculated from the mask with image moments, without collecting its pixels.
+    """
+    # The maximal number of objects (the number of bits in a label).
+    MAX_OBJECTS = 16
+
+    def __init__(self, recognizable_objects):
+        """
+        Initializes the segmentation.
+        :param recognizable_objects: a list of the RecognizableObjects to detect.
+        """
+        if len(recognizable_objects) > ColorSegmentation.MAX_OBJECTS:
+            raise ValueError("Can not segment more than {} objects".format(ColorSegmentation.MAX_OBJECTS))
+        self.recognizable_objects = recognizable_objects
+        # The lookup table of each side, with the color bounds it was built from.
+        self._luts = [None, None]
+        self._lut_bounds = [None, None]
+        self.stereo_rig = StereoRig()
+
+    @staticmethod
+    def _build_lut(objects_in_frame):
+        """
+        Builds a lookup table from a value of each HSV channel to a bitmask of the objects it is in the bounds of.
+        :param objects_in_frame: the ObjectInFrames of the objects in one side.
+        :return: the lookup table in the format of cv2.LUT for a 3 channels image.
+        """
+        lut = np.zeros((256, 1, 3), dtype=np.uint16)
+        values = np.arange(256)
+        for i, obj in enumerate(objects_in_frame):
+            for channel in range(3):
+                in_bounds = (obj.lower_hsv[channel] <= values) & (values <= obj.upper_hsv[channel])
+                lut[in_bounds, 0, channel] |= 1 << i
+        return lut
+
+    def _get_lut(self, side, objects_in_frame):
+        """
+        Returns the lookup table of a side, rebuilds it if the color bounds of one of the objects changed.
+        :param side: the index of the side (0 for left and 1 for right).
+        :param objects_in_frame: the ObjectInFrames of the objects in the side.
+        :return: the lookup table of the side.
+        """
+        bounds = [(obj.lower_hsv, obj.upper_hsv) for obj in objects_in_frame]
+        if bounds != self._lut_bounds[side]:
+            self._luts[side] = self._build_lut(objects_in_frame)
+            self._lut_bounds[side] = bounds
+        return self._luts[side]
+
+    @staticmethod
+    def merge_windows(windows):
+        """
+        Merges overlapping windows into regions, until no two regions overlap.
+        :param windows: a list of (x_min, x_max, y_min, y_max) windows.
+        :return: a list of the (x_min, x_max, y_min, y_max) regions, each containing the windows merged into it.
+        """
+        regions = []
+        for window in windows:
+            x_min, x_max, y_min, y_max = window
+            merged = True
+            while merged:
+                merged = False
+                for region in regions:
+                    if region[0] < x_max and x_min < region[1] and region[2] < y_max and y_min < region[3]:
+                        regions.remove(region)
+                        x_min, x_max = min(x_min, region[0]), max(x_max, region[1])
+                        y_min, y_max = min(y_min, region[2]), max(y_max, region[3])
+                        merged = True
+                        break
+            regions.append((x_min, x_max, y_min, y_max))
+        return regions
+
+    @staticmethod
+    def label(hsv, lut):
+        """
+        Labels each pixel of an HSV image with the bitmask of the objects it belongs to.
+        :param hsv: the HSV image to label (a region of a frame).
+        :param lut: the lookup table of the side of the frame.
+        :return: the labels image.
+        """
+        h, s, v = cv2.split(cv2.LUT(hsv, lut))
+        return cv2.bitwise_and(cv2.bitwise_and(h, s), v)
+
+    @staticmethod
+    def detect_label(labels, bit, threshold_size):
+        """
+        Detects an object in a labels image, after removing the noise from its mask.
+        :param labels: the labels image (of the window the object is searched in).
+        :param bit: the bit of the object in the labels.
+        :param threshold_size: the size of the kernel used to remove noise.
+        :return: the (x, y) centroid, area and bounding box (x, y, width, height) of the object in the image,
+                 or None if it was not detected.
+        """
+        mask = cv2.compare(cv2.bitwise_and(labels, 1 << bit), 0, cv2.CMP_GT)
+        kernel = np.ones((threshold_size, threshold_size), np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        moments = cv2.moments(mask, binaryImage=True)
+        if moments['m00'] == 0:
+            return None
+        return moments['m10'] / moments['m00'], moments['m01'] / moments['m00'], moments['m00'], \
+            cv2.boundingRect(mask)
+
+    def detect_side(self, side, frame, objects_in_frame, distances):
+        """
+        Detects and sets the pixel coordinates of all the objects in one side.
+        :param side: the index of the side (0 for left and 1 for right).
+        :param frame: the Frame of the side.
+        :param objects_in_frame: the ObjectInFrames of the objects in the side.
+        :param distances: the distances of the objects from the camera in the previous frame.
+        """
+        lut = self._get_lut(side, objects_in_frame)
+        windows = []
+        for obj, distance in zip(objects_in_frame, distances):
+            obj.set_frame(frame)
+            windows.append(obj.search_window(distance))
+        lost = [bit for bit, window in enumerate(windows) if window is None]
+        if lost:
+            self._search_lost(frame, objects_in_frame, windows, lost, lut)
+        for region in self.merge_windows([window for window in windows if window is not None]):
+            labels = self.label(frame.get_hsv(*region), lut)
+            for bit, (obj, window) in enumerate(zip(objects_in_frame, windows)):
+                if window is None:
+                    continue
+                x_min, x_max, y_min, y_max = window
+                if not (region[0] <= x_min and x_max <= region[1] and region[2] <= y_min and y_max <= region[3]):
+                    continue
+                detection = self.detect_label(labels[y_min - region[2]:y_max - region[2],
+                                                     x_min - region[0]:x_max - region[0]], bit, frame.threshold_size)
+                if detection is None:
+                    obj.set_detection(0, 0, 0, (0, 0, 0, 0))
+                    continue
+                x, y, area, (x_box, y_box, w_box, h_box) = detection
+                obj.set_detection(int(x + x_min), int(y + y_min), int(area),
+                                  (x_box + x_min, y_box + y_min, w_box, h_box))
+
+    def _search_lost(self, frame, objects_in_frame, windows, lost, lut):
+        """
+        Searches the lost objects in the full frame, coarse to fine (as ObjectInFrame._detect_pyramid): the
+        downscaled frame is labeled once for all of them, and the window of each detected object is set to a
+        small full resolution window around its coarse detection. The objects that are not detected are reset.
+        :param frame: the Frame of the side.
+        :param objects_in_frame: the ObjectInFrames of the objects in the side.
+        :param windows: the windows of the objects, updated in place (None for a lost object that is not detected).
+        :param lost: the indices of the lost objects.
+        :param lut: the lookup table of the side.
+        """
+        scale = objects_in_frame[lost[0]].pyramid_scale
+        if scale <= 1:
+            for bit in lost:
+                windows[bit] = (0, frame.x_n_pix, 0, frame.z_n_pix)
+            return
+        labels = self.label(frame.get_downscaled_hsv(scale), lut)
+        margin = ObjectInFrame.PYRAMID_REFINE_MARGIN
+        for bit in lost:
+            detection = self.detect_label(labels, bit, max(1, frame.threshold_size // scale))
+            if detection is None:
+                objects_in_frame[bit].set_detection(0, 0, 0, (0, 0, 0, 0))
+                continue
+            _, _, _, (x_box, y_box, w_box, h_box) = detection
+            windows[bit] = (max((x_box - margin) * scale, 0), min((x_box + w_box + margin) * scale, frame.x_n_pix),
+                            max((y_box - margin) * scale, 0), min((y_box + h_box + margin) * scale, frame.z_n_pix))
+
+    def detect_and_set_coordinates(self, left: Camera, right: Camera, d):
+        """
+        Detects and sets the real life coordinates and velocity of all the objects.
+        :param left: the left camera's Camera object.
+        :param right: the right camera's Camera object.
+        :param d: the distance between the cameras
+        """
+        distances = [recognizable_object.y for recognizable_object in self.recognizable_objects]
+        self.detect_side(0, left.last_capture, [obj.frame_left for obj in self.recognizable_objects], distances)
+        self.detect_side(1, right.last_capture, [obj.frame_right for obj in self.recognizable_objects], distances)
+        self.stereo_rig.set_coordinates(self.recognizable_objects, left, right, d)
@@ -0,0 +1,461 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from bisect import bisect_right
+
+import numpy as np
+import cv2
+
+from camera import Camera
+from control_socket import ControlSocket
+from frame import Frame
+from headless_gui import HeadlessGui
+from tello import TelloState
+from tello_drone_control import TelloDroneControl
+from utils.time_utils import now, set_clock
+
+
+class SessionRecorder:
+    """
+    A class recording a game session for replaying it offline: the stereo pairs, the state packets of the drones
+    and the rc commands sent to them.
+    A recording is a directory with a video of each camera, a copy of the configuration files and an index -
+    a JSON line per event: a pair (the capture times of its frames, the frames are in the videos in the order of the
+    pairs), a state packet of a drone (its fields), an rc command (the time and the velocities) or an input of the
+    user (the event and the values of the gui). The state packets and the inputs are stamped with the time of the pair
+    they were received in (the later capture time of its frames), so a replay receives them in the same pairs.
+    The frames are written to the videos in a writer thread, so the game loop does not wait for the encoding.
+    The images are copied when they are recorded (the gui draws on the frames after), and if the writer falls behind
+    by MAX_QUEUED_PAIRS pairs the new pairs are dropped from the recording (both the frames and the pair event,
+    so the frames of the videos stay in the order of the pairs in the index).
+    """
+    LEFT_VIDEO = "left.avi"
+    RIGHT_VIDEO = "right.avi"
+    INDEX = "index.jsonl"
+    # The codec of the videos (MJPG encodes every frame on its own, so it is cheap to write and to seek).
+    FOURCC = "MJPG"
+    # The frame rate written in the videos (only for viewing them, the times of the frames are in the index).
+    FPS = 30
+    # The maximal number of pairs waiting for the writer thread (about a second).
+    MAX_QUEUED_PAIRS = 30
+
+    def __init__(self, directory, config_files=(), fourcc=FOURCC):
+        """
+        Initializes the recorder and starts its writer thread.
+        :param directory: the directory to record to (created if it does not exist).
+        :param config_files: the configuration files to copy to the recording (like the colors and the borders).
+        :param fourcc: the codec of the videos.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for filename in config_files:
+            if os.path.exists(filename):
+                shutil.copy(filename, directory)
+        self.directory = directory
+        self.fourcc = fourcc
+        self._index = open(os.path.join(directory, SessionRecorder.INDEX), "w")
+        self._writers = None
+        self._last_states = {}
+        self.pairs = 0
+        self.dropped_pairs = 0
+        self.time = 0
+        self._frames = queue.Queue(SessionRecorder.MAX_QUEUED_PAIRS)
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def __str__(self):
+        """
+        :return: a string representation of the recording.
+        """
+        return "recorded {:d} pairs to {} (dropped {:d})".format(self.pairs, self.directory, self.dropped_pairs)
+
+    def attach(self, drones):
+        """
+        Records the rc commands sent to the drones.
+        :param drones: a list of the Drones.
+        """
+        for drone in drones:
+            drone.drone_control.command_listener = \
+                lambda command, ident=drone.ident: self.record_command(ident, command)
+
+    def record(self, left, right, drones=()):
+        """
+        Records the last captured pair of the cameras and the new state packets of the drones.
+        :param left: the left Camera.
+        :param right: the right Camera.
+        :param drones: a list of the Drones.
+        """
+        self.record_pair(left.last_capture, right.last_capture)
+        for drone in drones:
+            state = drone.drone_control.get_state()
+            # the tello replaces its state dictionary with every packet
+            if state and state is not self._last_states.get(drone.ident):
+                self._last_states[drone.ident] = state
+                self._write_event({"type": "state", "drone": drone.ident, "time": self.time, "state": state})
+
+    def record_pair(self, left_frame: Frame, right_frame: Frame):
+        """
+        Records a stereo pair (drops it if the writer thread is behind).
+        :param left_frame: the Frame of the left camera.
+        :param right_frame: the Frame of the right camera.
+        """
+        self.time = max(left_frame.capture_time, right_frame.capture_time)
+        try:
+            self._frames.put_nowait((left_frame.image.copy(), right_frame.image.copy()))
+        except queue.Full:
+            if not self.dropped_pairs:
+                print("recording: the video writer is behind, dropping pairs")
+            self.dropped_pairs += 1
+            return
+        self._write_event({"type": "pair", "index": self.pairs, "left_time": left_frame.capture_time,
+                           "right_time": right_frame.capture_time})
+        self.pairs += 1
+
+    def record_command(self, ident, command):
+        """
+        Records an rc command sent to a drone.
+        :param ident: the id of the drone.
+        :param command: the (left/right, forward/backward, up/down, yaw) velocities.
+        """
+        self._write_event({"type": "rc", "drone": ident, "time": now(), "command": [int(v) for v in command]})
+
+    def record_input(self, event, values):
+        """
+        Records an input of the user (if there is).
+        :param event: the event of the input.
+        :param values: the values of the gui.
+        """
+        # the event of no input of the gui is the same as of the control socket
+        if event != ControlSocket.TIMEOUT_EVENT:
+            self._write_event({"type": "input", "time": self.time, "event": event, "values": values})
+
+    def _write_event(self, event):
+        """
+        Writes an event to the index.
+        :param event: a dictionary of the event.
+        """
+        self._index.write(json.dumps(event, default=str) + "\n")
+
+    def _write_loop(self):
+        """
+        The loop of the writer thread - writes the recorded frames to the videos (until None is queued).
+        """
+        while True:
+            images = self._frames.get()
+            if images is None:
+                break
+            if self._writers is None:
+                fourcc = cv2.VideoWriter_fourcc(*self.fourcc)
+                self._writers = [cv2.VideoWriter(os.path.join(self.directory, name), fourcc, SessionRecorder.FPS,
+                                                 (image.shape[1], image.shape[0]))
+                                 for name, image in zip([SessionRecorder.LEFT_VIDEO, SessionRecorder.RIGHT_VIDEO],
+                                                        images)]
+            for writer, image in zip(self._writers, images):
+                writer.write(image)
+
+    def close(self):
+        """
+        Writes the remaining frames and closes the videos and the index.
+        """
+        self._frames.put(None)
+        self._thread.join()
+        for writer in self._writers or []:
+            writer.release()
+        self._index.close()
+
+
+class SessionRecording:
+    """
+    A class reading a recording of a game session (see SessionRecorder).
+    """
+
+    def __init__(self, directory):
+        """
+        Reads the index of the recording.
+        :param directory: the directory of the recording.
+        """
+        self.directory = directory
+        self.pair_times = []
+        self.states = {}
+        self.commands = {}
+        self.inputs = []
+        with open(os.path.join(directory, SessionRecorder.INDEX)) as index:
+            for line in index:
+                event = json.loads(line)
+                if event["type"] == "pair":
+                    self.pair_times.append((event["left_time"], event["right_time"]))
+                elif event["type"] == "state":
+                    self.states.setdefault(event["drone"], []).append((event["time"], event["state"]))
+                elif event["type"] == "rc":
+                    self.commands.setdefault(event["drone"], []).append((event["time"], tuple(event["command"])))
+                elif event["type"] == "input":
+                    self.inputs.append((event["time"], event["event"], event["values"]))
+
+    def __len__(self):
+        return len(self.pair_times)
+
+    def config_file(self, filename):
+        """
+        :param filename: the name of a configuration file.
+        :return: the path of the copy of the file in the recording if there is, else the file name.
+        """
+        path = os.path.join(self.directory, os.path.basename(filename))
+        return path if os.path.exists(path) else filename
+
+    def cameras(self, left: Camera, right: Camera):
+        """
+        :param left: the left Camera the session was recorded with.
+        :param right: the right Camera the session was recorded with.
+        :return: the left and right ReplayCameras of the recording.
+        """
+        left_times, right_times = zip(*self.pair_times) if self.pair_times else ((), ())
+        return (ReplayCamera(left, os.path.join(self.directory, SessionRecorder.LEFT_VIDEO), left_times),
+                ReplayCamera(right, os.path.join(self.directory, SessionRecorder.RIGHT_VIDEO), right_times))
+
+
+class ReplayCamera(Camera):
+    """
+    A camera replaying the video of a camera in a recording, the frames are stamped with their recorded capture times.
+    """
+
+    def __init__(self, camera: Camera, filename, capture_times):
+        """
+        Initializes the replay camera.
+        :param camera: the Camera the video was recorded with (for its field of view and flip).
+        :param filename: the video file.
+        :param capture_times: the recorded capture times of the frames of the video.
+        """
+        super().__init__(np.degrees(camera.fov_horz), np.degrees(camera.fov_vert), filename, camera.is_flipped)
+        self.capture_times = capture_times
+        self.frame_index = 0
+
+    def _open(self):
+        if not self.vid:
+            self.vid = cv2.VideoCapture(self.index)
+
+    def grab(self):
+        if self.frame_index >= len(self.capture_times):
+            return False
+        self._open()
+        grabbed = self.vid.grab()
+        self.grab_time = self.capture_times[self.frame_index]
+        self.frame_index += 1
+        return grabbed
+
+
+class ReplayCapture:
+    """
+    A replacement for StereoCapture replaying a recording as fast as possible: every capture reads the next pair of
+    the recording (no pair is dropped), and the clock of the game (utils.time_utils.now) follows the capture times
+    of the replayed pairs. Only the game and its timers read this clock, the profiling (e.g. the loop rate and the
+    detection timings) reads the real clock.
+    The clock is the capture time of the last replayed pair advanced by the real time spent since it was replayed
+    (up to the capture time of the next pair), so the latency compensation of the commands sees the processing
+    time of the replay as it would live. Without the processing time the replay is deterministic, but the commands
+    are computed for a zero latency.
+    """
+
+    def __init__(self, left: ReplayCamera, right: ReplayCamera, processing_time=True):
+        """
+        Initializes the replay capture.
+        :param left: the left ReplayCamera.
+        :param right: the right ReplayCamera.
+        :param processing_time: whether the clock advances by the real processing time of each pair, or stays at its
+                                capture time (a deterministic replay).
+        """
+        self.left = left
+        self.right = right
+        self.processing_time = processing_time
+        self.time = left.capture_times[0] if len(left.capture_times) else 0
+        self._first_time = self.time
+        self._next_time = self.time
+        self._pair_real_time = 0
+        self.pairs = 0
+        self.running = False
+        self._real_start = 0
+        self.real_duration = 0
+
+    def __str__(self):
+        """
+        :return: a string representation of the replay statistics.
+        """
+        return "replayed pairs: {:d} of {:.2f} s in {:.2f} s ({:.1f} pairs/s)".format(
+            self.pairs, self.time - self._first_time, self.real_duration,
+            self.pairs / self.real_duration if self.real_duration else 0)
+
+    def _clock(self):
+        """
+        :return: the capture time of the last replayed pair, advanced by the real time since it was replayed
+                 (up to the capture time of the next pair) if the processing time is replayed.
+        """
+        if not self.processing_time:
+            return self.time
+        return min(self.time + time.perf_counter() - self._pair_real_time, self._next_time)
+
+    @staticmethod
+    def _next_capture_time(camera: ReplayCamera):
+        """
+        :param camera: a ReplayCamera.
+        :return: the capture time of the next frame of the camera, infinity at the end of the recording.
+        """
+        if camera.frame_index < len(camera.capture_times):
+            return camera.capture_times[camera.frame_index]
+        return float('inf')
+
+    def start(self):
+        """
+        Starts the replay, from now on the clock of the game is the clock of the recording.
+        """
+        self.running = True
+        self._real_start = time.perf_counter()
+        set_clock(self._clock)
+
+    def stop(self):
+        """
+        Stops the replay and restores the clock of the game.
+        """
+        if self.running:
+            self.running = False
+            self.real_duration = time.perf_counter() - self._real_start
+            set_clock()
+
+    def capture(self, timeout=None):
+        """
+        Reads the next pair of the recording as the last captures of the cameras (stops at the end of the recording).
+        :param timeout: ignored, the replay never waits.
+        :return: whether the capture succeeded or not.
+        """
+        if not self.running:
+            return False
+        if not (self.left.capture() and self.right.capture()):
+            self.stop()
+            return False
+        self.time = max(self.left.last_capture.capture_time, self.right.last_capture.capture_time)
+        self._next_time = max(self._next_capture_time(self.left), self._next_capture_time(self.right))
+        self._pair_real_time = time.perf_counter()
+        self.pairs += 1
+        return True
+
+
+class FakeTello:
+    """
+    A stand-in for the Tello of a drone in a replay: commands are not sent anywhere, and the state packets are
+    replayed from the recording by the clock of the game.
+    """
+
+    def __init__(self, states=()):
+        """
+        Initializes the fake tello.
+        :param states: the recorded (time, state) packets of the drone.
+        """
+        self.state_times = [state_time for state_time, _ in states]
+        self.states = [state for _, state in states]
+        # The recorded packets as snapshots (see Tello.read_state), the first for before the first packet.
+        self.snapshots = [TelloState()]
+        for state_time, state in states:
+            self.snapshots.append(TelloState())
+            self.snapshots[-1].set_fields(state, state_time)
+        self.commands = []
+
+    def connect(self):
+        pass
+
+    def takeoff(self):
+        pass
+
+    def land(self):
+        pass
+
+    def send_rc_control(self, left_right, for_back, up_down, yaw):
+        """
+        Keeps an rc command with the time it was sent.
+        """
+        self.commands.append((now(), (left_right, for_back, up_down, yaw)))
+
+    def get_current_state(self):
+        """
+        :return: the last recorded state packet at the current time of the game (empty before the first).
+        """
+        index = bisect_right(self.state_times, now())
+        return self.states[index - 1] if index else {}
+
+    def read_state(self, into):
+        """
+        Copies the last recorded state packet at the current time of the game into a snapshot.
+        :param into: the TelloState to copy the packet into.
+        :return: the snapshot.
+        """
+        self.snapshots[bisect_right(self.state_times, now())].copy_to(into)
+        return into
+
+    def get_battery(self):
+        """
+        :return: the battery percentage in the current state packet.
+        """
+        return self.get_current_state().get('bat', 0)
+
+
+class ReplayDroneControl(TelloDroneControl):
+    """
+    A fake drone controller for replays: calculates the commands as the TelloDroneControl does, and sends them to a
+    FakeTello (which keeps them, to compare with the recorded commands).
+    """
+
+    def __init__(self, recording: SessionRecording, ident):
+        """
+        Initializes the replay drone controller.
+        :param recording: the SessionRecording.
+        :param ident: the id of the drone in the recording.
+        """
+        super().__init__(iface_ip=None)
+        self.tello = FakeTello(recording.states.get(ident, []))
+        self.recorded_commands = recording.commands.get(ident, [])
+        # The commands are sent in the game loop, so the replay does not depend on the timing of a thread.
+        self.rc_scheduler = None
+
+    def __str__(self):
+        """
+        :return: a string comparing the replayed commands to the recorded commands.
+        """
+        replayed = [command for _, command in self.tello.commands]
+        recorded = [command for _, command in self.recorded_commands]
+        matching = sum(a == b for a, b in zip(replayed, recorded))
+        return "rc commands replayed: {:d}, recorded: {:d}, matching: {:d}".format(
+            len(replayed), len(recorded), matching)
+
+
+class ReplayGui(HeadlessGui):
+    """
+    A user interface replaying the recorded inputs of the user, each at its recorded time by the clock of the game.
+    """
+
+    def __init__(self, recording: SessionRecording):
+        """
+        Initializes the replay gui.
+        :param recording: the SessionRecording.
+        """
+        self.inputs = recording.inputs
+        self.next_input = 0
+
+    def __str__(self):
+        """
+        :return: a string representation of the replayed inputs.
+        """
+        return "inputs replayed: {:d} of {:d}".format(self.next_input, len(self.inputs))
+
+    def read(self, timeout=1):
+        """
+        Reads the next recorded input if its time has come.
+        :param timeout: ignored, the replay never waits.
+        :return: the event of the input (ControlSocket.TIMEOUT_EVENT if there is no input) and its values.
+        """
+        if self.next_input == len(self.inputs) or self.inputs[self.next_input][0] > now():
+            return ControlSocket.TIMEOUT_EVENT, dict(HeadlessGui.DEFAULT_VALUES)
+        _, event, values = self.inputs[self.next_input]
+        self.next_input += 1
+        return event, dict(HeadlessGui.DEFAULT_VALUES, **values)
+
+    def close(self):
+        pass
@@ -0,0 +1,218 @@
+import numpy as np
+
+from prediction import NumericBallPredictor
+
+
+class StateEstimator:
+    """
+    A base class for Kalman filters estimating the 3D state of an object from its measured coordinates
+    (a pluggable estimator of RecognizableObject, see RecognizableObject.estimator).
+    The state starts with the position and the velocity (in cm and cm/s) followed by the rest of the model's state,
+    each a 3D block. Every observation predicts the state to its time (so the state keeps moving through frames
+    in which the object was not detected), and corrects it with the measured coordinates if there are.
+    A subclass defines the model: the transition of the state and the noise of the process.
+    When there are no measurements for more than MAX_GAP the object is lost: the state is not predicted anymore, and
+    the state of the last measurement is held (as the coordinates of an undetected object without an estimator).
+    """
+    # The standard deviation of a measured coordinate in cm.
+    MEASUREMENT_STD = 3
+    # The initial standard deviation of each block of the state.
+    INITIAL_STD = (MEASUREMENT_STD, 100)
+    # The time in seconds without measurements after which the object is lost (the state is held, and the filter is
+    # restarted by the next measurement).
+    MAX_GAP = 1
+
+    def __init__(self):
+        """
+        Initializes the estimator (without a state until the first measurement).
+        """
+        self.size = 3 * len(self.INITIAL_STD)
+        self.state = np.zeros(self.size)
+        self.covariance = np.eye(self.size)
+        self.time = None
+        self.last_measurement_time = None
+        # The state after the last measurement (held when the object is lost).
+        self._measured_state = self.state.copy()
+        self._measurement_noise = self.MEASUREMENT_STD ** 2 * np.eye(3)
+
+    @property
+    def position(self):
+        """
+        :return: the estimated (x, y, z) coordinates.
+        """
+        return self.state[:3]
+
+    @property
+    def velocity(self):
+        """
+        :return: the estimated (vx, vy, vz) velocity.
+        """
+        return self.state[3:6]
+
+    @property
+    def velocity_std(self):
+        """
+        :return: the standard deviation of the estimated (vx, vy, vz) velocity.
+        """
+        return np.sqrt(np.diag(self.covariance)[3:6])
+
+    def _transition(self, dt):
+        """
+        :param dt: the time to predict the state in, in seconds.
+        :return: the state predicted after dt, and the Jacobian of the transition.
+        """
+        raise NotImplementedError
+
+    def _process_noise(self, dt):
+        """
+        :param dt: the time to predict the state in, in seconds.
+        :return: the covariance of the noise the process adds to the state in dt.
+        """
+        raise NotImplementedError
+
+    def reset(self, time, coordinates):
+        """
+        Restarts the state at measured coordinates (with no knowledge of the rest of the state).
+        :param time: the time of the measurement.
+        :param coordinates: the measured (x, y, z) coordinates.
+        """
+        self.state[:] = 0
+        self.state[:3] = coordinates
+        self.covariance = np.diag(np.repeat(np.square(self.INITIAL_STD, dtype=float), 3))
+        self.time = self.last_measurement_time = time
+        self._measured_state = self.state.copy()
+
+    def is_lost(self, time):
+        """
+        :param time: a time.
+        :return: whether there were no measurements for more than MAX_GAP before the time.
+        """
+        return self.last_measurement_time is not None and time - self.last_measurement_time > self.MAX_GAP
+
+    def predict(self, time):
+        """
+        Predicts the state at a time.
+        :param time: the time to predict the state at.
+        """
+        dt = time - self.time
+        if dt <= 0:
+            return
+        self.state, jacobian = self._transition(dt)
+        self.covariance = jacobian @ self.covariance @ jacobian.T + self._process_noise(dt)
+        self.time = time
+
+    def state_at(self, time):
+        """
+        Predicts the state at a time without changing the estimated state.
+        :param time: the time to predict the state at.
+        :return: the predicted (x, y, z) coordinates and (vx, vy, vz) velocity.
+        """
+        if self.is_lost(time):
+            state = self._measured_state
+        else:
+            state = self._transition(time - self.time)[0] if time > self.time else self.state
+        return tuple(state[:3]), tuple(state[3:6])
+
+    def correct(self, coordinates):
+        """
+        Corrects the predicted state with measured coordinates.
+        :param coordinates: the measured (x, y, z) coordinates.
+        """
+        # the measurement is the position, the first block of the state
+        innovation_covariance = self.covariance[:3, :3] + self._measurement_noise
+        gain = np.linalg.solve(innovation_covariance, self.covariance[:3, :]).T
+        self.state = self.state + gain @ (np.asarray(coordinates, dtype=float) - self.state[:3])
+        self.covariance = self.covariance - gain @ self.covariance[:3, :]
+        self.covariance = (self.covariance + self.covariance.T) / 2
+
+    def update(self, time, coordinates):
+        """
+        Updates the state with an observation.
+        :param time: the time of the observation.
+        :param coordinates: the measured (x, y, z) coordinates, or None if the object was not detected.
+        :return: whether the estimator has a state.
+        """
+        if coordinates is not None and (self.time is None or self.is_lost(time)):
+            self.reset(time, coordinates)
+            return True
+        if self.time is None:
+            return False
+        if self.is_lost(time):
+            # the object is lost, hold the state of its last measurement instead of predicting it away
+            self.state = self._measured_state.copy()
+            self.time = self.last_measurement_time
+            return True
+        self.predict(time)
+        if coordinates is not None:
+            self.correct(coordinates)
+            self.last_measurement_time = time
+            self._measured_state = self.state.copy()
+        return True
+
+
+class ConstantAccelerationKF(StateEstimator):
+    """
+    A Kalman filter with a constant acceleration model, for the drones (their acceleration changes with the commands,
+    which are modeled as white noise jerk).
+    The state is the position, velocity and acceleration.
+    """
+    INITIAL_STD = (StateEstimator.MEASUREMENT_STD, 100, 300)
+    # The standard deviation of the jerk in cm/s^3.
+    JERK_STD = 100
+
+    def _transition(self, dt):
+        transition = np.kron(np.array([[1, dt, dt ** 2 / 2],
+                                       [0, 1, dt],
+                                       [0, 0, 1]]), np.eye(3))
+        return transition @ self.state, transition
+
+    def _process_noise(self, dt):
+        return self.JERK_STD ** 2 * np.kron(np.array([[dt ** 5 / 20, dt ** 4 / 8, dt ** 3 / 6],
+                                                      [dt ** 4 / 8, dt ** 3 / 3, dt ** 2 / 2],
+                                                      [dt ** 3 / 6, dt ** 2 / 2, dt]]), np.eye(3))
+
+
+class BalloonEKF(StateEstimator):
+    """
+    An extended Kalman filter with the balloon's drag model (see prediction.NumericBallPredictor):
+    dv/dt = (0, 0, acceleration) - drag * |v| * v.
+    The state is the position and velocity, the rest of the forces (like air currents) are modeled as
+    white noise acceleration.
+    """
+    INITIAL_STD = (StateEstimator.MEASUREMENT_STD, 100)
+    # The standard deviation of the acceleration not in the model in cm/s^2.
+    ACCELERATION_STD = 30
+    # The drag and the acceleration of gravity and buoyancy (see NumericBallPredictor) in centimeters.
+    DRAG = NumericBallPredictor.DRAG / 100
+    ACCELERATION = np.array([0, 0, NumericBallPredictor.ACCELERATION * 100])
+
+    def _acceleration(self, velocity):
+        """
+        :param velocity: the velocity of the balloon.
+        :return: the acceleration of the balloon.
+        """
+        return self.ACCELERATION - self.DRAG * np.linalg.norm(velocity) * velocity
+
+    def _transition(self, dt):
+        # one RK4 step of the drag ODE
+        position, velocity = self.state[:3], self.state[3:]
+        a_1 = self._acceleration(velocity)
+        a_2 = self._acceleration(velocity + dt / 2 * a_1)
+        a_3 = self._acceleration(velocity + dt / 2 * a_2)
+        a_4 = self._acceleration(velocity + dt * a_3)
+        new_velocity = velocity + dt / 6 * (a_1 + 2 * a_2 + 2 * a_3 + a_4)
+        new_position = position + dt / 6 * (velocity + 2 * (velocity + dt / 2 * a_1) + 2 * (velocity + dt / 2 * a_2)
+                                             + velocity + dt * a_3)
+        # the Jacobian of the drag linearized at the current velocity
+        speed = np.linalg.norm(velocity)
+        drag_jacobian = -self.DRAG * speed * np.eye(3)
+        if speed:
+            drag_jacobian -= self.DRAG * np.outer(velocity, velocity) / speed
+        transition = np.eye(6)
+        transition[:3, 3:] = dt * np.eye(3) + dt ** 2 / 2 * drag_jacobian
+        transition[3:, 3:] += dt * drag_jacobian
+        return np.concatenate([new_position, new_velocity]), transition
+
+    def _process_noise(self, dt):
+        return self.ACCELERATION_STD ** 2 * np.kron(np.array([[dt ** 3 / 3, dt ** 2 / 2],
+                                                              [dt ** 2 / 2, dt]]), np.eye(3))
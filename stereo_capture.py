@@ -0,0 +1,203 @@
+import threading
+from collections import deque
+
+from camera import Camera
+
+
+class StereoPair:
+    """
+    A class representing a pair of frames captured together from the left and right cameras.
+    """
+
+    def __init__(self, index, left_frame, right_frame):
+        """
+        Initializes the stereo pair.
+        :param index: the running index of the pair.
+        :param left_frame: the Frame captured from the left camera.
+        :param right_frame: the Frame captured from the right camera.
+        """
+        self.index = index
+        self.left = left_frame
+        self.right = right_frame
+
+    @property
+    def skew(self):
+        """
+        :return: the time difference between the grabs of the two images of the pair in seconds.
+        """
+        return abs(self.left.capture_time - self.right.capture_time)
+
+
+class StereoCapture:
+    """
+    A class capturing synchronized pairs of frames from the left and right cameras in the background.
+    Each camera has its own grab thread. Both threads grab their image at the same time and only then
+    retrieve (decode) it, so the images of a pair are as close in time as possible.
+    The pairs are kept in a bounded ring, and the game loop reads the latest pair.
+    """
+    # The number of recent pairs kept in the ring.
+    RING_SIZE = 4
+    # The time to wait for the other camera before the pair is given up (in seconds).
+    SYNC_TIMEOUT = 1
+    # The time to wait for a new pair in the game loop (in seconds).
+    CAPTURE_TIMEOUT = 1
+
+    def __init__(self, left: Camera, right: Camera, ring_size=RING_SIZE):
+        """
+        Initializes the stereo capture.
+        :param left: the left camera's Camera.
+        :param right: the right camera's Camera.
+        :param ring_size: the number of recent pairs to keep.
+        """
+        self.left = left
+        self.right = right
+        self._pairs = deque(maxlen=ring_size)
+        self._pending = [None, None]
+        self._new_pair = threading.Condition()
+        self._barrier = threading.Barrier(2, action=self._store_pair, timeout=StereoCapture.SYNC_TIMEOUT)
+        # Guards resetting the barrier after it broke (by the first of the threads to find it broken).
+        self._reset_lock = threading.Lock()
+        # The last error of each camera's grab thread (printed when it changes).
+        self._last_errors = [None, None]
+        self._threads = []
+        self._running = False
+        self._unread = 0
+        self._pair_index = 0
+        self.failed_pairs = 0
+        self.grab_errors = 0
+        self.dropped_frames = 0
+        self.last_skew = 0
+        self.max_skew = 0
+        self._total_skew = 0
+
+    def __str__(self):
+        """
+        :return: a string representation of the capture statistics.
+        """
+        return "pairs: {:d}, dropped: {:d}, failed: {:d}, grab errors: {:d}, skew (ms) mean: {:.2f} max: {:.2f}".format(
+            self._pair_index, self.dropped_frames, self.failed_pairs, self.grab_errors, self.mean_skew * 1000,
+            self.max_skew * 1000)
+
+    @property
+    def mean_skew(self):
+        """
+        :return: the mean time difference between the grabs of the images of the pairs in seconds.
+        """
+        return self._total_skew / self._pair_index if self._pair_index else 0
+
+    @property
+    def running(self):
+        """
+        :return: whether the grab threads are running.
+        """
+        return self._running
+
+    @property
+    def recent_pairs(self):
+        """
+        :return: a list of the recent StereoPairs in the ring (oldest first).
+        """
+        with self._new_pair:
+            return list(self._pairs)
+
+    def start(self):
+        """
+        Starts the grab threads of both cameras.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._barrier.reset()
+        self._threads = [threading.Thread(target=self._grab_loop, args=[i, camera], daemon=True)
+                         for i, camera in enumerate([self.left, self.right])]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stops the grab threads of both cameras (the cameras are not released).
+        """
+        self._running = False
+        self._barrier.abort()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._new_pair:
+            self._new_pair.notify_all()
+
+    def _grab_loop(self, side, camera: Camera):
+        """
+        The loop of a camera's grab thread - grabs and retrieves an image, then waits for the other camera.
+        An error of the camera (e.g. its video capture replaced from the gui) fails the pair, and the loop goes on.
+        :param side: the index of the camera in the pair (0 for left and 1 for right).
+        :param camera: the Camera to capture from.
+        """
+        while self._running:
+            frame = None
+            try:
+                if camera.grab():
+                    frame = camera.retrieve()
+            except Exception as e:
+                self.grab_errors += 1
+                if repr(e) != self._last_errors[side]:
+                    self._last_errors[side] = repr(e)
+                    print("camera {:d} grab error: {!r}".format(side, e))
+            self._pending[side] = frame
+            try:
+                self._barrier.wait()
+            except threading.BrokenBarrierError:
+                if not self._running:
+                    break
+                # One of the cameras did not respond in time, start over from a synchronized grab
+                # (the first thread to find the barrier broken resets it, the other one finds it reset).
+                with self._reset_lock:
+                    if self._barrier.broken:
+                        self.failed_pairs += 1
+                        self._barrier.reset()
+
+    def _store_pair(self):
+        """
+        Stores the pending frames of both cameras as a new pair in the ring (called once both threads are done).
+        """
+        left_frame, right_frame = self._pending
+        if left_frame is None or right_frame is None:
+            self.failed_pairs += 1
+            return
+        with self._new_pair:
+            self._pair_index += 1
+            pair = StereoPair(self._pair_index, left_frame, right_frame)
+            self.last_skew = pair.skew
+            self.max_skew = max(self.max_skew, pair.skew)
+            self._total_skew += pair.skew
+            self._pairs.append(pair)
+            self._unread += 1
+            self._new_pair.notify_all()
+
+    def latest_pair(self, timeout=CAPTURE_TIMEOUT):
+        """
+        Waits for a pair that was not read yet and returns the latest one.
+        Pairs that were captured since the last read and are not the latest are counted as dropped.
+        :param timeout: the maximal time to wait for a new pair in seconds.
+        :return: the latest StereoPair, or None if no new pair arrived in time.
+        """
+        with self._new_pair:
+            if not self._new_pair.wait_for(lambda: self._unread > 0 or not self._running, timeout):
+                return None
+            if not self._unread:
+                return None
+            self.dropped_frames += self._unread - 1
+            self._unread = 0
+            return self._pairs[-1]
+
+    def capture(self, timeout=CAPTURE_TIMEOUT):
+        """
+        Sets the latest pair as the last captures of the cameras (a replacement for capturing from each camera).
+        :param timeout: the maximal time to wait for a new pair in seconds.
+        :return: whether the capture succeeded or not.
+        """
+        pair = self.latest_pair(timeout)
+        if pair is None:
+            return False
+        self.left.last_capture = pair.left
+        self.right.last_capture = pair.right
+        return True
@@ -0,0 +1,60 @@
+import numpy as np
+
+from camera import Camera
+
+
+class StereoRig:
+    """
+    A class calculating real life coordinates from the pixel coordinates of objects in the frames of both cameras.
+    The rays of the pixels are taken from the lookup tables of the cameras (calculated once per resolution),
+    and all the objects are triangulated together in one vectorized calculation.
+    Triangulation (see documentation): the left camera is at (0,0) and the right camera at (0,d), the angle of an object
+    from the cameras line is pi/2 - arctan(r) where r is the (flipped) ray of its pixel, so the tangent of the angle
+    is 1 / r.
+    """
+
+    def triangulate(self, left: Camera, right: Camera, cam_dist, left_pixels, right_pixels):
+        """
+        Calculates the real life coordinates of objects in centimeters.
+        :param left: the left camera's Camera object.
+        :param right: the right camera's Camera object.
+        :param cam_dist: the distance between the cameras.
+        :param left_pixels: an (N, 2) array of the (x, y) pixel locations of the objects in the left frame.
+        :param right_pixels: an (N, 2) array of the (x, y) pixel locations of the objects in the right frame.
+        :return: an (N, 3) array of the (x, y, z) coordinates of the objects.
+        """
+        left_ray_x, left_ray_z = left.get_rays()
+        right_ray_x, _ = right.get_rays()
+        left_pixels = np.asarray(left_pixels, dtype=int).reshape(-1, 2)
+        right_pixels = np.asarray(right_pixels, dtype=int).reshape(-1, 2)
+        ray_left = left.flip * left_ray_x[left_pixels[:, 0]]
+        ray_right = -right.flip * right_ray_x[right_pixels[:, 0]]
+        # x = d * tan(angle_right) / (tan(angle_right) + tan(angle_left)), and y = x * tan(angle_left)
+        coordinates = np.empty((len(left_pixels), 3))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = ray_left + ray_right
+            coordinates[:, 0] = cam_dist * ray_left / denominator
+            coordinates[:, 1] = cam_dist / denominator
+        # y axis in the frame is actually the z axis in our system
+        coordinates[:, 2] = coordinates[:, 1] * left_ray_z[left_pixels[:, 1]]
+        return coordinates
+
+    def set_coordinates(self, recognizable_objects, left: Camera, right: Camera, d):
+        """
+        Sets the real life coordinates and velocity of objects from their detected pixel coordinates on each side.
+        :param recognizable_objects: a list of the RecognizableObjects (already detected in the frames of the cameras).
+        :param left: the left camera's Camera object.
+        :param right: the right camera's Camera object.
+        :param d: the distance between the cameras
+        """
+        # The time of the observation is the time the frame was grabbed (the left and right frames are synchronized).
+        time = left.last_capture.capture_time
+        detected = [obj for obj in recognizable_objects if obj.frame_left.x != 0 and obj.frame_right.x != 0]
+        if detected:
+            coordinates = self.triangulate(left, right, d, [(obj.frame_left.x, obj.frame_left.y) for obj in detected],
+                                           [(obj.frame_right.x, obj.frame_right.y) for obj in detected])
+            for obj, obj_coordinates in zip(detected, coordinates):
+                obj.update(time, obj_coordinates)
+        for obj in recognizable_objects:
+            if obj.frame_left.x == 0 or obj.frame_right.x == 0:
+                obj.update(time, None)
@@ -0,0 +1,135 @@
+import numpy as np
+
+from tello import TelloState
+
+
+class TelemetryFusion:
+    """
+    A class fusing the telemetry of a Tello drone (the velocity and the time-of-flight height in its state packets)
+    with the state of the drone measured by the cameras.
+    The cameras measure the drone's position in the world, but late (the capture, detection and triangulation) and
+    with a noisy velocity. The telemetry arrives about 10 times a second with a lower latency, in the frame of the
+    drone. The packets are kept with the times they were received, so every camera observation is aligned with the
+    telemetry at its capture time, calibrating the offsets between them (a velocity bias and a height offset).
+    The state at a later time (the command) is the camera position moved by the calibrated telemetry velocity
+    since the capture, with the height taken from the time-of-flight sensor.
+    """
+    # The world axes (x, y, z) of the telemetry velocities: the field and the factor from dm/s to cm/s in the world.
+    # The rc commands move the drone to -x (right), -y (forward) and +z (up), and the telemetry is forward (vgx),
+    # right (vgy) and down (vgz) according to the Tello SDK. Not validated against a flight (see TELEMETRY_FUSION).
+    VELOCITY_AXES = (('vgy', -10), ('vgx', -10), ('vgz', -10))
+    # The number of telemetry packets kept for aligning them with the camera observations (about 3 seconds).
+    HISTORY_SIZE = 32
+    # The maximal age of the last packet in seconds for the telemetry to be used (else the camera state is used).
+    MAX_TELEMETRY_AGE = 0.5
+    # The range of valid time-of-flight heights in cm (out of it the sensor does not see the floor).
+    TOF_RANGE = (20, 400)
+    # The weights of a new observation in the low-pass filters of the velocity bias and the height offset.
+    VELOCITY_BIAS_GAIN = 0.05
+    HEIGHT_OFFSET_GAIN = 0.2
+
+    def __init__(self):
+        """
+        Initializes the fusion (without telemetry until the first packet).
+        """
+        # The history of the telemetry: the times the packets were received, their world velocities and heights
+        # (nan for an invalid height), the last `count` rows are used.
+        self.times = np.zeros(TelemetryFusion.HISTORY_SIZE)
+        self.velocities = np.zeros((TelemetryFusion.HISTORY_SIZE, 3))
+        self.heights = np.zeros(TelemetryFusion.HISTORY_SIZE)
+        self.count = 0
+        self.packets = self.observations = 0
+        # The calibrated difference of the camera from the telemetry.
+        self.velocity_bias = np.zeros(3)
+        self.height_offset = None
+        # The time of the last camera observation aligned with the telemetry.
+        self.camera_time = None
+        # The state packet read from the tello (reused, see Tello.read_state).
+        self.snapshot = TelloState()
+
+    def __str__(self):
+        """
+        :return: a string representation of the fusion's calibration.
+        """
+        height_offset = "none" if self.height_offset is None else "{:.1f} cm".format(self.height_offset)
+        return "telemetry fusion: {:d} packets, {:d} observations, velocity bias ({:.1f}, {:.1f}, {:.1f}) cm/s, " \
+               "height offset {}".format(self.packets, self.observations, *self.velocity_bias, height_offset)
+
+    def add_telemetry(self, snapshot: TelloState):
+        """
+        Adds a state packet to the history if it is new.
+        :param snapshot: the last state packet of the drone.
+        """
+        if not snapshot.valid or (self.count and snapshot.timestamp <= self.times[-1]):
+            return
+        self.times[:-1] = self.times[1:]
+        self.velocities[:-1] = self.velocities[1:]
+        self.heights[:-1] = self.heights[1:]
+        self.times[-1] = snapshot.timestamp
+        for axis, (field, factor) in enumerate(TelemetryFusion.VELOCITY_AXES):
+            self.velocities[-1, axis] = getattr(snapshot, field) * factor
+        lower, upper = TelemetryFusion.TOF_RANGE
+        self.heights[-1] = snapshot.tof if lower <= snapshot.tof <= upper else np.nan
+        self.count = min(self.count + 1, TelemetryFusion.HISTORY_SIZE)
+        self.packets += 1
+
+    def add_observation(self, time, position, velocity):
+        """
+        Calibrates the telemetry by a camera observation, aligned with the telemetry at its time.
+        :param time: the capture time of the observation.
+        :param position: the measured (x, y, z) coordinates of the drone.
+        :param velocity: the measured (vx, vy, vz) velocity of the drone.
+        """
+        self.camera_time = time
+        times = self.times[-self.count:]
+        if not self.count or not times[0] <= time <= times[-1] + TelemetryFusion.MAX_TELEMETRY_AGE:
+            return
+        self.observations += 1
+        telemetry_velocity = np.array([np.interp(time, times, self.velocities[-self.count:, axis])
+                                       for axis in range(3)])
+        self.velocity_bias += TelemetryFusion.VELOCITY_BIAS_GAIN * (
+                np.asarray(velocity) - telemetry_velocity - self.velocity_bias)
+        heights = self.heights[-self.count:]
+        valid = ~np.isnan(heights)
+        if valid.any():
+            offset = position[2] - np.interp(time, times[valid], heights[valid])
+            if self.height_offset is None:
+                self.height_offset = offset
+            else:
+                self.height_offset += TelemetryFusion.HEIGHT_OFFSET_GAIN * (offset - self.height_offset)
+
+    def _displacement(self, start, end):
+        """
+        Integrates the telemetry velocity (each packet holding until the next one) between two times.
+        :param start: the start time.
+        :param end: the end time.
+        :return: the (x, y, z) displacement in cm.
+        """
+        times = self.times[-self.count:]
+        inner = times[(times > start) & (times < end)]
+        edges = np.concatenate(([start], inner, [end]))
+        packets = np.maximum(np.searchsorted(times, edges[:-1], side='right') - 1, 0)
+        return np.diff(edges) @ self.velocities[-self.count:][packets]
+
+    def state_at(self, recognizable_object, time):
+        """
+        Estimates the state of the drone at a time from its last camera observation and the telemetry since.
+        Falls back to the camera state (RecognizableObject.state_at) when there is no recent telemetry.
+        :param recognizable_object: the drones RecognizableObject.
+        :param time: the time to estimate the state at.
+        :return: the (x, y, z) coordinates and (vx, vy, vz) velocity of the drone at the time.
+        """
+        if recognizable_object.time != self.camera_time and recognizable_object.object_exists:
+            self.add_observation(recognizable_object.time,
+                                 (recognizable_object.x, recognizable_object.y, recognizable_object.z),
+                                 (recognizable_object.vx, recognizable_object.vy, recognizable_object.vz))
+        if not self.count or time - self.times[-1] > TelemetryFusion.MAX_TELEMETRY_AGE:
+            return recognizable_object.state_at(time)
+        velocity = self.velocities[-1] + self.velocity_bias
+        position = np.array((recognizable_object.x, recognizable_object.y, recognizable_object.z), dtype=float)
+        if time > recognizable_object.time:
+            position += self._displacement(recognizable_object.time, time) + \
+                self.velocity_bias * (time - recognizable_object.time)
+        if self.height_offset is not None and not np.isnan(self.heights[-1]):
+            position[2] = self.heights[-1] + self.height_offset + velocity[2] * (time - self.times[-1])
+        return tuple(position), tuple(velocity)
@@ -1 +1,3 @@
-from .tello import Tello, BackgroundFrameRead
\ No newline at end of file
+from .tello import Tello, BackgroundFrameRead
+from .async_tello import AsyncTello, AsyncTelloHub, BlockingTello
+from .tello_state import TelloState, TelloStateBuffer
@@ -0,0 +1,327 @@
+"""
+An asyncio client for controlling many Tello drones from one event loop.
+Added by FlyBall: the command and state sockets of all the drones are datagram endpoints of a single event loop
+(one thread for all the drones, instead of two receiver threads per Tello).
+"""
+
+import asyncio
+import time
+from threading import Thread, Lock
+from typing import Optional, Dict, Callable, Any
+
+from .tello import Tello
+from .tello_state import TelloState, TelloStateBuffer
+
+
+class TelloProtocol(asyncio.DatagramProtocol):
+    """A datagram endpoint passing the received datagrams to a handler.
+    Internal class, you normally wouldn't use this yourself.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.handler(data, address)
+
+    def error_received(self, exc):
+        Tello.LOGGER.error(exc)
+
+
+class AsyncTelloHub:
+    """An event loop running in a background thread, multiplexing the command and state sockets of the drones.
+    Every network interface has one command socket and one state socket, and the datagrams are dispatched to the
+    drones by the address they came from.
+    """
+    _default: Optional['AsyncTelloHub'] = None
+    _default_lock = Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        # iface_ip -> (command endpoint, state endpoint)
+        self.interfaces: Dict[str, tuple] = {}
+        # (iface_ip, host) -> AsyncTello
+        self.drones: Dict[tuple, 'AsyncTello'] = {}
+        self._thread = Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def default(cls) -> 'AsyncTelloHub':
+        """Get the hub shared by all the drones (created on first use).
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """Run a coroutine in the event loop of the hub and wait for its result (from any other thread).
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def call_soon(self, callback, *args):
+        """Schedule a callback in the event loop of the hub without waiting (from any thread).
+        """
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    async def add_drone(self, drone: 'AsyncTello'):
+        """Register a drone, opening the sockets of its interface if they are not open yet.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if drone.iface_ip not in self.interfaces:
+            command_endpoint = await self._open_endpoint(drone.iface_ip, Tello.CONTROL_UDP_PORT,
+                                                         self._response_received)
+            state_endpoint = await self._open_endpoint(drone.iface_ip, Tello.STATE_UDP_PORT, self._state_received)
+            self.interfaces[drone.iface_ip] = (command_endpoint, state_endpoint)
+        self.drones[(drone.iface_ip, drone.host)] = drone
+        return self.interfaces[drone.iface_ip][0]
+
+    async def _open_endpoint(self, iface_ip: str, port: int, handler):
+        _, protocol = await self.loop.create_datagram_endpoint(
+            lambda: TelloProtocol(lambda data, address: handler(iface_ip, data, address)),
+            local_addr=(iface_ip, port))
+        return protocol
+
+    def _response_received(self, iface_ip, data, address):
+        drone = self.drones.get((iface_ip, address[0]))
+        if drone:
+            drone.response_received(data)
+
+    def _state_received(self, iface_ip, data, address):
+        drone = self.drones.get((iface_ip, address[0]))
+        if drone:
+            drone.state_received(data)
+
+    def close(self):
+        """Close the sockets and stop the event loop.
+        """
+        async def close_endpoints():
+            for endpoints in self.interfaces.values():
+                for endpoint in endpoints:
+                    endpoint.transport.close()
+        self.run(close_endpoints())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+class AsyncTello:
+    """An asyncio client of a Tello drone: awaitable commands, and fire-and-forget rc control.
+    The coroutines run in the event loop of the hub (see AsyncTelloHub.run for calling them from other threads).
+    """
+    RESPONSE_TIMEOUT = Tello.RESPONSE_TIMEOUT
+    TAKEOFF_TIMEOUT = Tello.TAKEOFF_TIMEOUT
+    TIME_BTW_COMMANDS = Tello.TIME_BTW_COMMANDS
+    RETRY_COUNT = Tello.RETRY_COUNT
+    STATE_TIMEOUT = 1  # in seconds
+    COMMAND_LATENCY_BIN_WIDTH = Tello.COMMAND_LATENCY_BIN_WIDTH
+
+    def __init__(self, host=Tello.TELLO_IP, iface_ip='192.168.10.2', retry_count=RETRY_COUNT,
+                 hub: Optional[AsyncTelloHub] = None, state_clock: Callable[[], float] = time.time,
+                 latency_histogram: Optional[Callable[[str, float, float], Any]] = None):
+        """See Tello for state_clock and latency_histogram.
+        """
+        self.host = host
+        self.iface_ip = iface_ip
+        self.address = (host, Tello.CONTROL_UDP_PORT)
+        self.retry_count = retry_count
+        self.hub = hub or AsyncTelloHub.default()
+        self.state_buffer = TelloStateBuffer(state_clock)
+        self.is_flying = False
+        self.last_received_command_timestamp = time.time()
+        # Latencies of the acknowledged commands (from sending to the response), per command type.
+        self.latency_histogram = latency_histogram
+        self.command_latencies: Dict[str, Any] = {}
+        self._endpoint: Optional[TelloProtocol] = None
+        self._pending: Optional[asyncio.Future] = None
+        self._command_lock: Optional[asyncio.Lock] = None
+        self._first_state: Optional[asyncio.Event] = None
+
+    async def open(self):
+        """Register the drone in the hub (called by connect).
+        """
+        if self._endpoint is None:
+            self._command_lock = asyncio.Lock()
+            self._first_state = asyncio.Event()
+            self._endpoint = await self.hub.add_drone(self)
+
+    def response_received(self, data: bytes):
+        """Resolve the pending command with a response.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self._pending is not None and not self._pending.done():
+            self._pending.set_result(data)
+
+    def state_received(self, data: bytes):
+        """Parse a state packet.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        self.state_buffer.write(data)
+        self._first_state.set()
+
+    async def send_command_with_return(self, command: str, timeout: float = RESPONSE_TIMEOUT) -> str:
+        """Send command to Tello and wait for its response (commands are sent one at a time).
+        Return:
+            str: the response text on success, or a message of the timeout.
+        """
+        async with self._command_lock:
+            # Commands very consecutive makes the drone not respond to them.
+            # So wait at least self.TIME_BTW_COMMANDS seconds since the last response
+            wait = self.TIME_BTW_COMMANDS - (time.time() - self.last_received_command_timestamp)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            Tello.LOGGER.info("Send command: '{}'".format(command))
+            self._pending = self.hub.loop.create_future()
+            timestamp = time.time()
+            self._endpoint.transport.sendto(command.encode('utf-8'), self.address)
+            try:
+                data = await asyncio.wait_for(self._pending, timeout)
+            except asyncio.TimeoutError:
+                message = "Aborting command '{}'. Did not receive a response after {} seconds".format(command, timeout)
+                Tello.LOGGER.warning(message)
+                return message
+            finally:
+                self._pending = None
+            self.last_received_command_timestamp = time.time()
+
+        self.add_command_latency(command, self.last_received_command_timestamp - timestamp)
+        try:
+            response = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            Tello.LOGGER.error(e)
+            return "response decode error"
+        response = response.rstrip("\r\n")
+        Tello.LOGGER.info("Response {}: '{}'".format(command, response))
+        return response
+
+    async def send_control_command(self, command: str, timeout: float = RESPONSE_TIMEOUT) -> bool:
+        """Send control command to Tello and wait for its response (with retries).
+        """
+        response = "max retries exceeded"
+        for i in range(0, self.retry_count):
+            response = await self.send_command_with_return(command, timeout=timeout)
+            if 'ok' in response.lower():
+                return True
+            Tello.LOGGER.debug("Command attempt #{} failed for command: '{}'".format(i, command))
+        raise Exception("Command '{}' was unsuccessful for {} tries. Latest response:\t'{}'"
+                        .format(command, 1 + self.retry_count, response))
+
+    def add_command_latency(self, command: str, latency: float):
+        """Adds the latency of an acknowledged command to the histogram of its type (the first word of the command).
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self.latency_histogram is None:
+            return
+        command_type = command.split(' ', 1)[0]
+        if command_type not in self.command_latencies:
+            self.command_latencies[command_type] = self.latency_histogram(
+                "'{}' command".format(command_type), self.COMMAND_LATENCY_BIN_WIDTH, self.TAKEOFF_TIMEOUT)
+        self.command_latencies[command_type].add(latency)
+
+    async def connect(self, wait_for_state=True):
+        """Enter SDK mode. Call this before any of the control functions.
+        """
+        await self.open()
+        await self.send_control_command("command")
+        if wait_for_state:
+            try:
+                await asyncio.wait_for(self._first_state.wait(), self.STATE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise Exception('Did not receive a state packet from the Tello')
+
+    async def takeoff(self):
+        """Automatic takeoff.
+        """
+        await self.send_control_command("takeoff", timeout=self.TAKEOFF_TIMEOUT)
+        self.is_flying = True
+
+    async def land(self):
+        """Automatic landing.
+        """
+        await self.send_control_command("land")
+        self.is_flying = False
+
+    async def query_battery(self) -> int:
+        """Get current battery percentage via a query command.
+        """
+        return int(await self.send_command_with_return('battery?'))
+
+    def send_rc_control(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int,
+                        yaw_velocity: int):
+        """Send RC control via four channels, without waiting (can be called from any thread).
+        Arguments:
+            left_right_velocity: -100~100 (left/right)
+            forward_backward_velocity: -100~100 (forward/backward)
+            up_down_velocity: -100~100 (up/down)
+            yaw_velocity: -100~100 (yaw)
+        """
+        def clamp100(x: int) -> int:
+            return max(-100, min(100, x))
+
+        cmd = 'rc {} {} {} {}'.format(clamp100(left_right_velocity), clamp100(forward_backward_velocity),
+                                      clamp100(up_down_velocity), clamp100(yaw_velocity))
+        self.hub.call_soon(self._endpoint.transport.sendto, cmd.encode('utf-8'), self.address)
+
+    def get_current_state(self) -> dict:
+        """Get the last state packet of the Tello (a dict with all fields, the same dict until the next packet).
+        """
+        return self.state_buffer.as_dict()
+
+    def read_state(self, into: TelloState) -> TelloState:
+        """Copy a consistent snapshot of the last state packet into a preallocated TelloState (no allocation).
+        """
+        return self.state_buffer.read(into)
+
+    def get_battery(self) -> int:
+        """Get the battery percentage from the last state packet.
+        """
+        return self.state_buffer.front.bat
+
+    def get_command_latencies(self) -> dict:
+        """Get the latencies of the acknowledged commands (from sending to the response) per command type.
+        """
+        return self.command_latencies
+
+
+class BlockingTello:
+    """A drop-in replacement of Tello (for TelloDroneControl) running an AsyncTello in the hub's event loop:
+    the commands block the calling thread until they are acknowledged, rc control does not block.
+    """
+
+    def __init__(self, host=Tello.TELLO_IP, iface_ip='192.168.10.2', hub: Optional[AsyncTelloHub] = None,
+                 state_clock: Callable[[], float] = time.time,
+                 latency_histogram: Optional[Callable[[str, float, float], Any]] = None):
+        self.tello = AsyncTello(host, iface_ip, hub=hub, state_clock=state_clock, latency_histogram=latency_histogram)
+        self.hub = self.tello.hub
+
+    def connect(self, wait_for_state=True):
+        self.hub.run(self.tello.connect(wait_for_state))
+
+    def takeoff(self):
+        self.hub.run(self.tello.takeoff())
+
+    def land(self):
+        self.hub.run(self.tello.land())
+
+    def query_battery(self) -> int:
+        return self.hub.run(self.tello.query_battery())
+
+    def send_rc_control(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int,
+                        yaw_velocity: int):
+        self.tello.send_rc_control(left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+
+    def get_current_state(self) -> dict:
+        return self.tello.get_current_state()
+
+    def read_state(self, into: TelloState) -> TelloState:
+        return self.tello.read_state(into)
+
+    def get_battery(self) -> int:
+        return self.tello.get_battery()
+
+    def get_command_latencies(self) -> dict:
+        return self.tello.get_command_latencies()
@@ -7,11 +7,12 @@ Modified by FlyBall to interact with different drone simultaneously.
 import logging
 import socket
 import time
-from threading import Thread
-from typing import Optional, Union, Type, Dict
+from threading import Thread, Condition
+from typing import Optional, Union, Type, Dict, Any
 
 import cv2  # type: ignore
 from .enforce_types import enforce_types
+from .tello_state import TelloState, TelloStateBuffer
 
 
 @enforce_types
@@ -27,6 +28,7 @@ class Tello:
     FRAME_GRAB_TIMEOUT = 3
     TIME_BTW_COMMANDS = 0.1  # in seconds
     TIME_BTW_RC_CONTROL_COMMANDS = 0.001  # in seconds
+    COMMAND_LATENCY_BIN_WIDTH = 0.005  # in seconds
     RETRY_COUNT = 3  # number of retries after a failed command
     TELLO_IP = '192.168.10.1'  # Tello IP address
 
@@ -90,8 +92,14 @@ class Tello:
     def __init__(self,
                  host=TELLO_IP,
                  retry_count=RETRY_COUNT,
-                 iface_ip='192.168.10.2'):
+                 iface_ip='192.168.10.2',
+                 state_clock=time.time,
+                 latency_histogram=None):
         # Added iface_ip to choose the network card from which the drone is contacted.
+        # Added state_clock, the clock the state packets are stamped with (e.g. the clock of the application),
+        # and latency_histogram, a factory of the histograms of the command latencies called with
+        # (name, bin width, max latency) that returns an object with add(latency) - no latencies are kept if None.
+        # (Not annotated, enforce_types can not check Optional and Callable.)
 
         self.address = (host, Tello.CONTROL_UDP_PORT)
         self.stream_on = False
@@ -101,6 +109,9 @@ class Tello:
         # Removed initializations of static variables and moved to here, for connecting to different drones.
         self.threads_initialized = False
         self.drones: Optional[dict] = {}
+        # Latencies of the acknowledged commands (from sending to the response), per command type.
+        self.latency_histogram = latency_histogram
+        self.command_latencies: Dict[str, Any] = {}
         self.client_socket: socket.socket
         self.iface_ip = iface_ip
 
@@ -120,7 +131,8 @@ class Tello:
 
             self.threads_initialized = True
 
-        self.drones[host] = {'responses': [], 'state': {}}
+        # The response slot of the drone: the receiver thread notifies the condition when a response arrives.
+        self.drones[host] = {'responses': [], 'state_buffer': TelloStateBuffer(state_clock), 'response_condition': Condition()}
 
         self.LOGGER.info("Tello instance was initialized. Host: '{}'. Port: '{}'.".format(host, Tello.CONTROL_UDP_PORT))
 
@@ -149,7 +161,10 @@ class Tello:
                 if address not in tello.drones:
                     continue
 
-                tello.drones[address]['responses'].append(data)
+                drone = tello.drones[address]
+                with drone['response_condition']:
+                    drone['responses'].append(data)
+                    drone['response_condition'].notify_all()
 
             except Exception as e:
                 Tello.LOGGER.error(e)
@@ -175,8 +190,7 @@ class Tello:
                 if address not in tello.drones:
                     continue
 
-                data = data.decode('ASCII')
-                tello.drones[address]['state'] = Tello.parse_state(data)
+                tello.drones[address]['state_buffer'].write(data)
 
             except Exception as e:
                 Tello.LOGGER.error(e)
@@ -218,19 +232,25 @@ class Tello:
 
     def get_current_state(self) -> dict:
         """Call this function to attain the state of the Tello. Returns a dict
-        with all fields.
+        with all fields (the same dict until the next state packet).
         Internal method, you normally wouldn't call this yourself.
         """
-        return self.get_own_udp_object()['state']
+        return self.get_own_udp_object()['state_buffer'].as_dict()
+
+    def read_state(self, into: TelloState) -> TelloState:
+        """Copy a consistent snapshot of the last state packet into a preallocated TelloState (no allocation),
+        for reading the state every iteration of a control loop.
+        """
+        return self.get_own_udp_object()['state_buffer'].read(into)
 
     def get_state_field(self, key: str):
         """Get a specific sate field by name.
         Internal method, you normally wouldn't call this yourself.
         """
-        state = self.get_current_state()
+        value = self.get_own_udp_object()['state_buffer'].get_field(key)
 
-        if key in state:
-            return state[key]
+        if value is not None:
+            return value
         else:
             raise Exception('Could not get state property: {}'.format(key))
 
@@ -430,29 +450,33 @@ class Tello:
             bool/str: str with response text on success, False when unsuccessful.
         """
         # Commands very consecutive makes the drone not respond to them.
-        # So wait at least self.TIME_BTW_COMMANDS seconds
-        diff = time.time() - self.last_received_command_timestamp
-        if diff < self.TIME_BTW_COMMANDS:
-            self.LOGGER.debug('Waiting {} seconds to execute command: {}...'.format(diff, command))
-            time.sleep(diff)
-
-        self.LOGGER.info("Send command: '{}'".format(command))
-        timestamp = time.time()
-
-        self.client_socket.sendto(command.encode('utf-8'), self.address)
-
-        responses = self.get_own_udp_object()['responses']
-
-        while not responses:
-            if time.time() - timestamp > timeout:
+        # So wait at least self.TIME_BTW_COMMANDS seconds since the last response
+        wait = self.TIME_BTW_COMMANDS - (time.time() - self.last_received_command_timestamp)
+        if wait > 0:
+            self.LOGGER.debug('Waiting {} seconds to execute command: {}...'.format(wait, command))
+            time.sleep(wait)
+
+        drone = self.get_own_udp_object()
+        responses = drone['responses']
+        response_condition = drone['response_condition']
+
+        with response_condition:
+            # The slot holds only the response of this command, a late response of an aborted command is dropped
+            responses.clear()
+            self.LOGGER.info("Send command: '{}'".format(command))
+            timestamp = time.time()
+            self.client_socket.sendto(command.encode('utf-8'), self.address)
+
+            # The receiver thread wakes this thread as soon as the response arrives
+            if not response_condition.wait_for(lambda: responses, timeout):
                 message = "Aborting command '{}'. Did not receive a response after {} seconds".format(command, timeout)
                 self.LOGGER.warning(message)
                 return message
-            time.sleep(0.1)  # Sleep during send command
 
-        self.last_received_command_timestamp = time.time()
+            self.last_received_command_timestamp = time.time()
+            first_response = responses.pop(0)  # first datum from socket
 
-        first_response = responses.pop(0)  # first datum from socket
+        self.add_command_latency(command, self.last_received_command_timestamp - timestamp)
         try:
             response = first_response.decode("utf-8")
         except UnicodeDecodeError as e:
@@ -463,6 +487,25 @@ class Tello:
         self.LOGGER.info("Response {}: '{}'".format(command, response))
         return response
 
+    def add_command_latency(self, command: str, latency: float):
+        """Adds the latency of an acknowledged command to the histogram of its type (the first word of the command).
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self.latency_histogram is None:
+            return
+        command_type = command.split(' ', 1)[0]
+        if command_type not in self.command_latencies:
+            self.command_latencies[command_type] = self.latency_histogram(
+                "'{}' command".format(command_type), self.COMMAND_LATENCY_BIN_WIDTH, self.TAKEOFF_TIMEOUT)
+        self.command_latencies[command_type].add(latency)
+
+    def get_command_latencies(self) -> dict:
+        """Get the latencies of the acknowledged commands (from sending to the response) per command type.
+        Returns:
+            dict: a histogram (made by the latency_histogram factory) per command type, empty without a factory.
+        """
+        return self.command_latencies
+
     def send_command_without_return(self, command: str):
         """Send command to Tello without expecting a response.
         Internal method, you normally wouldn't call this yourself.
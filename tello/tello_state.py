@@ -0,0 +1,170 @@
+"""
+Typed snapshots of the Tello state packets.
+Added by FlyBall: the state packets are parsed into preallocated snapshots instead of a new dict per packet,
+and published with a double buffer, so the control loop reads a consistent state without locks.
+"""
+
+import time
+from typing import Optional, Callable
+
+
+class TelloState:
+    """A snapshot of a Tello state packet with numeric fields (see the Tello SDK documentation for their meaning).
+    Fields the snapshot has no slot for (e.g. 'mpry' of the Tello EDU) are kept as strings in the extra dict,
+    as Tello.parse_state keeps them.
+    """
+    INT_FIELDS = ('mid', 'x', 'y', 'z', 'pitch', 'roll', 'yaw', 'vgx', 'vgy', 'vgz', 'templ', 'temph', 'tof', 'h',
+                  'bat', 'time')
+    FLOAT_FIELDS = ('baro', 'agx', 'agy', 'agz')
+    FIELDS = INT_FIELDS + FLOAT_FIELDS
+    FIELD_SET = frozenset(FIELDS)
+    __slots__ = FIELDS + ('extra', 'timestamp', 'valid')
+
+    # The slot and the type of each field, by its name in the packet (the packet is parsed without decoding).
+    CONVERTERS = {name.encode('ASCII'): (name, int) for name in INT_FIELDS}
+    CONVERTERS.update({name.encode('ASCII'): (name, float) for name in FLOAT_FIELDS})
+
+    def __init__(self):
+        for name in TelloState.INT_FIELDS:
+            setattr(self, name, 0)
+        for name in TelloState.FLOAT_FIELDS:
+            setattr(self, name, 0.0)
+        self.extra = {}
+        self.timestamp = 0.0
+        self.valid = False
+
+    def parse(self, packet: bytes, timestamp: float) -> bool:
+        """Parse a state packet into the snapshot (fields that are missing or malformed keep their values).
+        Arguments:
+            packet: the raw packet, e.g. b'pitch:0;roll:0;yaw:0;vgx:0;...;agz:-999.00;\\r\\n'
+            timestamp: the time the packet was received (see TelloStateBuffer.clock).
+        Returns:
+            bool: whether the packet had state fields.
+        """
+        found = False
+        for field in packet.split(b';'):
+            name, separator, value = field.partition(b':')
+            name = name.strip()
+            converter = TelloState.CONVERTERS.get(name)
+            if converter is None:
+                if separator and name:
+                    self.extra[name.decode('ASCII', 'replace')] = value.decode('ASCII', 'replace')
+                    found = True
+                continue
+            try:
+                setattr(self, converter[0], converter[1](value))
+            except ValueError:
+                continue
+            found = True
+        if found:
+            self.timestamp = timestamp
+            self.valid = True
+        return found
+
+    def set_fields(self, fields: dict, timestamp: float):
+        """Set the snapshot from a dict of fields (in the format of Tello.parse_state, e.g. a recorded state).
+        """
+        for name, value in fields.items():
+            if name in TelloState.FIELD_SET:
+                setattr(self, name, value)
+            else:
+                self.extra[name] = value
+        self.timestamp = timestamp
+        self.valid = bool(fields)
+
+    def copy_to(self, other: 'TelloState'):
+        """Copy all the fields of the snapshot to another snapshot.
+        """
+        for name in TelloState.FIELDS:
+            setattr(other, name, getattr(self, name))
+        if other.extra != self.extra:
+            other.extra.clear()
+            other.extra.update(self.extra)
+        other.timestamp = self.timestamp
+        other.valid = self.valid
+
+    def get_field(self, key: str):
+        """Get a field of the snapshot by its name in the packet, or None if it has no such field.
+        """
+        if key in TelloState.FIELD_SET:
+            return getattr(self, key)
+        return self.extra.get(key)
+
+    def as_dict(self) -> dict:
+        """Get the fields of the snapshot as a dict (in the format of Tello.parse_state), empty if it is not valid.
+        """
+        if not self.valid:
+            return {}
+        fields = {name: getattr(self, name) for name in TelloState.FIELDS}
+        fields.update(self.extra)
+        return fields
+
+
+class TelloStateBuffer:
+    """A lock-free double buffer of the state of a Tello, written by the state receiver.
+    Every packet is parsed into the back snapshot, which is then published by swapping it with the front snapshot
+    (a single reference assignment). The sequence counts the published packets: a reader copying the front
+    snapshot retries if a packet was published meanwhile (the writer may have started writing the snapshot it read).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        """Arguments:
+            clock: the clock the packets are stamped with (e.g. the clock of the application using the Tello).
+        """
+        self.clock = clock
+        self._snapshots = (TelloState(), TelloState())
+        self._front: TelloState = self._snapshots[0]
+        self.sequence = 0
+        self._dict: dict = {}
+        self._dict_sequence = 0
+
+    @property
+    def front(self) -> TelloState:
+        """Get the last published snapshot without copying.
+        It stays consistent until the next packet is published (about 100 ms), use read to keep a consistent copy.
+        """
+        return self._front
+
+    def write(self, packet: bytes, timestamp: Optional[float] = None):
+        """Parse a packet into the back snapshot and publish it.
+        Only one thread may write (the state receiver).
+        Arguments:
+            packet: the raw packet.
+            timestamp: the time the packet was received, the time of the clock of the buffer by default.
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        back = self._snapshots[1] if self._front is self._snapshots[0] else self._snapshots[0]
+        self._front.copy_to(back)
+        if back.parse(packet, timestamp):
+            self._front = back
+            self.sequence += 1
+
+    def read(self, into: TelloState) -> TelloState:
+        """Copy the last published snapshot consistently into a snapshot of the reader (without allocating).
+        """
+        while True:
+            sequence = self.sequence
+            try:
+                self._front.copy_to(into)
+            except RuntimeError:
+                # the extra fields changed while copying them (the writer started writing this snapshot)
+                continue
+            if sequence == self.sequence:
+                return into
+
+    def as_dict(self) -> dict:
+        """Get the last published snapshot as a dict (a new dict only once per packet).
+        """
+        sequence = self.sequence
+        if sequence != self._dict_sequence:
+            snapshot = self.read(TelloState())
+            self._dict = snapshot.as_dict()
+            self._dict_sequence = sequence
+        return self._dict
+
+    def get_field(self, key: str):
+        """Get a field of the last published snapshot, or None if there is no state yet or no such field.
+        """
+        front = self._front
+        return front.get_field(key) if front.valid else None
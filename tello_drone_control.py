@@ -1,8 +1,13 @@
 import numpy as np
 
-from tello import Tello
+from tello import Tello, BlockingTello
 
 from drone_control import DroneControl
+from latency_histogram import LatencyHistogram
+from rc_scheduler import RcScheduler
+from telemetry_fusion import TelemetryFusion
+from utils.consts import LATENCY_COMPENSATION, TELEMETRY_FUSION, RC_SCHEDULER, RC_RATE, RC_KEEPALIVE_INTERVAL
+from utils.time_utils import now
 
 
 class TelloDroneControl(DroneControl):
@@ -15,8 +20,21 @@ class TelloDroneControl(DroneControl):
         Initialize the tello drone controller.
         :param iface_ip: the ip of the interface that connects to the specific drone.
         """
+        super().__init__(LATENCY_COMPENSATION)
         self.iface_ip = iface_ip
         self.tello = None
+        # Fuses the telemetry of the tello drone into its state (see telemetry_fusion), or None.
+        self.telemetry_fusion = TelemetryFusion() if TELEMETRY_FUSION else None
+        # Sends the rc commands from a thread at a fixed maximal rate (see rc_scheduler), or None to send them directly.
+        self.rc_scheduler = RcScheduler(self._send_scheduled_rc_control, RC_RATE, RC_KEEPALIVE_INTERVAL,
+                                        "rc " + str(iface_ip)) if RC_SCHEDULER else None
+
+    def _create_tello(self):
+        """
+        :return: a new Tello object of the tello drone (its state packets are stamped with the clock of the game, and
+                 the latencies of its commands are kept in LatencyHistograms).
+        """
+        return Tello(iface_ip=self.iface_ip, state_clock=now, latency_histogram=LatencyHistogram)
 
     def connect(self):
         """
@@ -24,8 +42,10 @@ class TelloDroneControl(DroneControl):
         If the Tello object is not set yet - than set it.
         """
         if not self.tello:
-            self.tello = Tello(iface_ip=self.iface_ip)
+            self.tello = self._create_tello()
         self.tello.connect()
+        if self.rc_scheduler:
+            self.rc_scheduler.start()
 
     def takeoff(self):
         """
@@ -35,15 +55,74 @@ class TelloDroneControl(DroneControl):
 
     def land(self):
         """
-        Commands the tello drone to land.
+        Commands the tello drone to land (stopping it first, and stopping the rc keepalives).
         """
+        if self.rc_scheduler:
+            self.rc_scheduler.send_now(0, 0, 0, 0)
+            self.rc_scheduler.clear()
         self.tello.land()
 
     def stop(self):
         """
-        Commands the tello drone to stop.
+        Commands the tello drone to stop (immediately, not through the rate limit of the rc scheduler).
+        """
+        self._send_rc_control(0, 0, 0, 0, immediately=True)
+
+    def close(self):
+        """
+        Stops the thread of the rc scheduler if there is.
         """
-        self.tello.send_rc_control(0, 0, 0, 0)
+        if self.rc_scheduler:
+            self.rc_scheduler.stop()
+
+    def get_state(self):
+        """
+        :return: the last state packet of the tello drone (a dictionary of its fields, empty if not connected).
+        """
+        return self.tello.get_current_state() if self.tello else {}
+
+    def _state_at(self, recognizable_object, time):
+        """
+        Estimates the state of the tello drone at a time, fusing its telemetry if telemetry fusion is on.
+        :param recognizable_object: the drones RecognizableObject.
+        :param time: the time to estimate the state at.
+        :return: the (x, y, z) coordinates and (vx, vy, vz) velocity of the drone at the time.
+        """
+        if self.telemetry_fusion is None or not self.tello:
+            return super()._state_at(recognizable_object, time)
+        self.telemetry_fusion.add_telemetry(self.tello.read_state(self.telemetry_fusion.snapshot))
+        return self.telemetry_fusion.state_at(recognizable_object, time)
+
+    def _send_rc_control(self, left_right, for_back, up_down, yaw, immediately=False):
+        """
+        Sends an rc command to the tello drone (through the rc scheduler if there is), and passes it to the command
+        listener if there is.
+        :param left_right: the left/right velocity (-100 to 100).
+        :param for_back: the forward/backward velocity (-100 to 100).
+        :param up_down: the up/down velocity (-100 to 100).
+        :param yaw: the yaw velocity (-100 to 100).
+        :param immediately: whether to send the command from the calling thread (see RcScheduler.send_now).
+        """
+        if self.command_listener:
+            self.command_listener((left_right, for_back, up_down, yaw))
+        if self.rc_scheduler and immediately:
+            self.rc_scheduler.send_now(left_right, for_back, up_down, yaw)
+        elif self.rc_scheduler:
+            self.rc_scheduler.submit(left_right, for_back, up_down, yaw)
+        else:
+            self.tello.send_rc_control(left_right, for_back, up_down, yaw)
+
+    def _send_scheduled_rc_control(self, left_right, for_back, up_down, yaw):
+        """
+        Sends an rc command to the tello drone from the thread of the rc scheduler.
+        """
+        self.tello.send_rc_control(left_right, for_back, up_down, yaw)
+
+    def get_command_latencies(self):
+        """
+        :return: the latency histograms of the acknowledged commands of the tello drone per command type.
+        """
+        return self.tello.get_command_latencies() if self.tello else {}
 
     def get_battery(self):
         """
@@ -60,13 +139,14 @@ class TelloDroneControl(DroneControl):
         :param dest_z: the desired z point
         :param recognizable_object: the drones RecognizableObject.
         """
-        x_cm_rel = dest_x - recognizable_object.x
-        y_cm_rel = dest_y - recognizable_object.y
-        z_cm_rel = dest_z - recognizable_object.z
-        left_right = self.velocity_control_function(x_cm_rel, recognizable_object.vx, 'x')
-        for_back = self.velocity_control_function(y_cm_rel, recognizable_object.vy, 'y')
-        up_down = self.velocity_control_function(z_cm_rel, recognizable_object.vz, 'z')
-        self.tello.send_rc_control(left_right, for_back, up_down, 0)
+        (x, y, z), (vx, vy, vz) = self._current_state(recognizable_object)
+        x_cm_rel = dest_x - x
+        y_cm_rel = dest_y - y
+        z_cm_rel = dest_z - z
+        left_right = self.velocity_control_function(x_cm_rel, vx, 'x')
+        for_back = self.velocity_control_function(y_cm_rel, vy, 'y')
+        up_down = self.velocity_control_function(z_cm_rel, vz, 'z')
+        self._send_rc_control(left_right, for_back, up_down, 0)
 
     def track_hitting(self, dest_x, dest_y, dest_z, recognizable_object):
         """
@@ -76,9 +156,10 @@ class TelloDroneControl(DroneControl):
         :param dest_z: the desired z point
         :param recognizable_object: the drones RecognizableObject.
         """
-        rx = dest_x - recognizable_object.x
-        ry = dest_y - recognizable_object.y
-        rz = dest_z - recognizable_object.z
+        (x, y, z), _ = self._current_state(recognizable_object)
+        rx = dest_x - x
+        ry = dest_y - y
+        rz = dest_z - z
         r = np.sqrt(rx ** 2 + ry ** 2 + rz ** 2)
         theta = np.arccos(rz / r)
         phi = np.arctan2(ry, rx)
@@ -90,7 +171,7 @@ class TelloDroneControl(DroneControl):
         vy = min(int(A * (vz - MIN_VEL) * np.tan(theta) * np.sin(phi)) + MIN_VEL, MAX_VEL)
 
         left_right, for_back, up_down = -vx, -vy, vz
-        self.tello.send_rc_control(left_right, for_back, up_down, 0)
+        self._send_rc_control(left_right, for_back, up_down, 0)
 
     def track_descending(self, dest_x, dest_y, recognizable_object):
         """
@@ -99,12 +180,13 @@ class TelloDroneControl(DroneControl):
         :param dest_y: the desired y point.
         :param recognizable_object: the drones RecognizableObject.
         """
-        x_cm_rel = dest_x - recognizable_object.x
-        y_cm_rel = dest_y - recognizable_object.y
-        left_right = self.velocity_control_function(x_cm_rel, recognizable_object.vx, 'x')
-        for_back = self.velocity_control_function(y_cm_rel, recognizable_object.vy, 'y')
+        (x, y, _), (vx, vy, _) = self._current_state(recognizable_object)
+        x_cm_rel = dest_x - x
+        y_cm_rel = dest_y - y
+        left_right = self.velocity_control_function(x_cm_rel, vx, 'x')
+        for_back = self.velocity_control_function(y_cm_rel, vy, 'y')
 
-        self.tello.send_rc_control(left_right, for_back, -100, 0)
+        self._send_rc_control(left_right, for_back, -100, 0)
 
     def velocity_control_function(self, cm_rel, real_velocity, direction):
         """
@@ -139,3 +221,16 @@ class TelloDroneControl(DroneControl):
             return velocity
         elif direction == 'z':
             return -velocity
+
+
+class AsyncTelloDroneControl(TelloDroneControl):
+    """
+    A class for controlling a Tello drone through the asyncio client (tello.AsyncTello): the sockets of all the drones
+    are served by one event loop, instead of two receiver threads per drone.
+    """
+
+    def _create_tello(self):
+        """
+        :return: a new BlockingTello object of the tello drone.
+        """
+        return BlockingTello(iface_ip=self.iface_ip, state_clock=now, latency_histogram=LatencyHistogram)
@@ -8,7 +8,12 @@ from xy_display import XYDisplay
 from utils.consts import *
 from borders import Borders
 from prediction import NumericBallPredictor
-from datetime import datetime
+from state_estimation import BalloonEKF
+from stereo_capture import StereoCapture
+from detection_executor import DetectionExecutor
+from utils.time_utils import now, seconds_since
+from control_socket import ControlSocket
+from latency_histogram import LoopRate
 
 
 def display_frames_pred(balloon, left_cam, right_cam, borders, pred_coords):
@@ -44,16 +49,17 @@ def display_frames_pred(balloon, left_cam, right_cam, borders, pred_coords):
     cv2.imshow('XY Display', xy_display)
 
 
-def interactive_loop(borders, left_cam, balloon, start_test):
+def interactive_loop(borders, left_cam, balloon, start_test, control=None):
     """
     The interactive loop for receiving commands from the user.
     :param borders: the Borders.
     :param left_cam: the left camera's Camera.
     :param balloon: the balloon's RecognizableObject.
     :param start_test: whether the test is started or not.
+    :param control: the ControlSocket to receive the commands from in headless mode (the keyboard if None).
     :return: whether to continue the loop or not.
     """
-    key = cv2.waitKey(1) & 0xFF
+    key = control.read_key() if control else cv2.waitKey(1) & 0xFF
     str_colors_changed = "Color bounds changed"
 
     # the 'v' button is set as the detect color of recognizable_object in the left_cam cam
@@ -116,41 +122,53 @@ def test_prediction_loop(balloon, cameras_distance, left, right):
     recognizable_objects = [balloon]
     load_colors(COLORS_FILENAME, recognizable_objects)
     borders.load_borders(BORDERS_FILENAME, left)
-    
+
+    detection_executor = DetectionExecutor(recognizable_objects, PARALLEL_DETECTION)
+    stereo_capture = StereoCapture(left, right)
+    stereo_capture.start()
+    control = ControlSocket(CONTROL_PORT) if HEADLESS else None
+    loop_rate = LoopRate("test loop")
+
     while continue_loop:
         # Capture the video frame by frame
-        if not left.capture():
-            continue
-        if not right.capture():
+        if not stereo_capture.capture():
             continue
 
-        for recognizable_object in recognizable_objects:
-            # Process frames
-            recognizable_object.detect_and_set_coordinates(left, right, cameras_distance)
+        # Process frames
+        detection_executor.detect_and_set_coordinates(left, right, cameras_distance)
 
         if pred:
-            pred_coords = pred.get_prediction((datetime.now() - start_pred_timer).total_seconds())
+            pred_coords = pred.get_prediction(seconds_since(start_pred_timer))
         else:
             pred_coords = None
             
-        display_frames_pred(balloon, left, right, borders, pred_coords)
+        if not HEADLESS:
+            display_frames_pred(balloon, left, right, borders, pred_coords)
 
         if borders.is_set and borders.in_borders(balloon) and start_test[0] == 1:
             pred = NumericBallPredictor(balloon)
-            start_pred_timer = datetime.now()
+            start_pred_timer = now()
             start_test[0] = 2
 
         if start_test[0] == 0:
             pred = None
             start_pred_timer = None
 
-        continue_loop = interactive_loop(borders, left, balloon, start_test)
+        loop_rate.tick()
+        continue_loop = interactive_loop(borders, left, balloon, start_test, control)
 
-    # After the loop release the cap object
+    # After the loop stop the capture threads and release the cap object
+    stereo_capture.stop()
+    print(stereo_capture)
+    print(loop_rate)
+    detection_executor.shutdown()
     left.release()
     right.release()
-    # Destroy all the windows
-    cv2.destroyAllWindows()
+    if control:
+        control.close()
+    else:
+        # Destroy all the windows
+        cv2.destroyAllWindows()
 
 
 def main():
@@ -160,7 +178,10 @@ def main():
     left_cam = C920_NIR_1
     right_cam = C920_NIR_2
 
+    NumericBallPredictor.load_table(TRAJECTORY_TABLE_FILENAME)
     balloon = RecognizableObject((255, 54, 89), "balloon")
+    if KALMAN_ESTIMATION:
+        balloon.estimator = BalloonEKF()
 
     distance = 111.9
     test_prediction_loop(balloon, distance, left_cam, right_cam)
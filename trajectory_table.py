@@ -0,0 +1,162 @@
+import os
+import numpy as np
+
+from balloon_trajectory import BalloonTrajectory
+
+
+class TrajectoryTable:
+    """
+    A table of the balloon's trajectories (see balloon_trajectory.BalloonTrajectory) precomputed over a grid of initial
+    velocities. The location only offsets the trajectory, so the initial velocities are all it depends on.
+    The table is in dimensionless units: velocities in units of the terminal velocity sqrt(|acceleration| / drag),
+    times in units of 1 / sqrt(|acceleration| * drag) and lengths in units of 1 / drag. In these units the ODE of a
+    falling balloon is dv/dt = (0, -1) - |v| * v, so one table fits any drag and acceleration.
+    A trajectory is interpolated bilinearly between the trajectories of the 4 closest initial velocities in the grid.
+    The table is generated offline (see generate_trajectory_table.py) and memory mapped when loaded.
+    """
+    # The grid of the initial velocities (dimensionless), XY velocities from 0 and Z velocities from -MAX_Z_VELOCITY.
+    VELOCITY_STEP = 0.25
+    MAX_XY_VELOCITY = 6
+    MAX_Z_VELOCITY = 6
+    # The times of the trajectories (dimensionless).
+    TIME_STEP = 0.04
+    HORIZON = 6
+    # The bound on the error of the predicted location in centimeters (compared to odeint).
+    ERROR_BOUND = 0.5
+    # The number of integration steps between the times of the table when generating it.
+    SUB_STEPS = 2
+
+    def __init__(self, table):
+        """
+        Initializes the table.
+        :param table: the dimensionless states (v_xy, v_z, d_xy, z) of the trajectories of the grid, in an array of
+                      shape (XY velocities, Z velocities, times, 4).
+        """
+        # a plain array (of the same memory when the table is memory mapped) is faster to index
+        self.table = np.asarray(table)
+
+    @staticmethod
+    def shape():
+        """
+        :return: the shape of the table.
+        """
+        return (int(round(TrajectoryTable.MAX_XY_VELOCITY / TrajectoryTable.VELOCITY_STEP)) + 1,
+                int(round(2 * TrajectoryTable.MAX_Z_VELOCITY / TrajectoryTable.VELOCITY_STEP)) + 1,
+                int(round(TrajectoryTable.HORIZON / TrajectoryTable.TIME_STEP)) + 1, 4)
+
+    @staticmethod
+    def generate():
+        """
+        Integrates the trajectories of all the initial velocities of the grid together.
+        :return: the generated TrajectoryTable.
+        """
+        num_of_xy, num_of_z, num_of_times, _ = TrajectoryTable.shape()
+        v_xy_0 = np.arange(num_of_xy) * TrajectoryTable.VELOCITY_STEP
+        v_z_0 = np.arange(num_of_z) * TrajectoryTable.VELOCITY_STEP - TrajectoryTable.MAX_Z_VELOCITY
+        v_xy_0, v_z_0 = np.meshgrid(v_xy_0, v_z_0, indexing='ij')
+        step = TrajectoryTable.TIME_STEP / TrajectoryTable.SUB_STEPS
+        trajectory = BalloonTrajectory(v_xy_0, v_z_0, 0, 1, -1, step=step, horizon=TrajectoryTable.HORIZON)
+        states = trajectory.states(np.arange(num_of_times) * TrajectoryTable.TIME_STEP)
+        # from (times, 4, XY velocities, Z velocities) to the shape of the table
+        return TrajectoryTable(np.ascontiguousarray(np.moveaxis(states, (2, 3), (0, 1)), dtype=np.float32))
+
+    def save(self, filename):
+        """
+        Saves the table in a file.
+        :param filename: the name of the file to save the table in.
+        """
+        np.save(filename, self.table)
+
+    @staticmethod
+    def load(filename):
+        """
+        Loads a table from a file by memory mapping it (only the trajectories used are read).
+        :param filename: the name of the file the table is saved in.
+        :return: the TrajectoryTable, or None if there is no file of a table with the current grid.
+        """
+        if not os.path.exists(filename):
+            print("ERROR: trajectory table file does not exist")
+            return None
+        table = np.load(filename, mmap_mode='r')
+        if table.shape != TrajectoryTable.shape():
+            print("ERROR: trajectory table file does not match the grid, generate it again")
+            return None
+        return TrajectoryTable(table)
+
+    def trajectory(self, v_xy_0, v_z_0, z_0, drag, acceleration, max_step=None):
+        """
+        Interpolates the trajectory of initial values from the table.
+        The initial values may be arrays of the same shape, in which case all the trajectories are interpolated together.
+        :param v_xy_0: the initial velocity in the XY plain (in m/s).
+        :param v_z_0: the initial velocity in the Z axis (in m/s).
+        :param z_0: the initial height (in meters).
+        :param drag: the drag coefficient divided by the mass.
+        :param acceleration: the acceleration of gravity and buoyancy (in m/s^2), must be negative.
+        :param max_step: the maximal time between the steps of the trajectory in seconds, the steps are a multiple
+                         of the steps of the table (None for the steps of the table). Coarser steps are cheaper to
+                         interpolate and to query.
+        :return: the BalloonTrajectory of the initial values, or None if one of them is outside of the grid.
+        """
+        if acceleration >= 0:
+            return None
+        velocity_unit = (-acceleration / drag) ** 0.5
+        time_unit = 1 / (-acceleration * drag) ** 0.5
+        stride = 1 if max_step is None else max(1, int(max_step / (self.TIME_STEP * time_unit)))
+        table = self.table[:, :, ::stride] if stride > 1 else self.table
+        # the position of the initial velocities in the grid
+        xy_position = v_xy_0 / velocity_unit / self.VELOCITY_STEP
+        z_position = (v_z_0 / velocity_unit + self.MAX_Z_VELOCITY) / self.VELOCITY_STEP
+        if np.ndim(xy_position) == 0:
+            states = self._interpolate_one(table, float(xy_position), float(z_position))
+        else:
+            states = self._interpolate(table, np.asarray(xy_position), np.asarray(z_position))
+        if states is None:
+            return None
+        # back to physical units
+        states[..., :2] *= velocity_unit
+        states[..., 2:] /= drag
+        if states.ndim == 2:
+            states[:, 3] += z_0
+            return BalloonTrajectory.from_steps(states, drag, acceleration, stride * self.TIME_STEP * time_unit)
+        states[..., 3] += np.asarray(z_0)[..., np.newaxis]
+        # from (initial values..., times, 4) to (times, 4, initial values...), contiguous for the queries
+        steps = np.ascontiguousarray(np.moveaxis(states, (-2, -1), (0, 1)))
+        return BalloonTrajectory.from_steps(steps, drag, acceleration, stride * self.TIME_STEP * time_unit)
+
+    @staticmethod
+    def _interpolate_one(table, xy_position, z_position):
+        """
+        Interpolates the dimensionless trajectory of one initial velocity (the common case of a single predictor,
+        without the overhead of the array operations of _interpolate).
+        :param table: the table (or its times at a stride).
+        :param xy_position: the position of the XY velocity in the grid.
+        :param z_position: the position of the Z velocity in the grid.
+        :return: the states in an array of shape (times, 4), or None if the position is outside of the grid.
+        """
+        if not (0 <= xy_position <= table.shape[0] - 1 and 0 <= z_position <= table.shape[1] - 1):
+            return None
+        i = min(int(xy_position), table.shape[0] - 2)
+        j = min(int(z_position), table.shape[1] - 2)
+        s, t = xy_position - i, z_position - j
+        weights = np.array([[(1 - s) * (1 - t), (1 - s) * t], [s * (1 - t), s * t]])
+        return np.einsum('ij,ijtv->tv', weights, table[i:i + 2, j:j + 2])
+
+    @staticmethod
+    def _interpolate(table, xy_position, z_position):
+        """
+        Interpolates the dimensionless trajectories of arrays of initial velocities.
+        :param table: the table (or its times at a stride).
+        :param xy_position: the positions of the XY velocities in the grid.
+        :param z_position: the positions of the Z velocities in the grid.
+        :return: the states in an array of shape (initial values..., times, 4),
+                 or None if one of the positions is outside of the grid.
+        """
+        if not (np.all(0 <= xy_position) and np.all(xy_position <= table.shape[0] - 1)
+                and np.all(0 <= z_position) and np.all(z_position <= table.shape[1] - 1)):
+            return None
+        i = np.minimum(xy_position.astype(int), table.shape[0] - 2)
+        j = np.minimum(z_position.astype(int), table.shape[1] - 2)
+        # the weights broadcast over the times and the variables
+        s, t = (xy_position - i)[..., np.newaxis, np.newaxis], (z_position - j)[..., np.newaxis, np.newaxis]
+        return (1 - s) * (1 - t) * table[i, j] + s * (1 - t) * table[i + 1, j] \
+            + (1 - s) * t * table[i, j + 1] + s * t * table[i + 1, j + 1]
@@ -6,13 +6,21 @@ from drone import Drone
 from utils.config_utils import load_colors, save_colors
 from borders import Borders
 import faulthandler
-from gui import Gui
-
-
-def interactive_loop(borders, gui, left_cam, right_cam, cam_distance, balloon, drone_1, drone_2):
+from stereo_capture import StereoCapture
+from segmentation import ColorSegmentation
+from detection_executor import DetectionExecutor
+from prediction import NumericBallPredictor
+from prediction_cache import BalloonPredictionCache
+from state_estimation import BalloonEKF, ConstantAccelerationKF
+from headless_gui import HeadlessGui
+from latency_histogram import LoopRate
+from session_recording import SessionRecorder, SessionRecording, ReplayCapture, ReplayDroneControl, ReplayGui
+
+
+def interactive_loop(borders, gui, left_cam, right_cam, cam_distance, balloon, drone_1, drone_2, recorder=None):
     """
     The interactive loop for receiving commands from the user.
-    :param gui: the GUI.
+    :param gui: the GUI (a Gui, or a HeadlessGui in headless mode or a ReplayGui in a replay).
     :param borders: the Borders.
     :param left_cam: the left Camera.
     :param right_cam: the right Camera.
@@ -20,9 +28,12 @@ def interactive_loop(borders, gui, left_cam, right_cam, cam_distance, balloon, d
     :param balloon: the balloon's RecognizableObject.
     :param drone_1: the first Drone.
     :param drone_2: the second Drone.
+    :param recorder: the SessionRecorder to record the commands with, if recording.
     :return: whether to continue or not, and the distance between the cameras.
     """
-    event, values = gui.window.read(timeout=1)
+    event, values = gui.read(timeout=1)
+    if recorder:
+        recorder.record_input(event, values)
     str_colors_changed = "Color bounds changed"
     distance = cam_distance
 
@@ -65,7 +76,7 @@ def interactive_loop(borders, gui, left_cam, right_cam, cam_distance, balloon, d
         drone_2.start_track()
 
     # the 'q' button is set as the quitting button
-    elif event == 'q' or event == 'Quit' or event == Gui.WINDOW_CLOSED:
+    elif event == 'q' or event == 'Quit' or event == gui.WINDOW_CLOSED:
         return False, distance
 
     # the 'p' button is set as the save text_colors to file
@@ -117,7 +128,7 @@ def interactive_loop(borders, gui, left_cam, right_cam, cam_distance, balloon, d
     return True, distance
 
 
-def game_loop(drone_1, drone_2, balloon, cameras_distance, left, right):
+def game_loop(drone_1, drone_2, balloon, cameras_distance, left, right, recording=None):
     """
     Runs the loop of the game - capturing frames from the video cameras and controlling the drone accordingly.
     :param drone_1: the first Drone.
@@ -126,33 +137,60 @@ def game_loop(drone_1, drone_2, balloon, cameras_distance, left, right):
     :param cameras_distance: the distance between the cameras.
     :param left: the Camera of the left camera.
     :param right: the Camera of the right camera.
+    :param recording: a SessionRecording to replay (the cameras are its ReplayCameras and the drones are controlled by
+                      ReplayDroneControls), or None to play.
     """
     continue_loop = True
 
     borders = Borders()
-    gui = Gui()
+    if recording:
+        gui = ReplayGui(recording)
+    elif HEADLESS:
+        gui = HeadlessGui(CONTROL_PORT)
+    else:
+        # imported only with a display, PySimpleGUI is not needed headless
+        from gui import Gui
+        gui = Gui(DISPLAY_FPS, GUI_IMAGE_FORMAT, ASYNC_GUI_RENDERING)
     gui.show_gui()
 
     drones = [drone_1, drone_2]
     recognizable_objects = [balloon] + [drone.recognizable_object for drone in drones]
-    load_colors(COLORS_FILENAME, recognizable_objects)
-    borders.load_borders(BORDERS_FILENAME, left)
+    if recording:
+        load_colors(recording.config_file(COLORS_FILENAME), recognizable_objects)
+        borders.load_borders(recording.config_file(BORDERS_FILENAME), left)
+    else:
+        load_colors(COLORS_FILENAME, recognizable_objects)
+        borders.load_borders(BORDERS_FILENAME, left)
 
     drone_1.active = True
     drone_1.set_home((90, 350))
     drone_2.set_home((7, 365))
     gui.show_homes_gui(drone_1.home, drone_2.home)
 
+    segmentation = ColorSegmentation(recognizable_objects) if SINGLE_PASS_SEGMENTATION else None
+    detection_executor = DetectionExecutor(recognizable_objects, PARALLEL_DETECTION)
+    stereo_capture = ReplayCapture(left, right, REPLAY_PROCESSING_TIME) if recording else StereoCapture(left, right)
+    stereo_capture.start()
+    loop_rate = LoopRate("game loop")
+    recorder = None
+    if RECORDING_DIRECTORY and not recording:
+        recorder = SessionRecorder(RECORDING_DIRECTORY, [COLORS_FILENAME, BORDERS_FILENAME])
+        recorder.attach(drones)
+
     while continue_loop:
         # Capture the video frame by frame
-        if not left.capture():
-            continue
-        if not right.capture():
+        if not stereo_capture.capture():
+            # a replay stops at the end of the recording
+            continue_loop = stereo_capture.running
             continue
-
-        for recognizable_object in recognizable_objects:
-            # Process frames
-            recognizable_object.detect_and_set_coordinates(left, right, cameras_distance)
+        if recorder:
+            recorder.record(left, right, drones)
+
+        # Process frames
+        if segmentation:
+            segmentation.detect_and_set_coordinates(left, right, cameras_distance)
+        else:
+            detection_executor.detect_and_set_coordinates(left, right, cameras_distance)
             
         gui.display_frames_gui(balloon, drones, left, right, borders)
 
@@ -172,7 +210,9 @@ def game_loop(drone_1, drone_2, balloon, cameras_distance, left, right):
                 drone.state.setup(drone, drones[1-i], balloon, borders)
         gui.update_states(str(drone_1.state), str(drone_2.state))
 
-        continue_loop, distance = interactive_loop(borders, gui, left, right, cameras_distance, balloon, drone_1, drone_2)
+        loop_rate.tick()
+        continue_loop, distance = interactive_loop(borders, gui, left, right, cameras_distance, balloon,
+                                                   drone_1, drone_2, recorder)
 
     for i in range(3):
         for drone in drones:
@@ -185,12 +225,35 @@ def game_loop(drone_1, drone_2, balloon, cameras_distance, left, right):
                 drone.land()
             except:
                 pass
-
-    # After the loop release the cap object
+    for drone in drones:
+        drone.close()
+
+    # After the loop stop the capture threads and release the cap object
+    stereo_capture.stop()
+    gui.close()
+    if recorder:
+        recorder.close()
+        print(recorder)
+    print(stereo_capture)
+    print(gui)
+    print(balloon.prediction_cache)
+    for drone in drones:
+        print(drone.drone_control.latency)
+        for command_latency in drone.drone_control.get_command_latencies().values():
+            print(command_latency)
+        if drone.drone_control.telemetry_fusion:
+            print(drone.drone_control.telemetry_fusion)
+        if drone.drone_control.rc_scheduler:
+            print(drone.drone_control.rc_scheduler)
+        if recording:
+            print(drone.drone_control)
+    print(loop_rate)
+    detection_executor.shutdown()
     left.release()
     right.release()
-    # Destroy all the windows
-    cv2.destroyAllWindows()
+    if not HEADLESS:
+        # Destroy all the windows
+        cv2.destroyAllWindows()
 
 
 def main():
@@ -202,10 +265,23 @@ def main():
 
     drone_1 = Drone(1, (0, 191, 255), iface_ip="192.168.10.10")
     drone_2 = Drone(2, (38, 38, 200), iface_ip="192.168.10.2")
+    NumericBallPredictor.load_table(TRAJECTORY_TABLE_FILENAME)
     balloon = RecognizableObject((255, 54, 89), "balloon")
+    balloon.prediction_cache = BalloonPredictionCache(balloon, LATENCY_COMPENSATION)
+    if KALMAN_ESTIMATION:
+        balloon.estimator = BalloonEKF()
+        drone_1.recognizable_object.estimator = ConstantAccelerationKF()
+        drone_2.recognizable_object.estimator = ConstantAccelerationKF()
+
+    recording = None
+    if REPLAY_DIRECTORY:
+        recording = SessionRecording(REPLAY_DIRECTORY)
+        left_cam, right_cam = recording.cameras(left_cam, right_cam)
+        drone_1.drone_control = ReplayDroneControl(recording, drone_1.ident)
+        drone_2.drone_control = ReplayDroneControl(recording, drone_2.ident)
 
     distance = 111.9
-    game_loop(drone_1, drone_2, balloon, distance, left_cam, right_cam)
+    game_loop(drone_1, drone_2, balloon, distance, left_cam, right_cam, recording)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,56 @@ C920_NIR_2 = Camera(56, 39, 3, False)
 C920_ORI_1 = Camera(56, 39, 7, False)
 C920_ORI_2 = Camera(56, 39, 6, False)
 
+# Detection.
+# Whether to detect all the objects in a single pass over each frame (segmentation.ColorSegmentation).
+SINGLE_PASS_SEGMENTATION = False
+# Whether to detect the objects in both frames in parallel (detection_executor.DetectionExecutor).
+# Off until a multi-core run of benchmark_detection.py shows a speedup over the serial detection.
+PARALLEL_DETECTION = False
+
+# State estimation.
+# Whether to filter the coordinates and velocity of the objects with Kalman filters (state_estimation).
+KALMAN_ESTIMATION = True
+# Whether to extrapolate the states of the objects from the capture of the frames to the time of the commands.
+LATENCY_COMPENSATION = True
+# Whether to fuse the telemetry of the drones (velocity and height) into their states (telemetry_fusion).
+# Not integrated: TelemetryFusion.VELOCITY_AXES were never validated against a flight, so the fusion stays off until
+# they are checked against a recorded session (session_recording) in which the drones move along each axis.
+TELEMETRY_FUSION = False
+
+# Drones.
+# Whether to control the drones with the asyncio Tello client (one event loop for all the drones).
+ASYNC_TELLO = False
+# Whether to send the rc commands from a thread per drone at a fixed maximal rate, skipping repeated commands
+# (rc_scheduler.RcScheduler).
+RC_SCHEDULER = True
+# The maximal rate of the rc commands per drone in commands per second.
+RC_RATE = 20
+# The time in seconds without an rc command after which the last command is sent again.
+RC_KEEPALIVE_INTERVAL = 0.5
+
+# GUI.
+# Whether to run the game loops without windows (no display work), receiving the commands from a control socket.
+HEADLESS = False
+# The local port of the control socket in headless mode (control_socket.ControlSocket).
+CONTROL_PORT = 9000
+# Whether to render the frames of the gui in a thread off the game loop (gui_renderer.GuiRenderer).
+ASYNC_GUI_RENDERING = True
+# The maximal rate of the frames displayed in the gui in frames per second.
+DISPLAY_FPS = 15
+# The format the frames are encoded in for the gui window ('.ppm' is raw and much cheaper than '.png').
+GUI_IMAGE_FORMAT = '.ppm'
+
+# Recording and replay (session_recording).
+# A directory to record the sessions of the two drones game to, or None.
+RECORDING_DIRECTORY = None
+# A directory of a recording to replay instead of the cameras and the drones, or None.
+REPLAY_DIRECTORY = None
+# Whether the clock of a replay advances by the real processing time of each pair (the latency compensation works as
+# live), or stays at the capture times of the pairs (a deterministic replay, see session_recording.ReplayCapture).
+REPLAY_PROCESSING_TIME = True
+
 # Config file names.
 COLORS_FILENAME = "color_bounds.txt"
 BORDERS_FILENAME = "borders.txt"
+TRAJECTORY_TABLE_FILENAME = "trajectory_table.npy"
@@ -13,29 +13,12 @@ def phys_to_left_pix_img(x_cm, y_cm, z_cm, cam):
     :param cam: the Camera of the the camera in which to calculate the pixel location.
     :return: the pixel location of the point on the frame of the camera.
     """
-    return phys_to_left_pix(x_cm, y_cm, z_cm, cam.last_capture.x_n_pix, cam.last_capture.z_n_pix, cam.fov_horz,
-                            cam.fov_vert)
-
-
-def phys_to_left_pix(x_cm, y_cm, z_cm, x_n_pix, z_n_pix, cam_fov_horz, cam_fov_vert):
-    """
-
-    Calculates the pixel location of an inputted point on a frame.
-    :param x_cm: the x coordinate of the point.
-    :param y_cm: the y coordinate of the point.
-    :param z_cm: the z coordinate of the point.
-    :param x_n_pix: the number of pixels in the x axis on the frame.
-    :param z_n_pix: the number of pixels in the z axis on the frame.
-    :param cam_fov_horz: the camera's field of view horizontal angle.
-    :param cam_fov_vert: the camera's field of view vertical angle.
-    :return: the pixel location of the point on the frame.
-    """
     if y_cm == 0:
         return 0, 0
-    d_x = x_n_pix / 2 / np.tan(cam_fov_horz / 2)
-    x_pix = int(x_n_pix / 2 + d_x * x_cm / y_cm)
-    d_z = z_n_pix / 2 / np.tan(cam_fov_vert / 2)
-    z_pix = int(z_n_pix / 2 - d_z * z_cm / y_cm)
+    # the focal lengths are cached by the camera (per resolution), so no trigonometry is calculated here.
+    d_x, d_z = cam.get_focal_lengths()
+    x_pix = int(cam.last_capture.x_n_pix / 2 + d_x * x_cm / y_cm)
+    z_pix = int(cam.last_capture.z_n_pix / 2 - d_z * z_cm / y_cm)
     return x_pix, z_pix
 
 
@@ -53,9 +36,8 @@ def image_with_circle(cam, show_img, coords_phys, rad_phys, color=(240, 240, 240
     if not np.any(coords_phys):
         return show_img
     x_phys, y_phys, z_phys = coords_phys
-    radius = phys_to_left_pix_img(x_phys + rad_phys, y_phys, z_phys, cam)[0] - \
-             phys_to_left_pix_img(x_phys, y_phys, z_phys, cam)[0]
     coordinates = phys_to_left_pix_img(x_phys, y_phys, z_phys, cam)
+    radius = phys_to_left_pix_img(x_phys + rad_phys, y_phys, z_phys, cam)[0] - coordinates[0]
     if radius > 0:
         show_img = cv2.circle(show_img, coordinates, radius, color, thickness=thickness)
 
@@ -0,0 +1,33 @@
+import time
+
+# A function replacing the clock (see set_clock), None for the monotonic clock.
+_clock = None
+
+
+def now():
+    """
+    Reads the monotonic high resolution clock (not affected by changes of the wall clock).
+    All the times in the game (capture times, timers) are taken from this clock. The profiling of the game (its
+    durations and rates) reads time.perf_counter directly, as it measures the real time also in a replay.
+    :return: the current time in seconds.
+    """
+    if _clock is not None:
+        return _clock()
+    return time.perf_counter_ns() * 1e-9
+
+
+def set_clock(clock=None):
+    """
+    Replaces the clock read by 'now', e.g. by the clock of a replayed recording.
+    :param clock: a function returning the current time in seconds, None to restore the monotonic clock.
+    """
+    global _clock
+    _clock = clock
+
+
+def seconds_since(timestamp):
+    """
+    :param timestamp: a time taken from 'now'.
+    :return: the time in seconds passed since the inputted time.
+    """
+    return now() - timestamp
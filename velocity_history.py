@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class VelocityHistory:
+    """
+    A fixed size circular history of an object's measured coordinates and the times they were measured,
+    used to estimate the object's velocity.
+    All the arrays are allocated once, so pushing a measurement and estimating the velocity allocate no arrays.
+    """
+
+    def __init__(self, size):
+        """
+        Initializes the history.
+        :param size: the number of measurements kept in the history.
+        """
+        self.size = size
+        self.count = 0
+        self._index = 0
+        self._times = np.zeros(size)
+        self._coordinates = np.zeros((size, 3))
+        # Buffers for the velocity estimation.
+        self._diff_times = np.zeros(size)
+        self._diff_coordinates = np.zeros((size, 3))
+        self._mean_coordinates = np.zeros(3)
+        self._velocity = np.zeros(3)
+
+    @property
+    def is_full(self):
+        """
+        :return: whether the history holds 'size' measurements.
+        """
+        return self.count == self.size
+
+    def clear(self):
+        """
+        Clears all the measurements in the history.
+        """
+        self.count = 0
+        self._index = 0
+
+    def push(self, time, x, y, z):
+        """
+        Adds a measurement to the history (overwriting the oldest one if the history is full).
+        :param time: the time of the measurement in seconds.
+        :param x: the measured x coordinate.
+        :param y: the measured y coordinate.
+        :param z: the measured z coordinate.
+        """
+        self._times[self._index] = time
+        coordinates = self._coordinates[self._index]
+        coordinates[0], coordinates[1], coordinates[2] = x, y, z
+        self._index = (self._index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def velocity(self):
+        """
+        Estimates the velocity as the least squares slope of the coordinates over the times in the history.
+        The order of the measurements in the buffer does not matter for the fit, so the buffer is used as is.
+        :return: the (vx, vy, vz) velocity, or None if there are not enough measurements to estimate it.
+        """
+        n = self.count
+        if n < 2:
+            return None
+        times, coordinates = self._times[:n], self._coordinates[:n]
+        diff_times, diff_coordinates = self._diff_times[:n], self._diff_coordinates[:n]
+        np.subtract(times, times.mean(), out=diff_times)
+        np.mean(coordinates, axis=0, out=self._mean_coordinates)
+        np.subtract(coordinates, self._mean_coordinates, out=diff_coordinates)
+        variance = np.dot(diff_times, diff_times)
+        if variance == 0:
+            return None
+        np.dot(diff_times, diff_coordinates, out=self._velocity)
+        self._velocity /= variance
+        return self._velocity
+
+    def velocity_std(self):
+        """
+        Estimates the standard error of the velocity (of the least squares slope, see velocity) from the residuals
+        of the fit.
+        :return: the (vx, vy, vz) standard errors, or None if there are not enough measurements to estimate them.
+        """
+        velocity = self.velocity()
+        n = self.count
+        if velocity is None or n < 3:
+            return None
+        diff_times, diff_coordinates = self._diff_times[:n], self._diff_coordinates[:n]
+        residuals = diff_coordinates - np.outer(diff_times, velocity)
+        return np.sqrt((residuals ** 2).sum(axis=0) / (n - 2) / np.dot(diff_times, diff_times))